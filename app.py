@@ -4,23 +4,18 @@ import sys
 import logging
 
 # Import from related third party
-from flask_restful import Api
-from blueprints import app, manager
-from logging.handlers import RotatingFileHandler
+from blueprints import create_app, create_manager
 
-# To catch all 404 error type
-api = Api(app, catch_all_404s=True)
+# Development server and command line. In production, serve "wsgi:app" with gunicorn instead (see "wsgi.py").
+app = create_app()
+manager = create_manager(app)
 
 # Main program
 if __name__ == '__main__':
     try:
-        if sys.argv[1]=='db':
+        if sys.argv[1] in ['db', 'nama-penulis']:
             manager.run()
     except Exception as e:
-        # Print message to console and handle storage logs
+        # Print message to console (the requests are logged into the storage, see "blueprints/request_log.py")
         logging.getLogger().setLevel('INFO')
-        formatter = logging.Formatter("[%(asctime)s] {%(pathname)s:%(lineno)d} %(levelname)s - %(message)s")
-        log_handler = RotatingFileHandler('%s/%s' %(app.root_path, '../storage/log/app.log'), maxBytes=10000000, backupCount=10)
-        log_handler.setFormatter(formatter)
-        app.logger.addHandler(log_handler)
-        app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+        app.run(debug=app.config['APP_DEBUG'], host='0.0.0.0', port=5000)
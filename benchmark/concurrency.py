@@ -0,0 +1,281 @@
+'''
+Benchmark of the read endpoints under many concurrent clients, comparing the synchronous serving mode (gunicorn,
+"wsgi.py") with the asynchronous one (uvicorn, "asgi.py"). Start both servers on the same database, filled by
+"benchmark.seed", then:
+
+    gunicorn -c gunicorn.conf.py -b 127.0.0.1:5000 wsgi:app
+    uvicorn asgi:app --host 127.0.0.1 --port 5001 --workers 4
+    python -m benchmark.concurrency --sync-url http://127.0.0.1:5000 --async-url http://127.0.0.1:5001 --output c.json
+
+Before measuring, the same requests are sent to both servers and their status codes and JSON bodies are compared, so the
+benchmark stops if the asynchronous mode doesn't answer exactly like the synchronous one. Then each scenario is sent by
+"--concurrency" clients at once (500 by default), each with its own keep-alive connection. The clients run in a single
+event loop, so the benchmark itself doesn't need a thread per client.
+'''
+
+# Import from standard libraries
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+from datetime import datetime
+from urllib.parse import quote, urlsplit
+
+# Import from this project
+from benchmark.run import HttpTarget, Catalog, percentile, current_commit
+from benchmark.seed import TITLE_WORDS, LAST_NAMES, PUBLISHERS
+
+'''
+The following class is designed to send requests over one keep-alive HTTP/1.1 connection, with asyncio streams.
+'''
+class Connection(object):
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def send(self, path):
+        for attempt in range(2):
+            if self.writer is None:
+                self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            try:
+                self.writer.write((
+                    'GET ' + path + ' HTTP/1.1\r\nHost: ' + self.host + '\r\nConnection: keep-alive\r\n\r\n'
+                ).encode('latin-1'))
+                return await self.read_response()
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # The server closed an idle connection, open a new one
+                self.close()
+                if attempt:
+                    raise
+
+    async def read_response(self):
+        status = int((await self.reader.readuntil(b'\r\n')).split(b' ', 2)[1])
+        headers = {}
+        while True:
+            line = await self.reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, value = line.decode('latin-1').split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+
+        # The body is either sized or chunked
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readuntil(b'\r\n')).split(b';', 1)[0], 16)
+                chunks.append(await self.reader.readexactly(size + 2))
+                if size == 0:
+                    break
+            body = b''.join([chunk[:-2] for chunk in chunks])
+        else:
+            body = await self.reader.readexactly(int(headers.get('content-length', 0)))
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, body
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = None
+        self.writer = None
+
+'''
+The following function is designed to build the read scenarios. Each scenario has a name and a function which gives the
+path of the request of the given index. The listings are paginated: a whole table is a single slow request, which would
+measure the database rather than the serving mode.
+
+:param object catalog: The sampled records
+:return: Return the scenarios
+'''
+def build_scenarios(catalog):
+    return [
+        ('GET /buku?limit=100', lambda index: '/buku?limit=100'),
+        ('GET /buku/<id>', lambda index: '/buku/' + str(catalog.pick(catalog.books)['id'])),
+        ('GET /buku?ids=', lambda index: '/buku?ids=' + catalog.pick_ids(catalog.books, 20)),
+        ('GET /buku/sesuai-judul', lambda index: '/buku/sesuai-judul?limit=20&judul=' + catalog.pick(TITLE_WORDS)),
+        ('GET /buku/sesuai-penulis', lambda index: '/buku/sesuai-penulis?limit=20&penulis=' + catalog.pick(LAST_NAMES)),
+        ('GET /buku/sesuai-kategori', lambda index: (
+            '/buku/sesuai-kategori?limit=20&kategori=' + catalog.pick(catalog.categories)['kategori']
+        )),
+        ('GET /buku/cari', lambda index: (
+            '/buku/cari?limit=20&judul=' + catalog.pick(TITLE_WORDS) + '&penerbit=' + catalog.pick(PUBLISHERS)
+        )),
+        ('GET /penulis?limit=100', lambda index: '/penulis?limit=100'),
+        ('GET /penulis/<id>', lambda index: '/penulis/' + str(catalog.pick(catalog.writers)['id'])),
+        ('GET /kategori', lambda index: '/kategori'),
+        ('GET /kategori/<id>', lambda index: '/kategori/' + str(catalog.pick(catalog.categories)['id'])),
+    ]
+
+'''
+The following function is designed to quote a path, whose arguments may contain spaces (such as the sampled names).
+
+:param string path: The path
+:return: Return the quoted path
+'''
+def quote_path(path):
+    return quote(path, safe = '/?=&,%')
+
+'''
+The following function is designed to check that both servers answer the same requests with the same status code and
+JSON body.
+
+:param dict urls: The URL of each server, by mode
+:param list scenarios: The scenarios
+:param integer samples: Number of requests compared for each scenario
+:return: Return the differences found, as messages
+'''
+async def compare_servers(urls, scenarios, samples):
+    connections = dict([(mode, Connection(*address_of(url))) for mode, url in urls.items()])
+    differences = []
+    try:
+        for name, path_function in scenarios:
+            for index in range(samples):
+                path = quote_path(path_function(index))
+                answers = {}
+                for mode, connection in connections.items():
+                    status, body = await connection.send(path)
+                    answers[mode] = (status, json.loads(body.decode('utf-8')) if body else None)
+                if answers['sync'] != answers['async']:
+                    differences.append(name + ': ' + path)
+    finally:
+        for connection in connections.values():
+            connection.close()
+    return differences
+
+'''
+The following function is designed to get the host and the port of a URL.
+
+:param string url: The URL, such as http://127.0.0.1:5000
+:return: Return the host and the port
+'''
+def address_of(url):
+    parts = urlsplit(url)
+    return parts.hostname, parts.port or 80
+
+'''
+The following function is designed to run a scenario against a server, and measure it.
+
+:param string url: URL of the server
+:param function path_function: The function which gives the path of a request
+:param integer count: Number of requests
+:param integer concurrency: Number of clients sending the requests at the same time
+:return: Return the measurements of the scenario
+'''
+async def run_scenario(url, path_function, count, concurrency):
+    host, port = address_of(url)
+    paths = [quote_path(path_function(index)) for index in range(count)]
+    indexes = iter(range(count))
+    latencies = []
+    statuses = {}
+    errors = [0]
+
+    async def client():
+        connection = Connection(host, port)
+        try:
+            for index in indexes:
+                started = time.perf_counter()
+                try:
+                    status, body = await connection.send(paths[index])
+                except (OSError, asyncio.IncompleteReadError):
+                    errors[0] += 1
+                    connection.close()
+                    continue
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*[client() for index in range(concurrency)])
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    requests = len(latencies)
+    return {
+        'requests': requests,
+        'errors': errors[0],
+        'status': statuses,
+        'p50_ms': round(percentile(latencies, 50), 3) if requests else None,
+        'p95_ms': round(percentile(latencies, 95), 3) if requests else None,
+        'p99_ms': round(percentile(latencies, 99), 3) if requests else None,
+        'mean_ms': round(sum(latencies) / requests, 3) if requests else None,
+        'throughput_rps': round(requests / duration, 1) if duration > 0 else None,
+    }
+
+'''
+The following function is designed to parse the command line arguments of the benchmark.
+
+:param list argv: The arguments
+:return: Return the parsed arguments
+'''
+def parse_arguments(argv):
+    parser = argparse.ArgumentParser(description = 'Compare the synchronous and asynchronous serving modes.')
+    parser.add_argument('--sync-url', required = True, help = 'URL of the synchronous server (gunicorn wsgi:app)')
+    parser.add_argument('--async-url', required = True, help = 'URL of the asynchronous server (uvicorn asgi:app)')
+    parser.add_argument('--concurrency', type = int, default = 500, help = 'Number of concurrent clients')
+    parser.add_argument('--requests', type = int, default = 5000, help = 'Number of requests of each scenario')
+    parser.add_argument('--compare', type = int, default = 5,
+        help = 'Number of requests of each scenario whose answers are compared before measuring')
+    parser.add_argument('--only', help = 'Only run the scenarios whose name contains this text')
+    parser.add_argument('--seed', type = int, default = 42, help = 'Seed of the random generator')
+    parser.add_argument('--output', help = 'Write the JSON report to this file instead of the standard output')
+    return parser.parse_args(argv)
+
+def main(argv = None):
+    options = parse_arguments(sys.argv[1:] if argv is None else argv)
+    urls = {'sync': options.sync_url.rstrip('/'), 'async': options.async_url.rstrip('/')}
+    catalog = Catalog(HttpTarget(urls['sync'], []), options.seed)
+    scenarios = [
+        (name, path_function) for name, path_function in build_scenarios(catalog)
+        if not options.only or options.only in name
+    ]
+    loop = asyncio.get_event_loop()
+
+    # Both modes must give the same answers
+    differences = loop.run_until_complete(compare_servers(urls, scenarios, options.compare))
+    if differences:
+        sys.exit('Jawaban kedua server berbeda:\n' + '\n'.join(differences))
+
+    # Run each scenario on both servers, one after the other
+    results = {}
+    for name, path_function in scenarios:
+        results[name] = {}
+        for mode in ['sync', 'async']:
+            result = loop.run_until_complete(
+                run_scenario(urls[mode], path_function, options.requests, options.concurrency)
+            )
+            results[name][mode] = result
+            sys.stderr.write(
+                '%-28s %-5s %6s req  p50 %9s  p95 %9s  p99 %9s ms  %8s req/s  %s errors  %s\n' % (
+                    name, mode, result['requests'], result['p50_ms'], result['p95_ms'], result['p99_ms'],
+                    result['throughput_rps'], result['errors'], result['status']
+                )
+            )
+
+    # Write the report
+    report = {
+        'meta': {
+            'commit': current_commit(),
+            'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'sync_url': urls['sync'],
+            'async_url': urls['async'],
+            'concurrency': options.concurrency,
+            'requests': options.requests,
+            'seed': options.seed,
+        },
+        'scenarios': results,
+    }
+    output = json.dumps(report, indent = 2, sort_keys = True)
+    if options.output:
+        with open(options.output, 'w') as report_file:
+            report_file.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,437 @@
+'''
+HTTP benchmark of every route of "buku", "penulis", and "kategori" blueprints. Run it against a database filled by
+"benchmark.seed", and keep the JSON output of each commit to compare them:
+
+    python -m benchmark.run --database-uri sqlite:////tmp/kiostix_bench.db --output before.json
+
+By default the application is driven in this process through the Flask test client, one request at a time, so the
+number of SQL statements of each request is exact. Use "--url" to drive a running server (such as gunicorn) over HTTP
+with several concurrent clients instead. In that mode, the number of SQL statements is read from "/metrics" of the
+server, which is only exact with a single worker, and the peak RSS of the server is read from the given "--server-pid".
+
+For each scenario the report contains the latency percentiles (p50, p95, p99, in milliseconds), the throughput
+(requests per second), the average number of SQL statements per request, the status codes, and the peak RSS.
+'''
+
+# Import from standard libraries
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Import from this project
+from blueprints.pagination import encode_cursor
+from benchmark.seed import TITLE_WORDS, LAST_NAMES, PUBLISHERS
+
+# Number of records sampled from each listing to build the requests
+SAMPLE_SIZE = 1000
+
+# Number of books created by one request of the batch scenario
+BATCH_SIZE = 50
+
+'''
+The following class is designed to send requests to the application in this process, through the Flask test client.
+'''
+class TestClientTarget(object):
+    def __init__(self, database_uri):
+        from blueprints import create_app, db
+        from sqlalchemy import event
+
+        self.app = create_app({'SQLALCHEMY_DATABASE_URI': database_uri, 'DB_CREATE_ALL': False})
+        self.app.logger.setLevel(logging.ERROR)
+        self.client = self.app.test_client()
+        self.statements = 0
+        with self.app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', self.count_statement)
+
+    def count_statement(self, *args):
+        self.statements += 1
+
+    def send(self, method, path, body = None):
+        response = self.client.open(path, method = method, json = body)
+        data = response.get_data()
+        return response.status_code, data
+
+    def sql_statements(self):
+        return self.statements
+
+    def peak_rss(self):
+        return peak_rss_of_this_process()
+
+'''
+The following class is designed to send requests to a running server over HTTP.
+'''
+class HttpTarget(object):
+    def __init__(self, url, server_pids):
+        import requests
+
+        self.url = url.rstrip('/')
+        self.server_pids = server_pids
+        self.sessions = threading.local()
+        self.requests = requests
+
+    def session(self):
+        if not hasattr(self.sessions, 'session'):
+            self.sessions.session = self.requests.Session()
+        return self.sessions.session
+
+    def send(self, method, path, body = None):
+        response = self.session().request(method, self.url + path, json = body)
+        return response.status_code, response.content
+
+    def sql_statements(self):
+        status, data = self.send('GET', '/metrics')
+        for line in data.decode('utf-8').splitlines():
+            if line.startswith('sql_statements_total '):
+                return float(line.split()[1])
+        return None
+
+    def peak_rss(self):
+        if not self.server_pids:
+            return None
+        total = 0
+        for pid in self.server_pids:
+            with open('/proc/' + str(pid) + '/status') as status:
+                for line in status:
+                    if line.startswith('VmHWM:'):
+                        total += int(line.split()[1]) * 1024
+        return round(total / 1048576.0, 1)
+
+'''
+The following function is designed to get the peak RSS of this process.
+
+:return: Return the peak RSS in megabytes
+'''
+def peak_rss_of_this_process():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux gives kilobytes, macOS gives bytes
+    if sys.platform == 'darwin':
+        peak = peak / 1024.0
+    return round(peak / 1024.0, 1)
+
+'''
+The following function is designed to compute a percentile of sorted values, by the nearest-rank method.
+
+:param list values: Sorted values
+:param float percent: The percentile, from 0 to 100
+:return: Return the value at the percentile
+'''
+def percentile(values, percent):
+    if not values:
+        return None
+    rank = max(int(round(percent / 100.0 * len(values) + 0.5)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+'''
+The following function is designed to get a page of records from a listing, to be used to build the requests.
+
+:param object target: The target of the requests
+:param string path: Path of the listing
+:return: Return the records
+'''
+def sample_records(target, path):
+    status, data = target.send('GET', path + '?limit=' + str(SAMPLE_SIZE))
+    if status != 200:
+        sys.exit('Gagal mengambil ' + path + ' (status ' + str(status) + '), apakah database sudah diisi?')
+    return json.loads(data.decode('utf-8'))['data']
+
+'''
+The following class holds the state shared by the scenarios: the sampled records, and the records created by the write
+scenarios (so that the edit and delete scenarios only touch them).
+'''
+class Catalog(object):
+    def __init__(self, target, seed):
+        self.random = random.Random(seed)
+        self.books = sample_records(target, '/buku')
+        self.writers = sample_records(target, '/penulis')
+        self.categories = sample_records(target, '/kategori')
+        self.token = str(int(time.time() * 1000))
+        self.created = {'buku': [], 'penulis': [], 'kategori': []}
+        self.counter = 0
+        self.lock = threading.Lock()
+
+    def next_number(self):
+        with self.lock:
+            self.counter += 1
+            return self.counter
+
+    def pick(self, records):
+        with self.lock:
+            return self.random.choice(records)
+
+    def pick_ids(self, records, count = 100):
+        with self.lock:
+            return ','.join([str(record['id']) for record in self.random.sample(records, min(count, len(records)))])
+
+    def new_book(self):
+        number = self.next_number()
+        return {
+            'id_kategori': self.pick(self.categories)['id'], 'judul': 'Benchmark ' + str(number), 'penerbit': 'Benchmark',
+            'nomor_isbn': 'bench-' + self.token + '-' + str(number),
+            'id_penulis': [self.pick(self.writers)['id'] for index in range(3)]
+        }
+
+    def new_writer(self):
+        number = self.next_number()
+        return {
+            'nama': 'Benchmark ' + str(number), 'nomor_hp': 'bench-' + self.token + '-' + str(number),
+            'email': 'bench-' + self.token + '-' + str(number) + '@contoh.id'
+        }
+
+    def remember(self, kind, data, key):
+        record_id = json.loads(data.decode('utf-8'))[key]['id']
+        with self.lock:
+            self.created[kind].append(record_id)
+
+'''
+The following function is designed to build the list of scenarios. Each scenario has a name, a number of requests, and a
+function which sends the request of the given index and returns the status code and the body.
+
+:param object catalog: The shared state of the scenarios
+:param object target: The target of the requests
+:param object options: Parsed command line arguments
+:return: Return the scenarios, in the order they are run
+'''
+def build_scenarios(catalog, target, options):
+    def get(path_function):
+        return lambda index: target.send('GET', path_function(index))
+
+    count = options.requests
+    full = options.full_requests
+    scenarios = [
+        ('GET /buku', full, get(lambda index: '/buku')),
+        ('GET /buku?format=ndjson', full, get(lambda index: '/buku?format=ndjson')),
+        ('GET /buku?limit=100', count, get(lambda index: '/buku?limit=100')),
+        ('GET /buku?limit=100&cursor', count, get(
+            lambda index: '/buku?limit=100&cursor=' + encode_cursor('id', catalog.pick(catalog.books)['id'])
+        )),
+        ('GET /buku/<id>', count, get(lambda index: '/buku/' + str(catalog.pick(catalog.books)['id']))),
+        ('GET /buku?ids=', count, get(lambda index: '/buku?ids=' + catalog.pick_ids(catalog.books))),
+        ('GET /buku/sesuai-judul', count, get(
+            lambda index: '/buku/sesuai-judul?limit=100&judul=' + catalog.pick(TITLE_WORDS)
+        )),
+        ('GET /buku/sesuai-penulis', count, get(
+            lambda index: '/buku/sesuai-penulis?limit=100&penulis=' + catalog.pick(LAST_NAMES)
+        )),
+        ('GET /buku/sesuai-kategori', count, get(
+            lambda index: '/buku/sesuai-kategori?limit=100&kategori=' + catalog.pick(catalog.categories)['kategori']
+        )),
+        ('GET /buku/cari', count, get(
+            lambda index: '/buku/cari?limit=100&judul=' + catalog.pick(TITLE_WORDS) + '&penerbit='
+            + catalog.pick(PUBLISHERS)
+        )),
+        ('GET /penulis', full, get(lambda index: '/penulis')),
+        ('GET /penulis?limit=100', count, get(lambda index: '/penulis?limit=100')),
+        ('GET /penulis/<id>', count, get(lambda index: '/penulis/' + str(catalog.pick(catalog.writers)['id']))),
+        ('GET /penulis?ids=', count, get(lambda index: '/penulis?ids=' + catalog.pick_ids(catalog.writers))),
+        ('GET /kategori', count, get(lambda index: '/kategori')),
+        ('GET /kategori/<id>', count, get(lambda index: '/kategori/' + str(catalog.pick(catalog.categories)['id']))),
+    ]
+    if options.read_only:
+        return scenarios
+
+    # Write scenarios only touch the records they create, and delete them at the end
+    def post(path, body_function, kind, key):
+        def send(index):
+            status, data = target.send('POST', path, body_function())
+            if status == 200:
+                catalog.remember(kind, data, key)
+            return status, data
+        return send
+
+    def put(path, body_function, kind):
+        def send(index):
+            created = catalog.created[kind]
+            if not created:
+                return None, b''
+            return target.send('PUT', path + '/' + str(created[index % len(created)]), body_function())
+        return send
+
+    def delete(path, kind):
+        def send(index):
+            with catalog.lock:
+                if not catalog.created[kind]:
+                    return None, b''
+                record_id = catalog.created[kind].pop()
+            return target.send('DELETE', path + '/' + str(record_id))
+        return send
+
+    def batch(index):
+        status, data = target.send('POST', '/buku/batch', {
+            'operasi': [dict(catalog.new_book(), aksi = 'tambah') for number in range(BATCH_SIZE)]
+        })
+        if status == 200:
+            with catalog.lock:
+                catalog.created['buku'].extend([
+                    result['id'] for result in json.loads(data.decode('utf-8'))['hasil'] if result['status'] == 200
+                ])
+        return status, data
+
+    new_category = lambda: {'kategori': 'Benchmark ' + catalog.token + ' ' + str(catalog.next_number())}
+    scenarios.extend([
+        ('POST /kategori', count, post('/kategori', new_category, 'kategori', 'kategori_baru')),
+        ('PUT /kategori/<id>', count, put('/kategori', new_category, 'kategori')),
+        ('DELETE /kategori/<id>', count, delete('/kategori', 'kategori')),
+        ('POST /penulis', count, post('/penulis', catalog.new_writer, 'penulis', 'penulis_baru')),
+        ('PUT /penulis/<id>', count, put('/penulis', catalog.new_writer, 'penulis')),
+        ('DELETE /penulis/<id>', count, delete('/penulis', 'penulis')),
+        ('POST /buku', count, post('/buku', catalog.new_book, 'buku', 'buku_baru')),
+        ('PUT /buku/<id>', count, put('/buku', catalog.new_book, 'buku')),
+        ('POST /buku/batch', max(count // BATCH_SIZE, 1), batch),
+        ('DELETE /buku/<id>', count * 2, delete('/buku', 'buku')),
+    ])
+    return scenarios
+
+'''
+The following function is designed to run a scenario, and measure it.
+
+:param object target: The target of the requests
+:param function send: The function which sends one request
+:param integer count: Number of requests
+:param integer concurrency: Number of clients sending the requests at the same time
+:return: Return the measurements of the scenario
+'''
+def run_scenario(target, send, count, concurrency):
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    indexes = iter(range(count))
+
+    def work():
+        while True:
+            with lock:
+                index = next(indexes, None)
+            if index is None:
+                return
+            started = time.perf_counter()
+            status, data = send(index)
+            elapsed = time.perf_counter() - started
+            if status is None:
+                continue
+            with lock:
+                latencies.append(elapsed * 1000)
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    statements_before = target.sql_statements()
+    started = time.perf_counter()
+    if concurrency <= 1:
+        work()
+    else:
+        workers = [threading.Thread(target = work) for index in range(concurrency)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    duration = time.perf_counter() - started
+    statements_after = target.sql_statements()
+
+    latencies.sort()
+    requests = len(latencies)
+    statements = None
+    if requests and statements_before is not None and statements_after is not None:
+        statements = round((statements_after - statements_before) / float(requests), 2)
+    return {
+        'requests': requests,
+        'status': statuses,
+        'p50_ms': round(percentile(latencies, 50), 3) if requests else None,
+        'p95_ms': round(percentile(latencies, 95), 3) if requests else None,
+        'p99_ms': round(percentile(latencies, 99), 3) if requests else None,
+        'mean_ms': round(sum(latencies) / requests, 3) if requests else None,
+        'throughput_rps': round(requests / duration, 1) if duration > 0 else None,
+        'sql_per_request': statements,
+        'peak_rss_mb': target.peak_rss(),
+    }
+
+'''
+The following function is designed to get the commit being measured, to be written in the report.
+
+:return: Return the commit hash, or None if it isn't a git repository
+'''
+def current_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd = os.path.dirname(os.path.abspath(__file__)), stderr = subprocess.DEVNULL
+        ).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+'''
+The following function is designed to parse the command line arguments of the benchmark.
+
+:param list argv: The arguments
+:return: Return the parsed arguments
+'''
+def parse_arguments(argv):
+    parser = argparse.ArgumentParser(description = 'Benchmark every route of the application.')
+    target = parser.add_mutually_exclusive_group(required = True)
+    target.add_argument('--database-uri', help = 'Drive the application in this process, on this database')
+    target.add_argument('--url', help = 'Drive a running server, such as http://127.0.0.1:5000')
+    parser.add_argument('--server-pid', type = int, action = 'append', default = [],
+        help = 'PID of a server process, to report its peak RSS (can be repeated, only with --url)')
+    parser.add_argument('--requests', type = int, default = 200, help = 'Number of requests of each scenario')
+    parser.add_argument('--full-requests', type = int, default = 3,
+        help = 'Number of requests of the scenarios which return a whole table')
+    parser.add_argument('--concurrency', type = int, default = 1, help = 'Number of concurrent clients')
+    parser.add_argument('--only', help = 'Only run the scenarios whose name contains this text')
+    parser.add_argument('--read-only', action = 'store_true', help = 'Skip the scenarios which change the database')
+    parser.add_argument('--seed', type = int, default = 42, help = 'Seed of the random generator')
+    parser.add_argument('--output', help = 'Write the JSON report to this file instead of the standard output')
+    options = parser.parse_args(argv)
+    if options.database_uri and options.concurrency != 1:
+        parser.error('--concurrency hanya bisa digunakan bersama --url')
+    return options
+
+def main(argv = None):
+    options = parse_arguments(sys.argv[1:] if argv is None else argv)
+    if options.url:
+        target = HttpTarget(options.url, options.server_pid)
+    else:
+        target = TestClientTarget(options.database_uri)
+    catalog = Catalog(target, options.seed)
+
+    # Run the scenarios
+    results = {}
+    for name, count, send in build_scenarios(catalog, target, options):
+        if options.only and options.only not in name:
+            continue
+        results[name] = run_scenario(target, send, count, options.concurrency)
+        result = results[name]
+        sys.stderr.write(
+            '%-30s %6s req  p50 %9s  p95 %9s  p99 %9s ms  %8s req/s  %6s sql/req  %s\n' % (
+                name, result['requests'], result['p50_ms'], result['p95_ms'], result['p99_ms'],
+                result['throughput_rps'], result['sql_per_request'], result['status']
+            )
+        )
+
+    # Write the report
+    report = {
+        'meta': {
+            'commit': current_commit(),
+            'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'target': options.url or 'test-client',
+            'database': options.database_uri.split(':')[0] if options.database_uri else None,
+            'concurrency': options.concurrency,
+            'requests': options.requests,
+            'full_requests': options.full_requests,
+            'seed': options.seed,
+        },
+        'scenarios': results,
+    }
+    output = json.dumps(report, indent = 2, sort_keys = True)
+    if options.output:
+        with open(options.output, 'w') as report_file:
+            report_file.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+'''
+Synthetic catalog generator for the benchmarks. It creates the schema in an empty database (SQLite or MySQL) and fills
+it with a reproducible catalog: the same arguments always give the same data.
+
+    python -m benchmark.seed --database-uri sqlite:////tmp/kiostix_bench.db --books 100000 --writers 20000 \
+        --categories 200 --min-writers 1 --max-writers 5 --seed 42
+'''
+
+# Import from standard libraries
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Import from related third party
+import flask_migrate
+
+# Import from this project
+from blueprints import create_app, create_schema, db, init_migrations
+from blueprints.buku.model import Buku
+from blueprints.kategori.model import Kategori
+from blueprints.penulis.model import Penulis
+from blueprints.penulis_buku.model import PenulisBuku
+from blueprints.buku.writer_names import join_writer_names
+
+# Number of records inserted in one statement
+CHUNK_SIZE = 5000
+
+# Revision of the migration which adds the full-text index, which can't be created by "db.create_all"
+FULLTEXT_REVISION = 'f126f4c042ec'
+
+# Words used to build names and titles, so that the search endpoints have something to find
+FIRST_NAMES = [
+    'Andi', 'Budi', 'Citra', 'Dewi', 'Eka', 'Fajar', 'Gita', 'Hadi', 'Indah', 'Joko', 'Kartika', 'Lestari', 'Made',
+    'Nur', 'Oki', 'Putri', 'Rahmat', 'Sari', 'Tono', 'Wulan', 'Yudi', 'Zahra'
+]
+LAST_NAMES = [
+    'Santoso', 'Wijaya', 'Saputra', 'Hidayat', 'Kusuma', 'Pratama', 'Siregar', 'Nasution', 'Halim', 'Gunawan',
+    'Setiawan', 'Purnomo', 'Lubis', 'Tanjung', 'Rahayu', 'Utami'
+]
+TITLE_WORDS = [
+    'hujan', 'bulan', 'laut', 'senja', 'rumah', 'jalan', 'cahaya', 'angin', 'bumi', 'langit', 'malam', 'pagi', 'kota',
+    'desa', 'sungai', 'gunung', 'api', 'kopi', 'cerita', 'rahasia', 'pulang', 'mimpi', 'hutan', 'pelangi', 'bintang',
+    'waktu', 'kenangan', 'perahu', 'pasar', 'sekolah'
+]
+PUBLISHERS = [
+    'Gramedia', 'Mizan', 'Bentang', 'Erlangga', 'Kepustakaan Populer', 'Marjin Kiri', 'Noura', 'Republika',
+    'Elex Media', 'Balai Pustaka'
+]
+CATEGORY_WORDS = ['Novel', 'Komik', 'Sejarah', 'Sains', 'Agama', 'Biografi', 'Puisi', 'Teknologi', 'Anak', 'Bisnis']
+
+'''
+The following function is designed to insert many rows into a table, a chunk at a time.
+
+:param object table: The table
+:param list rows: The rows, as dictionaries
+'''
+def insert_rows(table, rows):
+    for start in range(0, len(rows), CHUNK_SIZE):
+        db.session.execute(table.insert(), rows[start:start + CHUNK_SIZE])
+    db.session.commit()
+
+'''
+The following function is designed to generate the catalog and insert it into the database of the application.
+
+:param object options: Parsed command line arguments
+:return: Return the number of rows inserted into each table
+'''
+def seed(options):
+    generator = random.Random(options.seed)
+    started_at = datetime(2020, 1, 1)
+
+    def timestamp(index):
+        return started_at + timedelta(minutes = index)
+
+    # Categories, each name is unique
+    categories = [
+        {
+            'id': index + 1, 'kategori': CATEGORY_WORDS[index % len(CATEGORY_WORDS)] + ' ' + str(index + 1),
+            'created_at': timestamp(index), 'updated_at': timestamp(index)
+        } for index in range(options.categories)
+    ]
+    insert_rows(Kategori.__table__, categories)
+
+    # Writers, with unique phone number and email
+    writers = [
+        {
+            'id': index + 1, 'nama': generator.choice(FIRST_NAMES) + ' ' + generator.choice(LAST_NAMES),
+            'nomor_hp': '08' + str(index + 1).zfill(10), 'email': 'penulis' + str(index + 1) + '@contoh.id',
+            'created_at': timestamp(index), 'updated_at': timestamp(index)
+        } for index in range(options.writers)
+    ]
+    insert_rows(Penulis.__table__, writers)
+
+    # Books and their writers
+    books = []
+    book_writers = []
+    for index in range(options.books):
+        book_id = index + 1
+        writer_ids = generator.sample(
+            range(1, options.writers + 1), generator.randint(options.min_writers, options.max_writers)
+        )
+        for writer_id in writer_ids:
+            book_writers.append({'id': len(book_writers) + 1, 'id_buku': book_id, 'id_penulis': writer_id})
+        books.append({
+            'id': book_id, 'id_kategori': generator.randint(1, options.categories),
+            'judul': ' '.join(generator.sample(TITLE_WORDS, generator.randint(2, 4))).capitalize(),
+            'penerbit': generator.choice(PUBLISHERS), 'nomor_isbn': '978' + str(book_id).zfill(10),
+            'created_at': timestamp(index), 'updated_at': timestamp(index),
+            'nama_penulis': join_writer_names([writers[writer_id - 1]['nama'] for writer_id in writer_ids])
+        })
+    insert_rows(Buku.__table__, books)
+    insert_rows(PenulisBuku.__table__, book_writers)
+    return {
+        'kategori': len(categories), 'penulis': len(writers), 'buku': len(books), 'penulis_buku': len(book_writers)
+    }
+
+'''
+The following function is designed to parse the command line arguments of the generator.
+
+:param list argv: The arguments
+:return: Return the parsed arguments
+'''
+def parse_arguments(argv):
+    parser = argparse.ArgumentParser(description = 'Fill an empty database with a synthetic catalog.')
+    parser.add_argument('--database-uri', required = True, help = 'Such as sqlite:////tmp/kiostix_bench.db')
+    parser.add_argument('--books', type = int, default = 100000)
+    parser.add_argument('--writers', type = int, default = 20000)
+    parser.add_argument('--categories', type = int, default = 200)
+    parser.add_argument('--min-writers', type = int, default = 1, help = 'Minimum number of writers of a book')
+    parser.add_argument('--max-writers', type = int, default = 5, help = 'Maximum number of writers of a book')
+    parser.add_argument('--seed', type = int, default = 42, help = 'Seed of the random generator')
+    options = parser.parse_args(argv)
+    if options.categories < 1 or options.writers < options.max_writers or options.min_writers > options.max_writers:
+        parser.error('Jumlah kategori, penulis, atau penulis per buku tidak valid')
+    return options
+
+def main(argv = None):
+    options = parse_arguments(sys.argv[1:] if argv is None else argv)
+    app = create_app({'SQLALCHEMY_DATABASE_URI': options.database_uri, 'DB_CREATE_ALL': True})
+    create_schema(app)
+    init_migrations(app)
+    with app.app_context():
+        if db.session.query(Buku.id).first() is not None:
+            sys.exit('Database tersebut sudah berisi buku, gunakan database yang kosong')
+        started = time.perf_counter()
+        counts = seed(options)
+
+        # The full-text index is added after the data (faster, and it is filled once), then the migrations are
+        # marked as applied since "db.create_all" has created the rest of the schema
+        directory = app.root_path + '/../migrations'
+        flask_migrate.upgrade(directory = directory, revision = FULLTEXT_REVISION)
+        flask_migrate.stamp(directory = directory, revision = 'head')
+        print('Sukses mengisi database dalam ' + str(round(time.perf_counter() - started, 1)) + ' detik: ' + str(counts))
+
+if __name__ == '__main__':
+    main()
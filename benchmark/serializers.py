@@ -0,0 +1,104 @@
+'''
+Micro-benchmark of the row serializers against "flask_restful.marshal", on a database filled by "benchmark.seed":
+
+    python -m benchmark.serializers --database-uri sqlite:////tmp/kiostix_bench.db --rows 10000
+
+For each model, the same records are formatted both ways and the JSON output is checked to be identical. The time is
+measured for formatting only, and for querying plus formatting (ORM objects against plain rows).
+'''
+
+# Import from standard libraries
+import argparse
+import json
+import sys
+import time
+
+# Import from related third party
+from flask_restful import marshal
+
+# Import from this project
+from blueprints import create_app, db
+
+'''
+The following function is designed to measure the best time of a function over some repeats.
+
+:param function function: The function which should be measured
+:param integer repeat: Number of repeats
+:return: Return the best time in milliseconds
+'''
+def best_time(function, repeat):
+    times = []
+    for index in range(repeat):
+        started = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - started) * 1000)
+    return round(min(times), 3)
+
+'''
+The following function is designed to compare both ways of formatting the records of a model.
+
+:param object model: The model
+:param function format_record: The function which formats an ORM object with "marshal"
+:param object serializer: The row serializer of the model
+:param integer rows: Number of records
+:param integer repeat: Number of repeats
+:return: Return the measurements
+'''
+def compare(model, format_record, serializer, rows, repeat):
+    records = model.query.order_by(model.id).limit(rows).all()
+    row_tuples = db.session.query(*serializer.columns).order_by(model.id).limit(rows).all()
+    marshalled = json.dumps([format_record(record) for record in records])
+    serialized = json.dumps([serializer(row) for row in row_tuples])
+    if marshalled != serialized:
+        sys.exit('Hasil serializer ' + model.__tablename__ + ' berbeda dengan marshal')
+
+    def query_and_marshal():
+        db.session.expunge_all()
+        return [format_record(record) for record in model.query.order_by(model.id).limit(rows)]
+
+    def query_and_serialize():
+        return [serializer(row) for row in db.session.query(*serializer.columns).order_by(model.id).limit(rows)]
+
+    result = {
+        'rows': len(records),
+        'identical_json': True,
+        'marshal_ms': best_time(lambda: [format_record(record) for record in records], repeat),
+        'serializer_ms': best_time(lambda: [serializer(row) for row in row_tuples], repeat),
+        'query_and_marshal_ms': best_time(query_and_marshal, repeat),
+        'query_and_serializer_ms': best_time(query_and_serialize, repeat),
+    }
+    result['speedup'] = round(result['marshal_ms'] / max(result['serializer_ms'], 0.001), 1)
+    result['query_speedup'] = round(result['query_and_marshal_ms'] / max(result['query_and_serializer_ms'], 0.001), 1)
+    return result
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Compare the row serializers with marshal.')
+    parser.add_argument('--database-uri', required = True, help = 'Such as sqlite:////tmp/kiostix_bench.db')
+    parser.add_argument('--rows', type = int, default = 10000, help = 'Number of records of each model')
+    parser.add_argument('--repeat', type = int, default = 5, help = 'Number of repeats, the best time is reported')
+    options = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': options.database_uri, 'DB_CREATE_ALL': False})
+    from blueprints.buku.model import Buku
+    from blueprints.buku.resources import format_book, book_serializer
+    from blueprints.kategori.model import Kategori
+    from blueprints.kategori.resources import category_serializer
+    from blueprints.penulis.model import Penulis
+    from blueprints.penulis.resources import writer_serializer
+
+    with app.app_context():
+        results = {
+            'buku': compare(Buku, format_book, book_serializer, options.rows, options.repeat),
+            'penulis': compare(
+                Penulis, lambda writer: marshal(writer, Penulis.response_fields), writer_serializer, options.rows,
+                options.repeat
+            ),
+            'kategori': compare(
+                Kategori, lambda category: marshal(category, Kategori.response_fields), category_serializer,
+                options.rows, options.repeat
+            ),
+        }
+    print(json.dumps(results, indent = 2, sort_keys = True))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+'''
+Startup benchmark of the application: how long a new process takes to import "wsgi" (which creates the application, as
+a gunicorn worker or a command does), measured by "python -X importtime". Run it from the root of the project:
+
+    python -m benchmark.startup --runs 5 --budget-ms 750 --output startup.json
+
+The process must stay light, so the benchmark fails (exit status 1) when:
+
+- the median import time of "wsgi" is above the budget,
+- a module of the migration tooling (Flask-Migrate, Alembic, Flask-Script) is imported, or
+- creating the application has created a database engine (the database must only be used by the first request).
+
+The report also lists the modules which take the most time by themselves, to find what made the startup slower.
+'''
+
+# Import from standard libraries
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+# Import from this project
+from benchmark.run import current_commit
+
+# Modules which only the command line needs
+FORBIDDEN_MODULES = ('alembic', 'flask_migrate', 'flask_script')
+
+# Code run by each measured process: import the entry point, then tell whether an engine was created
+STARTUP_CODE = '''
+import json, wsgi
+print(json.dumps({"engines": len(wsgi.app.extensions["sqlalchemy"].connectors)}))
+'''
+
+# Number of modules listed in the report
+SLOWEST_MODULES = 15
+
+'''
+The following function is designed to parse the output of "python -X importtime".
+
+:param string output: The standard error of the process
+:return: Return a list of the modules, as tuples of the name, its own time, and its cumulative time (in microseconds)
+'''
+def parse_importtime(output):
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(own), int(cumulative)))
+    return modules
+
+'''
+The following function is designed to start a new process which imports the entry point, and measure it.
+
+:return: Return the import time of "wsgi" (in milliseconds), the imported modules, and the number of created engines
+'''
+def measure_startup():
+    environment = dict(os.environ)
+    # The environment mustn't turn the import time off (it is only read when the variable is set)
+    environment.pop('PYTHONPROFILEIMPORTTIME', None)
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_CODE], capture_output = True, text = True,
+        env = environment, cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    if process.returncode != 0:
+        sys.exit('Gagal menjalankan aplikasi:\n' + process.stderr[-2000:])
+    modules = parse_importtime(process.stderr)
+    total = [cumulative for name, own, cumulative in modules if name == 'wsgi'][0]
+    engines = json.loads(process.stdout.strip().splitlines()[-1])['engines']
+    return total / 1000.0, modules, engines
+
+'''
+The following function is designed to parse the command line arguments of the benchmark.
+
+:param list argv: The arguments
+:return: Return the parsed arguments
+'''
+def parse_arguments(argv):
+    parser = argparse.ArgumentParser(description = 'Measure the startup time of the application.')
+    parser.add_argument('--runs', type = int, default = 5, help = 'Number of processes which are measured')
+    parser.add_argument('--budget-ms', type = float, default = 750,
+        help = 'Maximum median import time of "wsgi", in milliseconds')
+    parser.add_argument('--output', help = 'Write the JSON report to this file instead of the standard output')
+    return parser.parse_args(argv)
+
+def main(argv = None):
+    options = parse_arguments(sys.argv[1:] if argv is None else argv)
+    times = []
+    for run in range(options.runs):
+        total, modules, engines = measure_startup()
+        times.append(total)
+        sys.stderr.write('run %d: %.1f ms\n' % (run + 1, total))
+    times.sort()
+    median = times[len(times) // 2]
+
+    # The checks are made on the last run, the modules are the same for every run
+    forbidden = sorted(set([
+        name for name, own, cumulative in modules if name.split('.')[0] in FORBIDDEN_MODULES
+    ]))
+    failures = []
+    if median > options.budget_ms:
+        failures.append('Waktu import %.1f ms melebihi batas %.1f ms' % (median, options.budget_ms))
+    if forbidden:
+        failures.append('Modul migrasi ikut di-import: ' + ', '.join(forbidden))
+    if engines:
+        failures.append('Engine database dibuat saat aplikasi dibuat')
+
+    # Write the report
+    slowest = sorted(modules, key = lambda module: module[1], reverse = True)[:SLOWEST_MODULES]
+    report = {
+        'meta': {
+            'commit': current_commit(),
+            'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'runs': options.runs,
+            'budget_ms': options.budget_ms,
+        },
+        'import_ms': {'median': round(median, 1), 'min': round(times[0], 1), 'max': round(times[-1], 1)},
+        'modules': len(modules),
+        'engines': engines,
+        'forbidden_modules': forbidden,
+        'slowest_modules': [
+            {'module': name, 'self_ms': round(own / 1000.0, 1), 'cumulative_ms': round(cumulative / 1000.0, 1)}
+            for name, own, cumulative in slowest
+        ],
+        'failures': failures,
+    }
+    output = json.dumps(report, indent = 2, sort_keys = True)
+    if options.output:
+        with open(options.output, 'w') as report_file:
+            report_file.write(output + '\n')
+    else:
+        print(output)
+    if failures:
+        sys.exit('\n'.join(failures))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,534 @@
+'''
+Asynchronous serving mode of the application, for an ASGI server such as uvicorn (see "asgi.py" at the root of the
+project). The read endpoints of "buku", "penulis", and "kategori" routes are served natively: they run the same read
+handlers as the Flask resources (see "blueprints/reads.py"), but their queries run on an asynchronous driver (aiomysql,
+or aiosqlite for SQLite), so a worker isn't blocked while it waits for the database and can serve many requests at once.
+The stream of the changes (GET /buku/stream) is served natively too, each client by a task of the event loop, so a
+worker holds thousands of idle clients. Every other request is served by the Flask application itself, in a pool of
+threads: the writes (and "/metrics", ...) in ASGI_THREADS threads, and the NDJSON exports, which hold their thread for
+their whole length, in ASGI_EXPORT_THREADS other ones, so that a few slow exports don't hold the writes back. Each of
+these threads holds at most one connection of the synchronous pool, so neither pool has more threads than
+DB_POOL_SIZE + DB_MAX_OVERFLOW; the large bodies of the native responses are compressed in the default executor of the
+event loop, which holds no connection.
+
+A native response is built by the same Flask-RESTful API and passes through the same "after_request" hooks (CORS,
+request logging, metrics) as on the synchronous path, so the API contract and the JSON output don't change.
+'''
+
+# Import from standard libraries
+import asyncio
+import io
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# Import from related third party
+from flask import Response, g
+from flask_restful.utils import unpack
+from werkzeug.exceptions import HTTPException
+from werkzeug.wrappers import BaseResponse
+
+# Import from this project
+from blueprints import create_app, db
+from blueprints.async_db import AsyncDatabase, request_statements
+from blueprints.metrics import requests_in_flight
+from blueprints.perubahan.feed import read_changes
+from blueprints.perubahan.stream import (
+    HEARTBEAT, READ_SIZE, RETRY, STREAM_HEADERS, Subscriber, format_event, new_events, stream_position
+)
+from blueprints.reads import run_async
+from blueprints.replicas import read_on_primary, route_request, session_scope, set_route
+
+# Number of chunks of a streamed response which can wait to be sent to the client
+WSGI_QUEUE_SIZE = 16
+
+# Endpoint of the stream of the changes, served by "serve_stream"
+STREAM_ENDPOINT = 'buku.changestreamresource'
+
+'''
+The following function is designed to build the WSGI environment of an ASGI request, as described by PEP 3333.
+
+:param dict scope: The scope of the request
+:param bytes body: The body of the request
+:return: Return the environment
+'''
+def build_environ(scope, body):
+    path = scope['path']
+    root_path = scope.get('root_path', '')
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+        environ['REMOTE_PORT'] = str(scope['client'][1])
+
+    # Headers, the ones which are repeated are joined
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1')
+        value = value.decode('latin-1')
+        if name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        elif name == 'content-type':
+            key = 'CONTENT_TYPE'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        if key in environ:
+            value = environ[key] + ('; ' if key == 'HTTP_COOKIE' else ',') + value
+        environ[key] = value
+
+    # The body is read at once, so its length is known even if it was sent in chunks
+    if body and 'CONTENT_LENGTH' not in environ:
+        environ['CONTENT_LENGTH'] = str(len(body))
+    return environ
+
+'''
+The following function is designed to create a pool of threads for the requests served by the Flask application. Each
+thread holds at most one connection of the synchronous pool, so there are never more threads than connections.
+
+:param dict config: The configuration of the application
+:param string name: The key of the configuration giving the number of threads
+:return: Return the pool
+'''
+def thread_pool(config, name):
+    threads = min(config[name], config['DB_POOL_SIZE'] + config['DB_MAX_OVERFLOW'])
+    return ThreadPoolExecutor(max(threads, 1), thread_name_prefix = name.lower())
+
+'''
+The following function is designed to read the whole body of an ASGI request.
+
+:param function receive: The function which receives the messages of the request
+:return: Return the body
+'''
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] != 'http.request':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body', False):
+            break
+    return b''.join(chunks)
+
+'''
+The following function is designed to start an ASGI response.
+
+:param function send: The function which sends the messages of the response
+:param string status: The status line, such as "200 OK"
+:param list headers: The headers, as pairs of name and value
+'''
+async def start_response(send, status, headers):
+    await send({
+        'type': 'http.response.start',
+        'status': int(status.split(' ', 1)[0]),
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+    })
+
+'''
+The following class is the ASGI application. The native handlers are found through the URL map of the Flask
+application, by the endpoint of the matched rule.
+'''
+class AsgiApplication(object):
+    '''
+    :param object app: The Flask application
+    '''
+    def __init__(self, app):
+        from blueprints.buku import resources as book_resources
+        from blueprints.kategori import resources as category_resources
+        from blueprints.penulis import resources as writer_resources
+
+        self.app = app
+        self.routes = {}
+        for resources in [book_resources, category_resources, writer_resources]:
+            for endpoint, handler in resources.handlers.items():
+                self.routes[endpoint] = (handler, resources.api)
+        self.executor = thread_pool(app.config, 'ASGI_THREADS')
+        self.export_executor = thread_pool(app.config, 'ASGI_EXPORT_THREADS')
+        self.database = None
+        self.replicas = {}
+        self.starting = None
+        self.context = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        await self.startup()
+        environ = build_environ(scope, await read_body(receive))
+        route = self.match(environ)
+        if route is not None and route[0] == STREAM_ENDPOINT:
+            if await self.in_own_session(self.serve_stream(environ, receive, send)):
+                return
+        elif route is not None:
+            if await self.in_own_session(self.serve(route[0], route[1], environ, send)):
+                return
+
+            # A native read leaves only its NDJSON export to the Flask application
+            await self.serve_by_wsgi(environ, send, self.export_executor)
+            return
+        await self.serve_by_wsgi(environ, send, self.executor)
+
+    '''
+    The following method is designed to answer the lifespan messages of the server.
+
+    :param object self: A must present keyword argument
+    :param function receive: The function which receives the messages
+    :param function send: The function which sends the messages
+    '''
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self.startup()
+                except Exception as error:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(error)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    '''
+    The following method is designed to prepare the application in the event loop, once (on the lifespan startup, or on
+    the first request if the server doesn't send lifespan messages).
+
+    :param object self: A must present keyword argument
+    '''
+    async def startup(self):
+        if self.starting is None:
+            self.starting = asyncio.ensure_future(self.open())
+        await self.starting
+
+    '''
+    The following method is designed to push the application context of the event loop, and open the connection pools
+    (of the primary, and of each replica).
+
+    :param object self: A must present keyword argument
+    '''
+    async def open(self):
+        # The queries are built in the event loop, which needs an application context. It is pushed once: a handler never
+        # waits while a request context is pushed, and each request builds its queries on its own session (see
+        # "in_own_session"), so the requests don't see each other.
+        self.context = self.app.app_context()
+        self.context.push()
+
+        # Work which needs a blocking connection is done once, before serving: the hooks of the first request (such as
+        # creating the tables, which a native request wouldn't trigger), and the checks of the schema
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(
+            self.executor, self.run_in_context, self.app.try_trigger_before_first_request_functions
+        )
+        if db.engine.dialect.name == 'sqlite':
+            from blueprints.buku.search import fts_table_exists
+            await loop.run_in_executor(self.executor, self.run_in_context, fts_table_exists)
+
+        pool_size = self.app.config['DB_POOL_SIZE'] + self.app.config['DB_MAX_OVERFLOW']
+        self.database = AsyncDatabase(
+            self.app.config['SQLALCHEMY_DATABASE_URI'], db.engine.dialect, pool_size, self.app.config['DB_POOL_RECYCLE']
+        )
+        await self.database.connect()
+        if 'replicas' in self.app.extensions:
+            for name in self.app.extensions['replicas'].names:
+                self.replicas[name] = AsyncDatabase(
+                    self.app.config['SQLALCHEMY_BINDS'][name], db.get_engine(self.app, bind = name).dialect, pool_size,
+                    self.app.config['DB_POOL_RECYCLE']
+                )
+                await self.replicas[name].connect()
+
+    '''
+    The following method is designed to run a function in an application context, from a thread of the pool.
+
+    :param object self: A must present keyword argument
+    :param function function: The function
+    :return: Return the result of the function
+    '''
+    def run_in_context(self, function):
+        with self.app.app_context():
+            return function()
+
+    '''
+    The following method is designed to serve a request on its own session of the application, which is removed once
+    the request is served. The requests served at once by the event loop run in the same thread, where the session
+    would otherwise be shared.
+
+    :param object self: A must present keyword argument
+    :param object coroutine: The coroutine which serves the request
+    :return: Return the result of the coroutine
+    '''
+    async def in_own_session(self, coroutine):
+        scope = session_scope.set(object())
+        try:
+            return await coroutine
+        finally:
+            db.session.remove()
+            session_scope.reset(scope)
+
+    '''
+    The following method is designed to close the connections, when the server stops.
+
+    :param object self: A must present keyword argument
+    '''
+    async def shutdown(self):
+        if self.database is not None:
+            await self.database.close()
+        for database in self.replicas.values():
+            await database.close()
+        self.executor.shutdown(wait = False)
+        self.export_executor.shutdown(wait = False)
+        if self.context is not None:
+            for bind in [None] + list(self.replicas):
+                db.get_engine(self.app, bind = bind).dispose()
+            self.context.pop()
+            self.context = None
+
+    '''
+    The following method is designed to find the native handler of a request.
+
+    :param object self: A must present keyword argument
+    :param dict environ: The WSGI environment of the request
+    :return: Return the endpoint and the arguments of the URL, or None if the request isn't served natively
+    '''
+    def match(self, environ):
+        if environ['REQUEST_METHOD'] != 'GET':
+            return None
+        try:
+            endpoint, view_args = self.app.url_map.bind_to_environ(
+                environ, server_name = self.app.config['SERVER_NAME']
+            ).match()
+        except HTTPException:
+            return None
+        if endpoint not in self.routes and endpoint != STREAM_ENDPOINT:
+            return None
+        return endpoint, view_args
+
+    '''
+    The following method is designed to serve a request with its native handler.
+
+    :param object self: A must present keyword argument
+    :param string endpoint: The endpoint of the request
+    :param dict view_args: The arguments of the URL
+    :param dict environ: The WSGI environment of the request
+    :param function send: The function which sends the messages of the response
+    :return: Return True if the request is served, or False if the handler leaves it to the Flask application
+    '''
+    async def serve(self, endpoint, view_args, environ, send):
+        handler, api = self.routes[endpoint]
+        started_at = time.perf_counter()
+        statements = [0, 0.0]
+        request_statements.set(statements)
+        blueprint = endpoint.rsplit('.', 1)[0] if '.' in endpoint else 'app'
+        requests_in_flight.inc((blueprint,))
+
+        # The reads are served by a replica, like on the synchronous path (see "blueprints/replicas.py")
+        req = self.app.request_class(environ)
+        replica = route_request(self.app.extensions['replicas'], req) if self.replicas else None
+        database = self.replicas.get(replica, self.database)
+        try:
+            result = await handler(database, req, **view_args)
+        except Exception as error:
+            result = error
+
+        # A read which failed on its replica is served again by the primary
+        if replica is not None and isinstance(result, database.dialect.dbapi.OperationalError):
+            self.app.extensions['replicas'].mark_down(replica)
+            read_on_primary()
+            try:
+                result = await handler(self.database, req, **view_args)
+            except Exception as error:
+                result = error
+        if result is None:
+            requests_in_flight.dec((blueprint,))
+            set_route(None, False)
+            return False
+
+        # Build the response like Flask-RESTful, then run the "after_request" hooks with the measurements of the request
+        # (the same values as the "before_request" hooks of the request logging and the metrics)
+        with self.app.request_context(environ):
+            g.request_started_at = started_at
+            g.metrics_started_at = started_at
+            g.sql_statements, g.sql_duration = statements
+            if isinstance(result, Exception):
+                response = api.handle_error(result)
+            elif isinstance(result, BaseResponse):
+                response = result
+            else:
+                data, code, headers = unpack(result)
+                response = api.make_response(data, code, headers = headers)
+            response = self.app.process_response(response)
+            body, status, headers = response.get_wsgi_response(environ)
+            body = b''.join(body)
+
+        # Compress it like the Flask application does, in the default executor of the event loop if the body is large
+        compression = self.app.extensions.get('compression')
+        if compression is not None:
+            compress = partial(compression.compress, environ, status, headers, [body])
+            if len(body) < self.app.config['COMPRESS_FLUSH_BYTES']:
+                status, headers, body = compress()
+            else:
+                status, headers, body = await asyncio.get_event_loop().run_in_executor(None, compress)
+            body = b''.join(body)
+        await start_response(send, status, headers)
+        await send({'type': 'http.response.body', 'body': body})
+        return True
+
+    '''
+    The following method is designed to serve the stream of the changes (see "blueprints/perubahan/stream.py"). The
+    client waits in a queue of the event loop, which the stream of the process fills; the changes it missed are read
+    from the primary database first, since a replica may not have all of them yet.
+
+    :param object self: A must present keyword argument
+    :param dict environ: The WSGI environment of the request
+    :param function receive: The function which receives the messages of the request
+    :param function send: The function which sends the messages of the response
+    :return: Return True if the request is served, or False if it is left to the Flask application (which answers an
+    invalid "Last-Event-ID")
+    '''
+    async def serve_stream(self, environ, receive, send):
+        try:
+            since = stream_position(self.app.request_class(environ))
+        except ValueError:
+            return False
+        stream = self.app.extensions['change_stream']
+        loop = asyncio.get_event_loop()
+        if not stream.started:
+            await loop.run_in_executor(self.executor, stream.start)
+        subscriber = Subscriber(loop)
+        position = stream.subscribe(subscriber)
+
+        # The headers pass through the "after_request" hooks (CORS, request logging, metrics), which measure the
+        # opening of the stream
+        requests_in_flight.inc(('buku',))
+        with self.app.request_context(environ):
+            g.request_started_at = g.metrics_started_at = time.perf_counter()
+            g.sql_statements, g.sql_duration = 0, 0.0
+            response = self.app.process_response(
+                Response(mimetype = 'text/event-stream', headers = STREAM_HEADERS)
+            )
+            status, headers = response.status, response.headers.to_wsgi_list()
+
+        disconnected = asyncio.ensure_future(receive())
+        try:
+            await start_response(send, status, headers)
+            await send({'type': 'http.response.body', 'body': RETRY, 'more_body': True})
+
+            # The changes the client missed, up to the ones the stream hands to it
+            last = position if since is None else since
+            while last < position:
+                changes, has_more = await run_async(self.database, read_changes(last, READ_SIZE))
+                changes = [change for change in changes if change.urutan <= position]
+                if not changes:
+                    break
+                chunk = b''.join([format_event(change) for change in changes])
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                last = changes[-1].urutan
+            last = max(last, position)
+
+            # The new changes, until the client is gone
+            while not disconnected.done():
+                waiting = asyncio.ensure_future(subscriber.events.get())
+                await asyncio.wait(
+                    [waiting, disconnected], timeout = stream.heartbeat_seconds, return_when = asyncio.FIRST_COMPLETED
+                )
+                if not waiting.done():
+                    waiting.cancel()
+                    if not disconnected.done():
+                        await send({'type': 'http.response.body', 'body': HEARTBEAT, 'more_body': True})
+                    continue
+                events = waiting.result()
+                if events is None:
+                    # The client is too far behind, it catches up from the feed when it reconnects
+                    await send({'type': 'http.response.body', 'body': b''})
+                    break
+                chunk, last = new_events(events, last)
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        finally:
+            stream.unsubscribe(subscriber)
+            disconnected.cancel()
+        return True
+
+    '''
+    The following method is designed to serve a request with the Flask application, in a thread of a pool. The whole
+    response is iterated by that thread (a streamed response keeps its request context and its connection in the
+    thread), and its chunks are handed to the event loop through a bounded queue, so a slow client holds the stream back.
+
+    :param object self: A must present keyword argument
+    :param dict environ: The WSGI environment of the request
+    :param function send: The function which sends the messages of the response
+    :param object executor: The pool of threads which serves the request
+    '''
+    async def serve_by_wsgi(self, environ, send, executor):
+        loop = asyncio.get_event_loop()
+        chunks = asyncio.Queue(maxsize = WSGI_QUEUE_SIZE)
+        stopped = threading.Event()
+        started = []
+
+        def start_wsgi_response(status, headers, exc_info = None):
+            started[:] = [status, headers]
+
+        def hand_over(chunk):
+            asyncio.run_coroutine_threadsafe(chunks.put(chunk), loop).result()
+
+        def run():
+            try:
+                iterable = self.app(environ, start_wsgi_response)
+                try:
+                    for chunk in iterable:
+                        if stopped.is_set():
+                            break
+                        hand_over(chunk)
+                finally:
+                    if hasattr(iterable, 'close'):
+                        iterable.close()
+            finally:
+                hand_over(None)
+
+        finished = loop.run_in_executor(executor, run)
+        try:
+            chunk = await chunks.get()
+            if not started:
+                await finished
+            await start_response(send, started[0], started[1])
+            while chunk is not None:
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await chunks.get()
+            await send({'type': 'http.response.body', 'body': b''})
+        except BaseException:
+            # The client is gone: stop the thread, and take the chunks it may still be handing over
+            stopped.set()
+            while chunk is not None:
+                chunk = await chunks.get()
+            raise
+        await finished
+
+'''
+The following function is designed to create the ASGI application.
+
+:param dict config: Configuration which overrides the one from the environment variables (see "create_app")
+:return: Return the ASGI application
+'''
+def create_asgi_app(config = None):
+    return AsgiApplication(create_app(config))
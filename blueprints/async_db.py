@@ -0,0 +1,182 @@
+# Import from standard libraries
+import asyncio
+import time
+from collections import namedtuple
+from contextvars import ContextVar
+from functools import lru_cache
+
+# Import from related third party
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.orm import Query
+
+# Import helpers
+from blueprints.metrics import sql_statements_total, sql_duration_total
+
+# Number of SQL statements and time spent in them by the current request of the asynchronous read path. Each request runs
+# in its own task, so each of them sees its own counters.
+request_statements = ContextVar('request_statements', default = None)
+
+'''
+The following function is designed to get the class of the rows of a query, so that a column can be read by its name
+(such as "row.id") like the rows returned by SQLAlchemy.
+
+:param tuple names: Names of the columns
+:return: Return the class
+'''
+@lru_cache(maxsize = 512)
+def row_class(names):
+    return namedtuple('Row', names, rename = True)
+
+'''
+The following class is designed to run the queries built with SQLAlchemy (the same queries as the synchronous
+resources) on an asynchronous driver: aiomysql for MySQL, and aiosqlite for SQLite. A query is compiled by the dialect of
+the engine of the application, so the SQL and the values of the columns are the same as on the synchronous path.
+'''
+class AsyncDatabase(object):
+    '''
+    :param string uri: URI of the database, as "SQLALCHEMY_DATABASE_URI"
+    :param object dialect: The dialect of the engine of the application
+    :param integer pool_size: Maximum number of connections
+    :param integer pool_recycle: Age (in seconds) after which a MySQL connection is replaced
+    '''
+    def __init__(self, uri, dialect, pool_size, pool_recycle):
+        self.url = make_url(uri)
+        self.dialect = dialect
+        self.pool_size = pool_size
+        self.pool_recycle = pool_recycle
+        self.pool = None
+        self.connections = None
+
+    '''
+    The following method is designed to open the connection pool. It must be called in the event loop which runs the
+    queries.
+
+    :param object self: A must present keyword argument
+    '''
+    async def connect(self):
+        if self.dialect.name == 'mysql':
+            import aiomysql
+            self.pool = await aiomysql.create_pool(
+                minsize = 1, maxsize = self.pool_size, pool_recycle = self.pool_recycle, autocommit = True,
+                host = self.url.host or 'localhost', port = self.url.port or 3306, user = self.url.username,
+                password = self.url.password or '', db = self.url.database,
+                charset = self.url.query.get('charset', 'utf8mb4')
+            )
+        elif self.dialect.name == 'sqlite':
+            import aiosqlite
+            self.connections = asyncio.Queue()
+            for index in range(self.pool_size):
+                connection = await aiosqlite.connect(self.url.database or ':memory:', isolation_level = None)
+                self.connections.put_nowait(connection)
+        else:
+            raise ValueError('Database ' + self.dialect.name + ' tidak didukung oleh jalur asinkron')
+
+    '''
+    The following method is designed to close all connections of the pool.
+
+    :param object self: A must present keyword argument
+    '''
+    async def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            await self.pool.wait_closed()
+            self.pool = None
+        if self.connections is not None:
+            while not self.connections.empty():
+                await self.connections.get_nowait().close()
+            self.connections = None
+
+    '''
+    The following method is designed to compile a query into the SQL and the parameters of the driver.
+
+    :param object self: A must present keyword argument
+    :param object query: The query (a "Query" or a "Select")
+    :return: Return the SQL, the parameters, the names of the columns, and the result processors of the columns
+    '''
+    def compile(self, query):
+        statement = query.statement if isinstance(query, Query) else query
+        compiled = statement.compile(dialect = self.dialect)
+        parameters = compiled.construct_params()
+        for name, processor in compiled._bind_processors.items():
+            if name in parameters:
+                parameters[name] = processor(parameters[name])
+        if compiled.positional:
+            parameters = tuple([parameters[name] for name in compiled.positiontup])
+
+        # The columns are converted the same way as the synchronous engine does (such as the timestamps of SQLite)
+        columns = list(statement.inner_columns)
+        names = tuple([getattr(column, 'key', None) or 'column_' + str(index) for index, column in enumerate(columns)])
+        processors = [column.type._cached_result_processor(self.dialect, None) for column in columns]
+        return compiled.string, parameters, names, processors
+
+    '''
+    The following method is designed to execute a SQL statement and fetch all its rows, on a connection of the pool.
+
+    :param object self: A must present keyword argument
+    :param string sql: The SQL
+    :param any parameters: The parameters, in the style of the driver
+    :return: Return the rows as tuples
+    '''
+    async def execute(self, sql, parameters):
+        if self.pool is not None:
+            async with self.pool.acquire() as connection:
+                async with connection.cursor() as cursor:
+                    await cursor.execute(sql, parameters)
+                    return await cursor.fetchall()
+        connection = await self.connections.get()
+        try:
+            async with connection.execute(sql, parameters) as cursor:
+                return await cursor.fetchall()
+        finally:
+            self.connections.put_nowait(connection)
+
+    '''
+    The following method is designed to run a query and get all its rows. The statement is counted in the metrics, and
+    in the counters of the current request.
+
+    :param object self: A must present keyword argument
+    :param object query: The query (a "Query" or a "Select")
+    :return: Return the rows, whose columns can be read by index or by name
+    '''
+    async def fetch_all(self, query):
+        sql, parameters, names, processors = self.compile(query)
+        started_at = time.perf_counter()
+        rows = await self.execute(sql, parameters)
+        elapsed = time.perf_counter() - started_at
+        sql_statements_total.inc()
+        sql_duration_total.inc(amount = elapsed)
+        statements = request_statements.get()
+        if statements is not None:
+            statements[0] += 1
+            statements[1] += elapsed
+
+        # Convert the values, then name the columns
+        row = row_class(names)
+        if any(processors):
+            return [
+                row(*[value if processor is None else processor(value) for processor, value in zip(processors, values)])
+                for values in rows
+            ]
+        return [row(*values) for values in rows]
+
+    '''
+    The following method is designed to do the same as "Query.first": run the query with "LIMIT 1" and get the row.
+
+    :param object self: A must present keyword argument
+    :param object query: The query
+    :return: Return the row, or None if there isn't any
+    '''
+    async def fetch_first(self, query):
+        rows = await self.fetch_all(query.limit(1))
+        return rows[0] if rows else None
+
+    '''
+    The following method is designed to do the same as "Query.one" for a query which always gives a single row, such as
+    an aggregate.
+
+    :param object self: A must present keyword argument
+    :param object query: The query
+    :return: Return the row
+    '''
+    async def fetch_one(self, query):
+        return (await self.fetch_all(query))[0]
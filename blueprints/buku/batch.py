@@ -0,0 +1,338 @@
+# Import from standard libraries
+from collections import OrderedDict
+from datetime import datetime
+
+# Import from related third party
+from blueprints import db
+from sqlalchemy import bindparam
+from sqlalchemy.exc import IntegrityError
+
+# Import models
+from blueprints.buku.model import Buku
+from blueprints.kategori.model import Kategori
+from blueprints.penulis_buku.model import PenulisBuku
+
+# Import helpers
+from blueprints.cache import load_writers
+from blueprints.buku.writer_names import join_writer_names
+from blueprints.perubahan.feed import CREATE, UPDATE, DELETE, record_changes
+from blueprints.response_cache import bump_generations
+
+# Maximum number of operations in one request, and number of operations applied in one transaction
+MAX_OPERATIONS = 5000
+CHUNK_SIZE = 500
+
+# Prefix of the temporary ISBN given to a book whose ISBN changes, while the books of a chunk are edited
+TEMPORARY_ISBN = 'sementara:'
+
+# Fields of a book which must be given when creating or updating it
+BOOK_FIELDS = ['id_kategori', 'judul', 'penerbit', 'nomor_isbn', 'id_penulis']
+
+'''
+The following function is designed to convert a value into an integer.
+
+:param any value: The value which should be converted
+:return: Return the integer, or None if the value isn't an integer
+'''
+def to_int(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+'''
+The following function is designed to validate the shape of an operation, without touching the database.
+
+:param any operation: One operation given by the user
+:return: Return the normalized operation, or a failure result if the operation is invalid
+'''
+def normalize_operation(operation):
+    if not isinstance(operation, dict) or operation.get('aksi') not in [CREATE, UPDATE, DELETE]:
+        return None, {'status': 400, 'pesan': 'Aksi harus berupa tambah, ubah, atau hapus'}
+    normalized = {'aksi': operation['aksi']}
+
+    # Book ID is needed to update and delete a book
+    if operation['aksi'] in [UPDATE, DELETE]:
+        normalized['id'] = to_int(operation.get('id'))
+        if normalized['id'] is None:
+            return None, {'status': 400, 'pesan': 'Nomor ID buku tidak valid'}
+    if operation['aksi'] == DELETE:
+        return normalized, None
+
+    # Check emptyness
+    for field in BOOK_FIELDS:
+        if operation.get(field) is None or operation.get(field) == '' or operation.get(field) == []:
+            return None, {'status': 400, 'pesan': 'Tidak boleh ada kolom yang dikosongkan'}
+    normalized['id_kategori'] = to_int(operation['id_kategori'])
+    if normalized['id_kategori'] is None:
+        return None, {'status': 400, 'pesan': 'Kategori dengan nomor ID ' + str(operation['id_kategori']) + ' tidak ada'}
+    for field in ['judul', 'penerbit', 'nomor_isbn']:
+        normalized[field] = str(operation[field])
+
+    # Writers, in the given order without duplicate
+    if not isinstance(operation['id_penulis'], list):
+        return None, {'status': 400, 'pesan': 'Kolom id_penulis harus berupa array'}
+    normalized['id_penulis'] = []
+    for writer_id in operation['id_penulis']:
+        normalized_id = to_int(writer_id)
+        if normalized_id is None:
+            return None, {'status': 400, 'pesan': 'Penulis dengan nomor ID ' + str(writer_id) + ' tidak ada'}
+        if normalized_id not in normalized['id_penulis']:
+            normalized['id_penulis'].append(normalized_id)
+    return normalized, None
+
+'''
+The following function is designed to validate all operations against the database. Each kind of reference (books,
+categories, writers, and ISBN) is checked for all operations at once, so the number of queries doesn't depend on the
+number of operations.
+
+:param list operations: Normalized operations (None for the operations which are already failed)
+:param list results: Result of each operation, which will be filled for the invalid operations
+'''
+def validate_operations(operations, results):
+    valid = [operation for operation in operations if operation is not None]
+    book_ids = set([operation['id'] for operation in valid if operation['aksi'] != CREATE])
+    category_ids = set([operation['id_kategori'] for operation in valid if operation['aksi'] != DELETE])
+    writer_ids = set([writer_id for operation in valid if operation['aksi'] != DELETE for writer_id in operation['id_penulis']])
+    isbns = set([operation['nomor_isbn'] for operation in valid if operation['aksi'] != DELETE])
+
+    # Query every kind of reference once. The writers are read (and locked) from the database, since their names are
+    # stored in the books.
+    existing_books = {}
+    if book_ids:
+        existing_books = dict(db.session.query(Buku.id, Buku.nomor_isbn).filter(Buku.id.in_(book_ids)).all())
+    existing_categories = set()
+    if category_ids:
+        existing_categories = set([row[0] for row in db.session.query(Kategori.id).filter(Kategori.id.in_(category_ids))])
+    existing_writers = load_writers(list(writer_ids), locked = True)
+    isbn_owners = {}
+    if isbns:
+        isbn_owners = dict(db.session.query(Buku.nomor_isbn, Buku.id).filter(Buku.nomor_isbn.in_(isbns)).all())
+
+    # Check each operation against the references, except the ISBN
+    used_book_ids = set()
+    for index, operation in enumerate(operations):
+        if operation is None:
+            continue
+        failure = None
+        if operation['aksi'] != CREATE:
+            if operation['id'] not in existing_books:
+                failure = {'status': 404, 'pesan': 'Buku dengan nomor ID ' + str(operation['id']) + ' tidak ditemukan'}
+            elif operation['id'] in used_book_ids:
+                failure = {'status': 409, 'pesan': 'Buku dengan nomor ID ' + str(operation['id']) + ' sudah diproses di operasi lain'}
+        if failure is None and operation['aksi'] != DELETE:
+            missing_writers = [writer_id for writer_id in operation['id_penulis'] if writer_id not in existing_writers]
+            if operation['id_kategori'] not in existing_categories:
+                failure = {'status': 400, 'pesan': 'Kategori dengan nomor ID ' + str(operation['id_kategori']) + ' tidak ada'}
+            elif missing_writers:
+                failure = {'status': 400, 'pesan': 'Penulis dengan nomor ID ' + str(missing_writers[0]) + ' tidak ada'}
+        if failure is not None:
+            operations[index] = None
+            results[index] = failure
+            continue
+        if operation['aksi'] != CREATE:
+            used_book_ids.add(operation['id'])
+            operation['nomor_isbn_lama'] = existing_books[operation['id']]
+
+    # Check the ISBN, then keep the names of the writers of the valid operations
+    for index, failure in check_isbns(operations, isbn_owners).items():
+        operations[index] = None
+        results[index] = failure
+    for operation in operations:
+        if operation is not None and operation['aksi'] != DELETE:
+            operation['nama_penulis'] = join_writer_names(
+                [existing_writers[writer_id]['nama'] for writer_id in operation['id_penulis']]
+            )
+
+'''
+The following function is designed to check that the ISBN of each created or edited book isn't used by another book.
+An ISBN may be taken from a book which another operation of the batch deletes or gives another ISBN (such as two books
+which swap their ISBN); the operation is then linked to that operation ("terkait"), so that both are applied in the same
+transaction. An operation which fails keeps the ISBN of its book, so the check is repeated until no operation fails.
+
+:param list operations: Normalized operations (None for the operations which are already failed)
+:param dict isbn_owners: A dictionary from ISBN to the ID of the book which has it, of the ISBN given in the operations
+:return: Return the failure of each operation whose ISBN is used by another book
+'''
+def check_isbns(operations, isbn_owners):
+    failures = {}
+    while True:
+        # ISBN given up by the operations which haven't failed
+        released_isbns = {}
+        for index, operation in enumerate(operations):
+            if operation is None or index in failures or operation['aksi'] == CREATE:
+                continue
+            if operation['aksi'] == DELETE or operation['nomor_isbn'] != operation['nomor_isbn_lama']:
+                released_isbns[operation['nomor_isbn_lama']] = index
+
+        # The first operation which asks for an ISBN gets it, if it is free or given up
+        used_isbns = set()
+        failed = False
+        for index, operation in enumerate(operations):
+            if operation is None or index in failures or operation['aksi'] == DELETE:
+                continue
+            owner = isbn_owners.get(operation['nomor_isbn'])
+            operation['terkait'] = None
+            if owner is not None and owner != operation.get('id'):
+                operation['terkait'] = released_isbns.get(operation['nomor_isbn'])
+            if (
+                (owner is not None and owner != operation.get('id') and operation['terkait'] is None)
+                or operation['nomor_isbn'] in used_isbns
+            ):
+                failures[index] = {'status': 409, 'pesan': 'Buku dengan nomor ISBN tersebut sudah ada di database'}
+                failed = True
+                continue
+            used_isbns.add(operation['nomor_isbn'])
+        if not failed:
+            return failures
+
+'''
+The following function is designed to split the valid operations into the chunks applied in one transaction each. The
+linked operations (see "check_isbns") are kept in the same chunk, which may then be a bit bigger than CHUNK_SIZE.
+
+:param list valid: Pairs of index and normalized operation, of the valid operations
+:return: Return the chunks, each of them is a list of pairs of index and normalized operation
+'''
+def split_into_chunks(valid):
+    # Group the linked operations, each group is named by one of its operations
+    parents = dict([(index, index) for index, operation in valid])
+    def root(index):
+        while parents[index] != index:
+            index = parents[index]
+        return index
+    for index, operation in valid:
+        if operation.get('terkait') is not None:
+            parents[root(index)] = root(operation['terkait'])
+    groups = OrderedDict()
+    for index, operation in valid:
+        groups.setdefault(root(index), []).append((index, operation))
+
+    # Fill each chunk with whole groups
+    chunks = [[]]
+    for group in groups.values():
+        if chunks[-1] and len(chunks[-1]) + len(group) > CHUNK_SIZE:
+            chunks.append([])
+        chunks[-1].extend(group)
+    return [chunk for chunk in chunks if chunk]
+
+'''
+The following function is designed to apply a chunk of valid operations in a single transaction, using one statement
+(executed with many parameters) for each kind of change.
+
+:param list chunk: Pairs of index and normalized operation
+:param list results: Result of each operation, which will be filled for the operations in the chunk
+'''
+def apply_chunk(chunk, results):
+    creates = [operation for index, operation in chunk if operation['aksi'] == CREATE]
+    updates = [operation for index, operation in chunk if operation['aksi'] == UPDATE]
+    deletes = [operation for index, operation in chunk if operation['aksi'] == DELETE]
+    book_table = Buku.__table__
+    book_writer_table = PenulisBuku.__table__
+    try:
+        # Remove the writers of the edited and deleted books, then the deleted books, whose ISBN can then be used by the
+        # other operations
+        changed_ids = [operation['id'] for operation in updates + deletes]
+        if changed_ids:
+            db.session.execute(book_writer_table.delete().where(book_writer_table.c.id_buku.in_(changed_ids)))
+        if deletes:
+            db.session.execute(book_table.delete().where(book_table.c.id.in_([operation['id'] for operation in deletes])))
+
+        # Edit the books. A book whose ISBN changes gets a temporary one first, so that the books can swap their ISBN
+        # without breaking the unique index in the middle of the statement.
+        renamed = [operation for operation in updates if operation['nomor_isbn'] != operation['nomor_isbn_lama']]
+        if renamed:
+            db.session.execute(
+                book_table.update().where(book_table.c.id == bindparam('b_id')).values(
+                    nomor_isbn = bindparam('b_nomor_isbn')
+                ),
+                [{'b_id': operation['id'], 'b_nomor_isbn': TEMPORARY_ISBN + str(operation['id'])} for operation in renamed]
+            )
+        if updates:
+            db.session.execute(
+                book_table.update().where(book_table.c.id == bindparam('b_id')).values(
+                    id_kategori = bindparam('b_id_kategori'), judul = bindparam('b_judul'),
+                    penerbit = bindparam('b_penerbit'), nomor_isbn = bindparam('b_nomor_isbn'),
+                    nama_penulis = bindparam('b_nama_penulis'), updated_at = bindparam('b_updated_at')
+                ),
+                [
+                    {
+                        'b_id': operation['id'], 'b_id_kategori': operation['id_kategori'], 'b_judul': operation['judul'],
+                        'b_penerbit': operation['penerbit'], 'b_nomor_isbn': operation['nomor_isbn'],
+                        'b_nama_penulis': operation['nama_penulis'],
+                        'b_updated_at': datetime.now()
+                    } for operation in updates
+                ]
+            )
+
+        # Create new books, then get their ID back by their (unique) ISBN
+        created_ids = {}
+        if creates:
+            db.session.execute(book_table.insert(), [
+                {
+                    'id_kategori': operation['id_kategori'], 'judul': operation['judul'],
+                    'penerbit': operation['penerbit'], 'nomor_isbn': operation['nomor_isbn'],
+                    'nama_penulis': operation['nama_penulis']
+                } for operation in creates
+            ])
+            created_ids = dict(db.session.query(Buku.nomor_isbn, Buku.id).filter(
+                Buku.nomor_isbn.in_([operation['nomor_isbn'] for operation in creates])
+            ).all())
+
+        # Insert the writers of the created and edited books
+        book_writers = [
+            {'id_buku': created_ids[operation['nomor_isbn']], 'id_penulis': writer_id}
+            for operation in creates for writer_id in operation['id_penulis']
+        ] + [
+            {'id_buku': operation['id'], 'id_penulis': writer_id}
+            for operation in updates for writer_id in operation['id_penulis']
+        ]
+        if book_writers:
+            db.session.execute(book_writer_table.insert(), book_writers)
+        record_changes('buku', CREATE, [created_ids[operation['nomor_isbn']] for operation in creates])
+        record_changes('buku', UPDATE, [operation['id'] for operation in updates])
+        record_changes('buku', DELETE, [operation['id'] for operation in deletes])
+        db.session.commit()
+    except IntegrityError:
+        # Another request changed the same data in the meantime
+        db.session.rollback()
+        for index, operation in chunk:
+            results[index] = {'status': 409, 'pesan': 'Operasi gagal karena data berubah saat diproses, silakan coba lagi'}
+        return
+
+    # The cached responses of the books are dropped as soon as the chunk is committed. The writers and the categories
+    # are only read by a batch (from the database, see "validate_operations"), so their caches stay valid.
+    bump_generations('buku')
+
+    # Fill the results
+    messages = {
+        CREATE: 'Sukses menambahkan buku', UPDATE: 'Sukses mengubah informasi buku', DELETE: 'Sukses menghapus buku'
+    }
+    for index, operation in chunk:
+        book_id = created_ids[operation['nomor_isbn']] if operation['aksi'] == CREATE else operation['id']
+        results[index] = {'status': 200, 'pesan': messages[operation['aksi']], 'id': book_id}
+
+'''
+The following function is designed to apply many book operations (create, update, and delete). All operations are
+validated first with a few queries, then the valid ones are applied in chunks, each chunk in its own transaction (see
+"split_into_chunks").
+
+:param list operations: Operations given by the user
+:return: Return the result of each operation, in the same order as the operations
+'''
+def apply_operations(operations):
+    results = [None] * len(operations)
+    normalized_operations = []
+    for index, operation in enumerate(operations):
+        normalized, failure = normalize_operation(operation)
+        normalized_operations.append(normalized)
+        if failure is not None:
+            results[index] = failure
+    validate_operations(normalized_operations, results)
+
+    # Apply the valid operations
+    valid = [(index, operation) for index, operation in enumerate(normalized_operations) if operation is not None]
+    for chunk in split_into_chunks(valid):
+        apply_chunk(chunk, results)
+    return results
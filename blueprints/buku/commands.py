@@ -0,0 +1,30 @@
+# Import from related third party
+from flask_script import Command, Option
+
+# Import helpers
+from blueprints.buku.writer_names import check_writer_names
+from blueprints.response_cache import bump_generations
+
+'''
+The following class is the management command which rebuilds (or only verifies) the writer names of all books, such as
+"python app.py nama-penulis" or "python app.py nama-penulis --verify".
+'''
+class WriterNamesCommand(Command):
+    option_list = (
+        Option('--verify', dest = 'verify', action = 'store_true', default = False,
+            help = 'Only check the writer names, without changing them'),
+    )
+
+    def run(self, verify):
+        checked, different_ids = check_writer_names(repair = not verify)
+        print('Buku yang diperiksa: ' + str(checked))
+        if verify:
+            print('Buku dengan nama penulis yang tidak sesuai: ' + str(len(different_ids)))
+            for book_id in different_ids[:100]:
+                print('  ' + str(book_id))
+            if different_ids:
+                raise SystemExit(1)
+        else:
+            print('Buku yang diperbaiki: ' + str(len(different_ids)))
+            if different_ids:
+                bump_generations('buku')
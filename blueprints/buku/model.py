@@ -4,6 +4,7 @@ from datetime import datetime, timedelta
 # Import from related third party
 from blueprints import db
 from flask_restful import fields
+from sqlalchemy import DDL, event
 
 # Import other models
 from blueprints.kategori.model import Kategori
@@ -14,13 +15,25 @@ The following class is used to make the model of "Buku" table.
 class Buku(db.Model):
     # Define the property (each property associated with a column in database)
     __tablename__ = 'buku'
+    __table_args__ = (
+        db.Index('uq_buku_nomor_isbn', 'nomor_isbn', unique = True),
+    )
     id = db.Column(db.Integer, primary_key = True, autoincrement = True)
     id_kategori = db.Column(db.Integer, db.ForeignKey('kategori.id'), nullable = False)
     judul = db.Column(db.String(255), nullable = False, default = '')
     penerbit = db.Column(db.String(255), nullable = False, default = '')
     nomor_isbn = db.Column(db.String(255), nullable = False, default = '')
-    created_at = db.Column(db.DateTime, default = datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-    updated_at = db.Column(db.DateTime, default = datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    created_at = db.Column(db.DateTime, default = datetime.now)
+    updated_at = db.Column(db.DateTime, default = datetime.now, onupdate = datetime.now)
+
+    # Names of the writers joined by comma (in the order of "PenulisBuku" records). It is kept in sync when the book or
+    # its writers change, so that reading a book doesn't need to look up its writers.
+    nama_penulis = db.Column(db.String(2000), nullable = False, default = '', server_default = '')
+
+    # Relationships to the category and the writers of the book. Writes to "PenulisBuku" are done explicitly,
+    # hence "viewonly".
+    kategori_buku = db.relationship('Kategori', viewonly = True)
+    penulis_buku = db.relationship('PenulisBuku', order_by = 'PenulisBuku.id', viewonly = True)
 
     # The following dictionary is used to serialize "Buku" instances into JSON form
     response_fields = {
@@ -44,4 +57,30 @@ class Buku(db.Model):
 
     # Reprsentative form to be shown in log
     def __repr__(self):
-        return "Title: " + self.judul
\ No newline at end of file
+        return "Title: " + self.judul
+
+# The full-text indexes of the search (see "blueprints/buku/search.py") are created with the table, the same way as the
+# migration "f126f4c042ec" does: FULLTEXT indexes on MySQL, and an FTS5 table kept in sync by triggers on SQLite
+FULLTEXT_DDL = {
+    'mysql': [
+        'CREATE FULLTEXT INDEX ft_buku_judul ON buku (judul)',
+        'CREATE FULLTEXT INDEX ft_buku_penerbit ON buku (penerbit)',
+    ],
+    'sqlite': [
+        "CREATE VIRTUAL TABLE buku_fts USING fts5(judul, penerbit, content='buku', content_rowid='id')",
+        "CREATE TRIGGER buku_fts_after_insert AFTER INSERT ON buku BEGIN "
+        "INSERT INTO buku_fts(rowid, judul, penerbit) VALUES (new.id, new.judul, new.penerbit); "
+        "END",
+        "CREATE TRIGGER buku_fts_after_delete AFTER DELETE ON buku BEGIN "
+        "INSERT INTO buku_fts(buku_fts, rowid, judul, penerbit) VALUES ('delete', old.id, old.judul, old.penerbit); "
+        "END",
+        "CREATE TRIGGER buku_fts_after_update AFTER UPDATE ON buku BEGIN "
+        "INSERT INTO buku_fts(buku_fts, rowid, judul, penerbit) VALUES ('delete', old.id, old.judul, old.penerbit); "
+        "INSERT INTO buku_fts(rowid, judul, penerbit) VALUES (new.id, new.judul, new.penerbit); "
+        "END",
+    ],
+}
+for dialect, statements in FULLTEXT_DDL.items():
+    for statement in statements:
+        event.listen(Buku.__table__, 'after_create', DDL(statement).execute_if(dialect = dialect))
+event.listen(Buku.__table__, 'after_drop', DDL('DROP TABLE IF EXISTS buku_fts').execute_if(dialect = 'sqlite'))
@@ -4,10 +4,11 @@ import math
 from datetime import datetime, timedelta, date
 
 # Import from related third party
-from blueprints import db, app
-from flask import Blueprint
+from blueprints import db
+from flask import Blueprint, Response, current_app, request, stream_with_context
 from flask_restful import Api, reqparse, Resource, marshal, inputs
-from sqlalchemy import desc
+from sqlalchemy import desc, false, func
+from sqlalchemy.exc import IntegrityError
 
 # Import models
 from blueprints.buku.model import Buku
@@ -15,10 +16,491 @@ from blueprints.penulis.model import Penulis
 from blueprints.kategori.model import Kategori
 from blueprints.penulis_buku.model import PenulisBuku
 
+# Import helpers
+from blueprints.pagination import (
+    DEFAULT_LIMIT, add_pagination_arguments, page_size, paginate, paginate_by_offset, iterate_in_batches
+)
+from blueprints.buku.search import search_books
+from blueprints.buku.batch import apply_operations, MAX_OPERATIONS
+from blueprints.cache import load_writers, read_categories, read_category_by_name
+from blueprints.conditional import conditional, latest_change, table_version, version_of_record
+from blueprints.buku.writer_names import join_writer_names
+from blueprints.integrity import is_duplicate
+from blueprints.serializers import add_fieldset_arguments, get_serializer, select_fields
+from blueprints.multiget import add_ids_argument, ids_requested, parse_ids, arrange_by_ids
+from blueprints.response_cache import cached_response, cached_response_async, bump_generations
+from blueprints.perubahan.feed import CREATE, UPDATE, DELETE, record_changes, read_changes
+from blueprints.perubahan.stream import STREAM_HEADERS, SYNC_RETRY_AFTER, stream_position
+from blueprints.perubahan.model import Perubahan
+from blueprints.reads import async_handler, fetch_all, fetch_first, run
+
 # Creating blueprint
 bp_buku = Blueprint('buku', __name__)
 api = Api(bp_buku)
 
+# Number of books read in one query when streaming the books as NDJSON
+NDJSON_BATCH_SIZE = 500
+
+# Relations which can be included in a book by "include" argument
+BOOK_INCLUDES = ['penulis', 'kategori']
+
+# Resources which the responses of the books are built from (see "blueprints/response_cache.py")
+BOOK_RESOURCES = ('buku', 'penulis', 'kategori')
+
+# Criteria of the unified search, each of them is optional
+SEARCH_CRITERIA = ['judul', 'penulis', 'kategori', 'penerbit']
+
+# Serializer of the rows of "book_rows" query, which gives the same JSON form as "format_book"
+book_serializer = get_serializer(Buku, (('penulis', Buku.nama_penulis),), None, (Buku.id,))
+
+'''
+The following function is designed to format a book, including its writers, into JSON form.
+The writers are taken from "nama_penulis" column, so formatting a book doesn't need any additional query.
+
+:param object book: An instance of "Buku" class
+:return: Return a dictionary which represents the book
+'''
+def format_book(book):
+    formatted_book = marshal(book, Buku.response_fields)
+    formatted_book['penulis'] = book.nama_penulis
+    return formatted_book
+
+'''
+The following function is designed to get the serializer of the books for the fields ("fields" argument) and the
+relations ("include" argument) asked by the client. Without "fields", a book has all its fields and its writer names.
+
+:param dict args: Parsed arguments which contain "fields" and "include"
+:return: Return the serializer, or raise ValueError with a message for the client if a name isn't valid
+'''
+def book_selection(args):
+    keys, included = select_fields(args, Buku, BOOK_INCLUDES)
+    if keys is None and 'penulis' not in included:
+        included.insert(0, 'penulis')
+    extra_fields = []
+    if 'penulis' in included:
+        extra_fields.append(('penulis', Buku.nama_penulis))
+    if 'kategori' in included:
+        extra_fields.append(('kategori', Kategori.kategori))
+    return get_serializer(Buku, tuple(extra_fields), keys, (Buku.id,))
+
+'''
+The following function is designed to make a query of books which only reads the columns shown in JSON form, as plain
+rows (without ORM objects). The category is only joined when its name is shown.
+
+:param object serializer: The serializer which formats the rows
+:return: Return the query
+'''
+def book_rows(serializer = book_serializer):
+    books = db.session.query(*serializer.columns).select_from(Buku)
+    if 'kategori' in serializer.keys:
+        books = books.outerjoin(Kategori, Kategori.id == Buku.id_kategori)
+    return books
+
+'''
+The following function is designed to find all writers of the given IDs in a single query, for a write which stores
+their names in a book. They are read from the database (not the cache, which may hold a writer renamed by another
+process), and locked until the commit, so a rename can't come between.
+
+:param list writer_ids: IDs of the writers
+:return: Return the writers in JSON form (in the given order, without duplicate) and the first ID which doesn't exist
+(None if all exist)
+'''
+def find_writers(writer_ids):
+    # Normalize the IDs, an ID which isn't a number can't exist
+    normalized_ids = []
+    for writer_id in writer_ids:
+        try:
+            normalized_id = int(writer_id)
+        except (TypeError, ValueError):
+            return [], writer_id
+        if normalized_id not in normalized_ids:
+            normalized_ids.append(normalized_id)
+
+    # Get all of them at once
+    found_writers = load_writers(normalized_ids, locked = True)
+    for writer_id in normalized_ids:
+        if writer_id not in found_writers:
+            return [], writer_id
+    return [found_writers[writer_id] for writer_id in normalized_ids], None
+
+'''
+The following function is designed to insert the records of "PenulisBuku" table of a book, all of them in one statement.
+It doesn't commit, so that it can be a part of a bigger transaction.
+
+:param integer book_id: ID of the book
+:param list writers: The writers of the book
+'''
+def insert_book_writers(book_id, writers):
+    db.session.execute(
+        PenulisBuku.__table__.insert(),
+        [{'id_buku': book_id, 'id_penulis': writer['id']} for writer in writers]
+    )
+
+'''
+The following function is designed to get the resources which are a part of the version of all books. The writers are a
+part of the books in JSON form, so they are a part of the version too, and so are the categories when included.
+
+:param dict args: Arguments of the request, which may contain "include"
+:return: Return the resources
+'''
+def books_version_resources(args):
+    if 'kategori' in args.get('include', ''):
+        return BOOK_RESOURCES
+    return ('buku', 'penulis')
+
+'''
+The following function is designed to compute the version of all books, used for conditional requests.
+
+:param object req: The request
+:return: Return the version and the last modified time of the books
+'''
+def books_version(req):
+    return (yield from table_version(*books_version_resources(req.args)))
+
+'''
+The following function is designed to make the query which computes the version of a book in a single row: the latest
+change of the book (which includes a change of its writers), of its writers, and of its category.
+
+:param integer book_id: ID of the book
+:return: Return the query
+'''
+def book_version_query(book_id):
+    writer_ids = db.session.query(PenulisBuku.id_penulis).filter(PenulisBuku.id_buku == Buku.id).correlate(Buku)
+    return db.session.query(
+        Buku.id, *(
+            latest_change('buku', Perubahan.id_data == Buku.id)
+            + latest_change('penulis', Perubahan.id_data.in_(writer_ids))
+            + latest_change('kategori', Perubahan.id_data == Buku.id_kategori)
+        )
+    ).filter(Buku.id == book_id)
+
+'''
+The following function is designed to compute the version of a book in a single query, used for conditional requests.
+
+:param object req: The request
+:param integer book_id: ID of the book
+:return: Return the version and the last modified time of the book, or None if the book doesn't exist
+'''
+def book_version(req, book_id):
+    return version_of_record(book_id, (yield fetch_first(book_version_query(book_id))))
+
+'''
+The following function is designed to compute the version of the books and the categories, used for conditional
+requests of the endpoints which filter by category.
+
+:param object req: The request
+:return: Return the version and the last modified time of the books and the categories
+'''
+def books_and_categories_version(req):
+    return (yield from table_version(*BOOK_RESOURCES))
+
+'''
+The following function is designed to filter books which have a writer whose name contains the given name.
+
+:param object books: The query of the books which should be filtered
+:param string name: The name given by the user
+:return: Return the filtered query
+'''
+def filter_by_writer(books, name):
+    related_book_ids = db.session.query(PenulisBuku.id_buku).join(
+        Penulis, PenulisBuku.id_penulis == Penulis.id
+    ).filter(Penulis.nama.like("%" + name + "%"))
+    return books.filter(Buku.id.in_(related_book_ids))
+
+'''
+The following function is designed to make the aggregate query of the facets of the search, which counts the books of
+each pair of category and publisher.
+
+:param object books: The query of the books which match the title and writer criteria
+:return: Return the query
+'''
+def facet_query(books):
+    return books.with_entities(Buku.id_kategori, Buku.penerbit, func.count(Buku.id)).order_by(None).group_by(
+        Buku.id_kategori, Buku.penerbit
+    )
+
+'''
+The following function is designed to count the books of each category and of each publisher (the facets of the search),
+from the rows of "facet_query". Each facet ignores its own criterion but follows the other one, so the client sees how
+many books every other choice would give.
+
+:param list groups: The rows of "facet_query"
+:param dict args: Parsed arguments which contain "kategori" and "penerbit"
+:param dict category: The category given by the client (None if not given, or if it doesn't exist)
+:return: Return the number of books of each category ID and of each publisher
+'''
+def tally_facets(groups, args, category):
+    category_given = args['kategori'] != '' and args['kategori'] is not None
+    publisher_given = args['penerbit'] != '' and args['penerbit'] is not None
+    category_counts = {}
+    publisher_counts = {}
+    for category_id, publisher, count in groups:
+        if not publisher_given or publisher == args['penerbit']:
+            category_counts[category_id] = category_counts.get(category_id, 0) + count
+        if not category_given or (category is not None and category_id == category['id']):
+            publisher_counts[publisher] = publisher_counts.get(publisher, 0) + count
+    return category_counts, publisher_counts
+
+'''
+The following function is designed to format the facets of the search, the biggest number first.
+
+:param dict category_counts: The number of books of each category ID
+:param dict publisher_counts: The number of books of each publisher
+:param dict categories: A dictionary from ID to the category in JSON form
+:return: Return the facets in JSON form
+'''
+def format_facets(category_counts, publisher_counts, categories):
+    category_facets = [
+        {
+            'id': category_id, 'jumlah': count,
+            'kategori': categories[category_id]['kategori'] if category_id in categories else None
+        } for category_id, count in category_counts.items()
+    ]
+    publisher_facets = [{'penerbit': publisher, 'jumlah': count} for publisher, count in publisher_counts.items()]
+    return {
+        'kategori': sorted(category_facets, key = lambda facet: (-facet['jumlah'], facet['id'] or 0)),
+        'penerbit': sorted(publisher_facets, key = lambda facet: (-facet['jumlah'], facet['penerbit'] or ''))
+    }
+
+'''
+The following function is designed to count the facets of the search, with a single aggregate query grouped by category
+and publisher, in a read handler. Names of the categories are taken from the cache.
+
+:param object books: The query of the books which match the title and writer criteria
+:param dict args: Parsed arguments which contain "kategori" and "penerbit"
+:param dict category: The category given by the client (None if not given, or if it doesn't exist)
+:return: Return the facets in JSON form
+'''
+def count_facets(books, args, category):
+    groups = yield fetch_all(facet_query(books))
+    category_counts, publisher_counts = tally_facets(groups, args, category)
+    categories = yield from read_categories([category_id for category_id in category_counts if category_id is not None])
+    return format_facets(category_counts, publisher_counts, categories)
+
+'''
+The following function is designed to check whether the client asks for the NDJSON (one JSON per line) format,
+either by "format=ndjson" query string or by "Accept: application/x-ndjson" header.
+
+:param object req: The request
+:return: Return True if NDJSON is requested, or False otherwise
+'''
+def ndjson_requested(req):
+    if req.args.get('format') == 'ndjson':
+        return True
+    return req.accept_mimetypes.best_match(['application/json', 'application/x-ndjson']) == 'application/x-ndjson'
+
+'''
+The following function is designed to stream books as NDJSON. Books are read in batches of a constant size (each batch
+loads its writers in one query) and written to the response one line at a time, so the memory usage doesn't grow with
+the size of the catalog.
+
+:param object books: The query of the books which should be streamed
+:param object serializer: The serializer which formats the rows
+:return: Return a streamed response
+'''
+def stream_books(books, serializer = book_serializer):
+    def generate():
+        for book in iterate_in_batches(books, Buku.id, NDJSON_BATCH_SIZE):
+            yield json.dumps(serializer(book)) + '\n'
+    return Response(stream_with_context(generate()), mimetype = 'application/x-ndjson')
+
+'''
+The following function is designed to get all available books, in a read handler (see "blueprints/reads.py").
+
+:param object req: The request
+:return: Return all available books (one page of them if "limit" or "cursor" is given, or as an NDJSON stream), or the
+books of the given "ids" in the given order
+'''
+@conditional(books_version)
+def list_books(req):
+    # Take input from user
+    parser = add_fieldset_arguments(add_pagination_arguments(reqparse.RequestParser()), include = True)
+    add_ids_argument(parser)
+    parser.add_argument('format', location = 'args', required = False)
+    args = parser.parse_args(req = req)
+    try:
+        serializer = book_selection(args)
+        book_ids = parse_ids(args['ids']) if ids_requested(args) else None
+    except ValueError as error:
+        return {'pesan': str(error)}, 400
+
+    # Query the given books at once, and show them in the given order
+    books = book_rows(serializer)
+    if book_ids is not None:
+        found_books = (yield fetch_all(books.filter(Buku.id.in_(set(book_ids))))) if book_ids else []
+        return arrange_by_ids(book_ids, dict([(book.id, serializer(book)) for book in found_books])), 200
+
+    # Query all available books, formatting the result and show it (an NDJSON stream is only served by the Flask
+    # application, see "handlers")
+    if ndjson_requested(req):
+        return stream_books(books, serializer)
+    return (yield from paginate(books, Buku.id, args, serializer))
+
+'''
+The following function is designed to get a book by ID, in a read handler.
+
+:param object req: The request
+:param integer book_id: ID of the book
+:return: Return all information of specified book
+'''
+@conditional(book_version, single_record = True)
+def get_book(req, book_id):
+    # Take input from user
+    parser = add_fieldset_arguments(reqparse.RequestParser(), include = True)
+    args = parser.parse_args(req = req)
+    try:
+        serializer = book_selection(args)
+    except ValueError as error:
+        return {'pesan': str(error)}, 400
+
+    # Query related book
+    book = yield fetch_first(book_rows(serializer).filter(Buku.id == book_id))
+    if book is None:
+        return {'pesan': 'Buku yang kamu cari tidak ditemukan'}, 404
+    return serializer(book), 200
+
+'''
+The following function is designed to get all books based on title, in a read handler.
+
+:param object req: The request
+:return: Return all books based on the title given, ordered by relevance
+'''
+@conditional(books_version)
+def get_books_by_title(req):
+    # Take input from user
+    parser = add_fieldset_arguments(add_pagination_arguments(reqparse.RequestParser()), include = True)
+    parser.add_argument('judul', location = 'args', required = False)
+    args = parser.parse_args(req = req)
+    try:
+        serializer = book_selection(args)
+    except ValueError as error:
+        return {'pesan': str(error)}, 400
+
+    # Filter the book using full-text index, and order them by relevance
+    books = book_rows(serializer)
+    if args['judul'] != '' and args['judul'] is not None:
+        books = search_books(books, 'judul', args['judul'])
+        return (yield from paginate_by_offset(books, args, serializer))
+
+    # Formatting the result and show it
+    return (yield from paginate(books, Buku.id, args, serializer))
+
+'''
+The following function is designed to get all books based on writer name, in a read handler.
+
+:param object req: The request
+:return: Return all books based on the writer name given
+'''
+@conditional(books_version)
+def get_books_by_writer(req):
+    # Take input from user
+    parser = add_fieldset_arguments(add_pagination_arguments(reqparse.RequestParser()), include = True)
+    parser.add_argument('penulis', location = 'args', required = False)
+    args = parser.parse_args(req = req)
+    try:
+        serializer = book_selection(args)
+    except ValueError as error:
+        return {'pesan': str(error)}, 400
+
+    # Search related books, through the writers whose name match the given name
+    books = book_rows(serializer).filter(false())
+    if args['penulis'] != '' and args['penulis'] is not None:
+        books = filter_by_writer(book_rows(serializer), args['penulis'])
+
+    # Formatting the result and show it
+    return (yield from paginate(books, Buku.id, args, serializer))
+
+'''
+The following function is designed to get all books based on category, in a read handler.
+
+:param object req: The request
+:return: Return all books based on the category given
+'''
+@conditional(books_and_categories_version)
+def get_books_by_category(req):
+    # Take input from user
+    parser = add_fieldset_arguments(add_pagination_arguments(reqparse.RequestParser()), include = True)
+    parser.add_argument('kategori', location = 'args', required = False)
+    args = parser.parse_args(req = req)
+    try:
+        serializer = book_selection(args)
+    except ValueError as error:
+        return {'pesan': str(error)}, 400
+
+    # Filter the book
+    books = book_rows(serializer)
+    if args['kategori'] != '' and args['kategori'] is not None:
+        category = yield from read_category_by_name(args['kategori'])
+        if category is None:
+            books = books.filter(false())
+        else:
+            books = books.filter(Buku.id_kategori == category['id'])
+
+    # Formatting the result and show it, the given category is shown unless only some fields are asked
+    if 'kategori' in serializer.keys or (args['fields'] != '' and args['fields'] is not None):
+        return (yield from paginate(books, Buku.id, args, serializer))
+    def format_book_with_category(book):
+        book = serializer(book)
+        book["kategori"] = args['kategori']
+        return book
+    return (yield from paginate(books, Buku.id, args, format_book_with_category))
+
+'''
+The following function is designed to get the books which match all the given criteria in one query, in a read handler.
+Each criterion is optional: "judul" uses the full-text index and orders the books by relevance, "penulis" matches a part
+of a writer name, while "kategori" and "penerbit" match the exact name (as shown in the facets).
+
+:param object req: The request
+:return: Return one page of the matching books, and the number of matching books of each category and publisher
+'''
+@conditional(books_and_categories_version)
+def search_catalogue(req):
+    # Take input from user
+    parser = add_fieldset_arguments(add_pagination_arguments(reqparse.RequestParser()), include = True)
+    for criterion in SEARCH_CRITERIA:
+        parser.add_argument(criterion, location = 'args', required = False)
+    args = parser.parse_args(req = req)
+    try:
+        serializer = book_selection(args)
+    except ValueError as error:
+        return {'pesan': str(error)}, 400
+
+    # The search is always paginated
+    if args['limit'] is None:
+        args['limit'] = DEFAULT_LIMIT
+
+    # Criteria on title and writer, which are shared by the books and the facets
+    def filter_by_text(books):
+        if args['penulis'] != '' and args['penulis'] is not None:
+            books = filter_by_writer(books, args['penulis'])
+        if args['judul'] != '' and args['judul'] is not None:
+            books = search_books(books, 'judul', args['judul'])
+        return books
+
+    # Criteria on category and publisher
+    books = filter_by_text(book_rows(serializer))
+    category = None
+    if args['kategori'] != '' and args['kategori'] is not None:
+        category = yield from read_category_by_name(args['kategori'])
+        if category is None:
+            books = books.filter(false())
+        else:
+            books = books.filter(Buku.id_kategori == category['id'])
+    if args['penerbit'] != '' and args['penerbit'] is not None:
+        books = books.filter(Buku.penerbit == args['penerbit'])
+
+    # Take one page of the books, ordered by relevance when searching by title
+    if args['judul'] != '' and args['judul'] is not None:
+        result, status = yield from paginate_by_offset(books, args, serializer)
+    else:
+        result, status = yield from paginate(books, Buku.id, args, serializer)
+    if status != 200:
+        return result, status
+
+    # Count the facets and show the result
+    result['facet'] = yield from count_facets(filter_by_text(db.session.query(Buku.id)), args, category)
+    return result, 200
+
 '''
 The following class is designed to create new book and get all available books.
 '''
@@ -33,34 +515,13 @@ class BookResource(Resource):
         return {'status': 'ok'}, 200
     
     '''
-    The following method is designed to get all available books.
+    The following method is designed to get all available books (see "list_books").
 
     :param object self: A must present keyword argument
     :return: Return all available books
     '''
     def get(self):
-        # Query all available books
-        books = Buku.query
-
-        # Formatting the result and show it
-        available_books = []
-        for book in books:
-            book = marshal(book, Buku.response_fields)
-
-            # Search the writers of the book
-            writers = []
-            book_writer_id = PenulisBuku.query.filter_by(id_buku = book['id'])
-            for writer_id in book_writer_id:
-                writer = Penulis.query.filter_by(id = writer_id.id_penulis).first()
-                writer_name = writer.nama
-                writers.append(writer_name)
-            
-            # Formatting the writers
-            writers = ", ".join(writers)
-            book["penulis"] = writers
-
-            available_books.append(book)
-        return available_books, 200
+        return run(list_books(request))
     
     '''
     The following method is designed to post new book.
@@ -88,37 +549,34 @@ class BookResource(Resource):
         ):
             return {'pesan': 'Tidak boleh ada kolom yang dikosongkan'}, 400
         
-        # Check duplicate ISBN
-        duplicate_isbn = Buku.query.filter_by(nomor_isbn = args['nomor_isbn']).first()
-        if duplicate_isbn is not None:
-            return {'pesan': 'Buku dengan nomor ISBN tersebut sudah ada di database'}, 409
-        
-        # ----- Create new record in database -----
-        # Table "Buku"
+        # Check the existence of the writers (all of them in one query)
+        writers, missing_writer_id = find_writers(args['id_penulis'])
+        if missing_writer_id is not None:
+            return {'pesan': 'Penulis dengan nomor ID ' + str(missing_writer_id) + ' tidak ada'}, 400
+
+        # ----- Create new record in database, in a single transaction -----
+        # Table "Buku", whose unique index rejects a duplicate ISBN
         new_book = Buku(
             args['id_kategori'], args['judul'], args['penerbit'], args['nomor_isbn']
         )
+        new_book.nama_penulis = join_writer_names([writer['nama'] for writer in writers])
         db.session.add(new_book)
-        db.session.commit()
-        new_book = marshal(new_book, Buku.response_fields)
-        new_book['penulis'] = []
+        try:
+            db.session.flush()
+        except IntegrityError as error:
+            db.session.rollback()
+            if is_duplicate(error, Buku, 'uq_buku_nomor_isbn'):
+                return {'pesan': 'Buku dengan nomor ISBN tersebut sudah ada di database'}, 409
+            raise
 
         # Table "PenulisBuku"
-        for writer_id in args['id_penulis']:
-            # Check whether the id exists or not
-            related_writer = Penulis.query.filter_by(id = writer_id).first()
-            if related_writer is None:
-                return {'pesan': 'Penulis dengan nomor ID ' + writer_id + ' tidak ada'}, 400
-            new_book['penulis'].append(related_writer.nama)
-
-            # Create the record
-            new_book_writer = PenulisBuku(new_book['id'], writer_id)
-            db.session.add(new_book_writer)
-            db.session.commit()
+        insert_book_writers(new_book.id, writers)
+        record_changes('buku', CREATE, [new_book])
+        db.session.commit()
+        bump_generations('buku')
         
         # Return the result
-        new_book['penulis'] = ", ".join(new_book['penulis'])
-        return {'pesan': 'Sukses menambahkan buku', 'buku_baru': new_book}, 200
+        return {'pesan': 'Sukses menambahkan buku', 'buku_baru': format_book(new_book)}, 200
     
 '''
 The following class is designed to provide CRUD functionality of books based on the given book ID.
@@ -135,29 +593,15 @@ class BookResourceById(Resource):
         return {'status': 'ok'}, 200
     
     '''
-    The following method is designed to get a book by ID.
+    The following method is designed to get a book by ID (see "get_book").
 
     :param object self: A must present keyword argument
     :param integer book_id:
     :return: Return all information of specified book
     '''
+    @cached_response(*BOOK_RESOURCES)
     def get(self, book_id):
-        # Query related book
-        book = Buku.query.filter_by(id = book_id).first()
-        if book is None:
-            return {'pesan': 'Buku yang kamu cari tidak ditemukan'}, 404
-        book = marshal(book, Buku.response_fields)
-
-        # Search for the writer of the book
-        book_writers = PenulisBuku.query.filter_by(id_buku = book_id)
-        writers = []
-        for book_writer in book_writers:
-            writer = Penulis.query.filter_by(id = book_writer.id_penulis).first()
-            writers.append(writer.nama)
-        writers = ", ".join(writers)
-        book['penulis'] = writers
-
-        return book, 200
+        return run(get_book(request, book_id))
     
     '''
     The following method is designed to edit a book.
@@ -186,51 +630,41 @@ class BookResourceById(Resource):
         ):
             return {'pesan': 'Tidak boleh ada kolom yang dikosongkan'}, 400
         
-        # Check duplicate ISBN
-        related_book = Buku.query.filter_by(id = book_id).first()
-        duplicate_isbn = Buku.query.filter_by(nomor_isbn = args['nomor_isbn']).first()
-        if duplicate_isbn is not None and duplicate_isbn.nomor_isbn != related_book.nomor_isbn:
-            return {'pesan': 'Buku dengan nomor ISBN tersebut sudah ada di database'}, 409
-        
-        # ----- Edit record in database -----
         # Search for the book
+        related_book = Buku.query.filter_by(id = book_id).first()
         if related_book is None:
             return {'pesan': 'Buku yang ingin kamu edit tidak ditemukan'}, 404
 
-        # Check the existence of writer
-        writers = []
-        for writer_id in args['id_penulis']:
-            # Check whether the id exists or not
-            related_writer = Penulis.query.filter_by(id = writer_id).first()
-            if related_writer is None:
-                return {'pesan': 'Penulis dengan nomor ID ' + writer_id + ' tidak ada'}, 400
-            writers.append(related_writer.nama)
-        writers = ", ".join(writers)
-        
-        # Edit the record in "Buku" table
+        # Check the existence of the writers (all of them in one query)
+        writers, missing_writer_id = find_writers(args['id_penulis'])
+        if missing_writer_id is not None:
+            return {'pesan': 'Penulis dengan nomor ID ' + str(missing_writer_id) + ' tidak ada'}, 400
+
+        # ----- Edit record in database, in a single transaction -----
+        # Edit the record in "Buku" table, whose unique index rejects an ISBN of another book
         related_book.id_kategori = args['id_kategori']
         related_book.judul = args['judul']
         related_book.penerbit = args['penerbit']
         related_book.nomor_isbn = args['nomor_isbn']
-        related_book.updated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        related_book.nama_penulis = join_writer_names([writer['nama'] for writer in writers])
+        related_book.updated_at = datetime.now()
+        try:
+            db.session.flush()
+        except IntegrityError as error:
+            db.session.rollback()
+            if is_duplicate(error, Buku, 'uq_buku_nomor_isbn'):
+                return {'pesan': 'Buku dengan nomor ISBN tersebut sudah ada di database'}, 409
+            raise
+
+        # Replace the old records in "PenulisBuku" table
+        PenulisBuku.query.filter_by(id_buku = related_book.id).delete(synchronize_session = False)
+        insert_book_writers(related_book.id, writers)
+        record_changes('buku', UPDATE, [related_book])
         db.session.commit()
-
-        # Remove the old record in "PenulisBuku" table
-        old_book_writers = PenulisBuku.query.filter_by(id_buku = book_id)
-        for old_book_writer in old_book_writers:
-            db.session.delete(old_book_writer)
-            db.session.commit()
-        
-        # Add new record in "PenulisBuku" table
-        for writer_id in args['id_penulis']:
-            new_record = PenulisBuku(book_id, writer_id)
-            db.session.add(new_record)
-            db.session.commit()
+        bump_generations('buku')
 
         # Return the result
-        related_book = marshal(related_book, Buku.response_fields)
-        related_book['penulis'] = writers
-        return {'pesan': 'Sukses mengubah informasi buku', 'buku': related_book}, 200
+        return {'pesan': 'Sukses mengubah informasi buku', 'buku': format_book(related_book)}, 200
     
     '''
     The following method is designed to delete a book.
@@ -244,30 +678,21 @@ class BookResourceById(Resource):
         book = Buku.query.filter_by(id = book_id).first()
         if book is None:
             return {'pesan': 'Buku yang kamu ingin hapus tidak ditemukan'}, 404
-        deleted_book = marshal(book, Buku.response_fields)
-
-        # Search for the writers of the book
-        writers = []
-        related_book_writers = PenulisBuku.query.filter_by(id_buku = book_id)
-        for related_book_writer in related_book_writers:
-            related_writer = Penulis.query.filter_by(id = related_book_writer.id_penulis).first()
-            writers.append(related_writer.nama)
-        writers = ", ".join(writers)
-        deleted_book["penulis"] = writers
-
-        # Delete all related records
-        for related_book_writer in related_book_writers:
-            db.session.delete(related_book_writer)
-            db.session.commit()
+        deleted_book = format_book(book)
+
+        # Delete all related records, in a single transaction
+        PenulisBuku.query.filter_by(id_buku = book.id).delete(synchronize_session = False)
         db.session.delete(book)
+        record_changes('buku', DELETE, [deleted_book['id']])
         db.session.commit()
+        bump_generations('buku')
 
         return {'pesan': 'Sukses menghapus buku', 'buku': deleted_book}, 200
 
 '''
-The following class is designed to get all books based on title.
+The following class is designed to create, edit, and delete many books in one request.
 '''
-class BookResourceByTitle(Resource):
+class BookBatchResource(Resource):
     '''
     The following method is designed to prevent CORS.
 
@@ -276,43 +701,55 @@ class BookResourceByTitle(Resource):
     '''
     def options(self):
         return {'status': 'ok'}, 200
-    
+
     '''
-    The following method is designed to get all books based on title.
+    The following method is designed to apply many operations to books. Each operation has "aksi" key ("tambah", "ubah",
+    or "hapus"), "id" key for "ubah" and "hapus", and the same keys as the body of POST /buku for "tambah" and "ubah".
 
     :param object self: A must present keyword argument
-    :return: Return all books based on the title given
+    :return: Return the result (status code and message) of each operation, in the same order as the operations
     '''
-    def get(self):
-        # Take input from user
+    def post(self):
+        # Take input from users
         parser = reqparse.RequestParser()
-        parser.add_argument('judul', location = 'args', required = False)
+        parser.add_argument('operasi', location = 'json', required = True, type = list)
         args = parser.parse_args()
 
-        # Filter the book
-        books = Buku.query
-        if args['judul'] != '' and args['judul'] is not None:
-            books = books.filter(Buku.judul.like("%" + args['judul'] + "%"))
+        # Check emptyness and size
+        if args['operasi'] == [] or args['operasi'] is None:
+            return {'pesan': 'Tidak boleh ada kolom yang dikosongkan'}, 400
+        if len(args['operasi']) > MAX_OPERATIONS:
+            return {'pesan': 'Jumlah operasi tidak boleh lebih dari ' + str(MAX_OPERATIONS)}, 400
 
-        # Formatting the result and show it
-        filtered_books = []
-        for book in books:
-            book = marshal(book, Buku.response_fields)
+        # Apply the operations and return the results
+        results = apply_operations(args['operasi'])
+        succeeded = len([result for result in results if result['status'] == 200])
+        return {
+            'pesan': 'Sukses memproses ' + str(succeeded) + ' dari ' + str(len(results)) + ' operasi',
+            'hasil': results
+        }, 200
 
-            # Search the writers of the book
-            writers = []
-            book_writer_id = PenulisBuku.query.filter_by(id_buku = book['id'])
-            for writer_id in book_writer_id:
-                writer = Penulis.query.filter_by(id = writer_id.id_penulis).first()
-                writer_name = writer.nama
-                writers.append(writer_name)
-            
-            # Formatting the writers
-            writers = ", ".join(writers)
-            book["penulis"] = writers
+'''
+The following class is designed to get all books based on title.
+'''
+class BookResourceByTitle(Resource):
+    '''
+    The following method is designed to prevent CORS.
 
-            filtered_books.append(book)
-        return filtered_books, 200
+    :param object self: A must present keyword argument
+    :return: Status OK
+    '''
+    def options(self):
+        return {'status': 'ok'}, 200
+    
+    '''
+    The following method is designed to get all books based on title (see "get_books_by_title").
+
+    :param object self: A must present keyword argument
+    :return: Return all books based on the title given, ordered by relevance
+    '''
+    def get(self):
+        return run(get_books_by_title(request))
 
 '''
 The following class is designed to get all books based on writer name.
@@ -328,47 +765,13 @@ class BookResourceByWriter(Resource):
         return {'status': 'ok'}, 200
     
     '''
-    The following method is designed to get all books based on writer.
+    The following method is designed to get all books based on writer (see "get_books_by_writer").
 
     :param object self: A must present keyword argument
     :return: Return all books based on the writer name given
     '''
     def get(self):
-        # Take input from user
-        parser = reqparse.RequestParser()
-        parser.add_argument('penulis', location = 'args', required = False)
-        args = parser.parse_args()
-
-        # Search related writer
-        books = []
-        if args['penulis'] != '' and args['penulis'] is not None:
-            writers = Penulis.query.filter(Penulis.nama.like("%" + args['penulis'] + "%"))
-            # Search related books
-            for writer in writers:
-                book_writers = PenulisBuku.query.filter_by(id_penulis = writer.id)
-                for book_writer in book_writers:
-                    related_book = Buku.query.filter_by(id = book_writer.id_buku).first()
-                    books.append(related_book)
-
-        # Formatting the result and show it
-        filtered_books = []
-        for book in books:
-            book = marshal(book, Buku.response_fields)
-
-            # Search the writers of the book
-            writers = []
-            book_writer_id = PenulisBuku.query.filter_by(id_buku = book['id'])
-            for writer_id in book_writer_id:
-                writer = Penulis.query.filter_by(id = writer_id.id_penulis).first()
-                writer_name = writer.nama
-                writers.append(writer_name)
-            
-            # Formatting the writers
-            writers = ", ".join(writers)
-            book["penulis"] = writers
-
-            filtered_books.append(book)
-        return filtered_books, 200
+        return run(get_books_by_writer(request))
 
 '''
 The following class is designed to get all books based on category.
@@ -384,49 +787,146 @@ class BookResourceByCategory(Resource):
         return {'status': 'ok'}, 200
     
     '''
-    The following method is designed to get all books based on category.
+    The following method is designed to get all books based on category (see "get_books_by_category").
 
     :param object self: A must present keyword argument
     :return: Return all books based on the category given
     '''
+    @cached_response(*BOOK_RESOURCES)
+    def get(self):
+        return run(get_books_by_category(request))
+
+'''
+The following class is designed to search books by title, writer, category, and publisher at once.
+'''
+class BookSearchResource(Resource):
+    '''
+    The following method is designed to prevent CORS.
+
+    :param object self: A must present keyword argument
+    :return: Status OK
+    '''
+    def options(self):
+        return {'status': 'ok'}, 200
+
+    '''
+    The following method is designed to get the books which match all the given criteria in one query (see
+    "search_catalogue").
+
+    :param object self: A must present keyword argument
+    :return: Return one page of the matching books, and the number of matching books of each category and publisher
+    '''
+    def get(self):
+        return run(search_catalogue(request))
+
+'''
+The following class is designed to provide the change feed of the catalogue: the creations, updates, and deletions of
+books, writers, and categories, in the order of their commits.
+'''
+class ChangeFeedResource(Resource):
+    '''
+    The following method is designed to prevent CORS.
+
+    :param object self: A must present keyword argument
+    :return: Status OK
+    '''
+    def options(self):
+        return {'status': 'ok'}, 200
+
+    '''
+    The following method is designed to get the changes after the number given by "since" (0 for all of them). The
+    client gives "next_since" of the response as "since" of its next request. A deletion is a tombstone, whose "aksi" is
+    "hapus"; the other changed records can be read by their IDs, such as GET /buku?ids=...
+
+    :param object self: A must present keyword argument
+    :return: Return up to "limit" changes, the number to read from next ("next_since"), and whether there are more
+    changes ("has_more")
+    '''
     def get(self):
         # Take input from user
         parser = reqparse.RequestParser()
-        parser.add_argument('kategori', location = 'args', required = False)
+        parser.add_argument('since', location = 'args', required = False, type = int, default = 0)
+        parser.add_argument('limit', location = 'args', required = False, type = int)
         args = parser.parse_args()
+        limit = page_size(args)
+        if limit is None:
+            return {'pesan': 'Limit harus lebih besar dari 0'}, 400
+        if args['since'] < 0:
+            return {'pesan': 'Since tidak boleh kurang dari 0'}, 400
+
+        # Read the changes after the given number
+        changes, has_more = run(read_changes(args['since'], limit))
+        serialize = get_serializer(Perubahan)
+        return {
+            'data': [serialize(change) for change in changes],
+            'next_since': changes[-1].urutan if changes else args['since'],
+            'has_more': has_more,
+        }, 200
+
+'''
+The following class is designed to push the changes of the catalogue to a client as they are committed, as Server-Sent
+Events (see "blueprints/perubahan/stream.py").
+
+On the synchronous server (gunicorn, see "wsgi.py") a stream holds a thread of its worker for as long as the client
+listens, so each worker accepts at most CHANGE_STREAM_SYNC_LIMIT streams (a quarter of its GUNICORN_THREADS threads by
+default) and answers the next ones with 503 and "Retry-After"; a client which can't wait should poll GET /buku/perubahan.
+The ASGI server (see "asgi.py") has no such limit, and is the one to use for many clients. A worker hears of the changes committed by the other workers through
+CHANGE_STREAM_URL, or else within CHANGE_STREAM_POLL seconds.
+'''
+class ChangeStreamResource(Resource):
+    '''
+    The following method is designed to prevent CORS.
 
-        # Filter the book
-        books = Buku.query
-        if args['kategori'] != '' and args['kategori'] is not None:
-            category = Kategori.query.filter_by(kategori = args['kategori']).first()
-            if category is None:
-                return [], 200
-            books = books.filter_by(id_kategori = category.id)
-
-        # Formatting the result and show it
-        filtered_books = []
-        for book in books:
-            book = marshal(book, Buku.response_fields)
-
-            # Search the writers of the book
-            writers = []
-            book_writer_id = PenulisBuku.query.filter_by(id_buku = book['id'])
-            for writer_id in book_writer_id:
-                writer = Penulis.query.filter_by(id = writer_id.id_penulis).first()
-                writer_name = writer.nama
-                writers.append(writer_name)
-            
-            # Formatting the writers
-            writers = ", ".join(writers)
-            book["penulis"] = writers
-
-            book["kategori"] = args['kategori']
-            filtered_books.append(book)
-        return filtered_books, 200
+    :param object self: A must present keyword argument
+    :return: Status OK
+    '''
+    def options(self):
+        return {'status': 'ok'}, 200
+
+    '''
+    The following method is designed to open the stream. The ID of each event is the number of its change, so the client
+    which reconnects with "Last-Event-ID" (or "since", like GET /buku/perubahan) gets the changes it missed first.
+
+    :param object self: A must present keyword argument
+    :return: Return the stream of the changes
+    '''
+    def get(self):
+        try:
+            since = stream_position(request)
+        except ValueError:
+            return {'pesan': 'Last-Event-ID atau since harus bilangan bulat tidak negatif'}, 400
+
+        # Each stream holds a thread of this server
+        stream = current_app.extensions['change_stream']
+        subscription = stream.subscribe_sync()
+        if subscription is None:
+            return {
+                'pesan': 'Server ini sudah melayani ' + str(stream.sync_limit) + ' stream, coba lagi dalam '
+                + str(SYNC_RETRY_AFTER) + ' detik atau baca perubahan dari GET /buku/perubahan'
+            }, 503, {'Retry-After': str(SYNC_RETRY_AFTER)}
+        subscriber, position = subscription
+        return Response(
+            stream.sync_events(subscriber, position, since), mimetype = 'text/event-stream', headers = STREAM_HEADERS
+        )
 
 # Endpoint in "buku" route
 api.add_resource(BookResource, '')
 api.add_resource(BookResourceById, '/<book_id>')
+api.add_resource(BookBatchResource, '/batch')
+api.add_resource(BookSearchResource, '/cari')
 api.add_resource(BookResourceByTitle, '/sesuai-judul')
 api.add_resource(BookResourceByWriter, '/sesuai-penulis')
-api.add_resource(BookResourceByCategory, '/sesuai-kategori')
\ No newline at end of file
+api.add_resource(BookResourceByCategory, '/sesuai-kategori')
+api.add_resource(ChangeFeedResource, '/perubahan')
+api.add_resource(ChangeStreamResource, '/stream')
+
+# Handlers of the read endpoints of "buku" route on the asynchronous read path (see "blueprints.asgi"). An NDJSON stream
+# is left to the Flask application.
+handlers = {
+    'buku.bookresource': async_handler(list_books, unless = ndjson_requested),
+    'buku.bookresourcebyid': cached_response_async(*BOOK_RESOURCES)(async_handler(get_book)),
+    'buku.bookresourcebytitle': async_handler(get_books_by_title),
+    'buku.bookresourcebywriter': async_handler(get_books_by_writer),
+    'buku.bookresourcebycategory': cached_response_async(*BOOK_RESOURCES)(async_handler(get_books_by_category)),
+    'buku.booksearchresource': async_handler(search_catalogue),
+}
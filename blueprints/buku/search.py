@@ -0,0 +1,127 @@
+# Import from standard libraries
+import re
+import time
+
+# Import from related third party
+from blueprints import db
+from flask import current_app
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, and_, literal, literal_column, or_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ColumnElement
+
+# Import models
+from blueprints.buku.model import Buku
+
+'''
+The following table is the FTS5 index of "buku" table, used on SQLite instead of a FULLTEXT index. It is created (and kept
+in sync by triggers) with "buku" table, by "db.create_all()" or by a migration (see "blueprints/buku/model.py"), so it is
+put in its own metadata to keep it out of the models.
+'''
+buku_fts = Table(
+    'buku_fts', MetaData(),
+    Column('rowid', Integer),
+    Column('judul', String),
+    Column('penerbit', String),
+    Column('rank', Float),
+)
+
+# Characters which separate the words of a value, for the search without a full-text index
+WORD_SEPARATORS = ' -(/'
+
+# Number of seconds after which a database which didn't have "buku_fts" table is checked again
+FTS_RECHECK_SECONDS = 60
+
+# Existence of "buku_fts" table for each database, with the time it was checked. A table which exists is never checked
+# again, while a missing one is checked again after FTS_RECHECK_SECONDS.
+_fts_table_exists = {}
+
+'''
+The following class represents "MATCH (column) AGAINST (query IN BOOLEAN MODE)" expression of MySQL, which uses the
+FULLTEXT index of the column and gives the relevance score of each row.
+'''
+class MatchAgainst(ColumnElement):
+    type = Float()
+
+    def __init__(self, column, query):
+        self.column = column
+        self.query = literal(query)
+
+@compiles(MatchAgainst)
+def compile_match_against(element, compiler, **kw):
+    return "MATCH (%s) AGAINST (%s IN BOOLEAN MODE)" % (
+        compiler.process(element.column, **kw), compiler.process(element.query, **kw)
+    )
+
+'''
+The following function is designed to split a search text into words, dropping the characters which have special
+meaning in MySQL and SQLite full-text query syntax.
+
+:param string text: The search text given by the user
+:return: Return the list of words
+'''
+def tokenize(text):
+    return re.findall(r'\w+', text, re.UNICODE)
+
+'''
+The following function is designed to check whether "buku_fts" table exists in the database or not. A missing table
+means that the schema wasn't created by "db.create_all()" nor by the migrations, which is logged since the search is then
+done without the full-text index.
+
+:return: Return True if the table exists, or False otherwise
+'''
+def fts_table_exists():
+    engine = db.engine
+    key = str(engine.url)
+    exists, checked_at = _fts_table_exists.get(key, (False, None))
+    if exists or (checked_at is not None and time.monotonic() - checked_at < FTS_RECHECK_SECONDS):
+        return exists
+    with engine.connect() as connection:
+        exists = engine.dialect.has_table(connection, 'buku_fts')
+    _fts_table_exists[key] = (exists, time.monotonic())
+    if not exists:
+        current_app.logger.warning('Tabel buku_fts tidak ada, pencarian buku dilakukan tanpa indeks full-text')
+    return exists
+
+'''
+The following function is designed to filter the values of a column which contain all the given words, each of them at
+the beginning of the value or right after a separator (see WORD_SEPARATORS), like the full-text indexes do. It is used
+when there isn't a full-text index, so the search gives the same books (in a different order) on every database.
+
+:param object column: The column which should be searched
+:param list words: The words given by the user (see "tokenize")
+:return: Return the condition
+'''
+def match_word_prefixes(column, words):
+    conditions = []
+    for word in words:
+        # "_" is the only character of a word which has a special meaning in LIKE
+        word = word.replace('_', '!_')
+        patterns = [word + '%'] + ['%' + separator + word + '%' for separator in WORD_SEPARATORS]
+        conditions.append(or_(*[column.like(pattern, escape = '!') for pattern in patterns]))
+    return and_(*conditions)
+
+'''
+The following function is designed to filter books whose title (or publisher) contains all the given words (each word may be the
+beginning of a longer word), ordered by relevance. The full-text index is used on MySQL (FULLTEXT) and SQLite (FTS5),
+and it falls back to LIKE with the same meaning (ordered by ID) on other databases. A text without any word is searched
+as it is with LIKE on every database.
+
+:param object books: The query of the books which should be filtered
+:param string column: Name of the column which should be searched ("judul" or "penerbit")
+:param string text: The search text given by the user
+:return: Return the filtered and ordered query
+'''
+def search_books(books, column, text):
+    words = tokenize(text)
+    dialect = db.engine.dialect.name
+    if words and dialect == 'mysql':
+        score = MatchAgainst(getattr(Buku, column), " ".join(["+" + word + "*" for word in words]))
+        return books.filter(score).order_by(score.desc(), Buku.id)
+    if words and dialect == 'sqlite' and fts_table_exists():
+        fts_query = column + " : (" + " AND ".join(['"' + word + '"*' for word in words]) + ")"
+        return books.join(buku_fts, buku_fts.c.rowid == Buku.id).filter(
+            literal_column('buku_fts').op('MATCH')(fts_query)
+        ).order_by(buku_fts.c.rank, Buku.id)
+    if words:
+        return books.filter(match_word_prefixes(getattr(Buku, column), words)).order_by(Buku.id)
+    return books.filter(getattr(Buku, column).like("%" + text + "%")).order_by(Buku.id)
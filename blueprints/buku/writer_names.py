@@ -0,0 +1,99 @@
+# Import from related third party
+from blueprints import db
+from sqlalchemy import bindparam
+
+# Import models
+from blueprints.buku.model import Buku
+from blueprints.penulis.model import Penulis
+from blueprints.penulis_buku.model import PenulisBuku
+
+# Import helpers
+from blueprints.perubahan.feed import UPDATE, record_changes
+
+# Number of books handled in one query when rebuilding or verifying the names
+BATCH_SIZE = 1000
+
+'''
+The following function is designed to join the names of the writers of a book, in the form stored in "nama_penulis"
+column and shown in "penulis" key of a book.
+
+:param list names: Names of the writers, in the order of "PenulisBuku" records
+:return: Return the joined names
+'''
+def join_writer_names(names):
+    return ", ".join(names)
+
+'''
+The following function is designed to compute the writer names of many books from "PenulisBuku" table, in one query.
+
+:param list book_ids: IDs of the books
+:return: Return a dictionary from book ID to its writer names (an empty string for a book without writer)
+'''
+def compute_writer_names(book_ids):
+    names = dict([(book_id, []) for book_id in book_ids])
+    if book_ids:
+        rows = db.session.query(PenulisBuku.id_buku, Penulis.nama).join(
+            Penulis, Penulis.id == PenulisBuku.id_penulis
+        ).filter(PenulisBuku.id_buku.in_(book_ids)).order_by(PenulisBuku.id)
+        for book_id, name in rows:
+            names[book_id].append(name)
+    return dict([(book_id, join_writer_names(book_names)) for book_id, book_names in names.items()])
+
+'''
+The following function is designed to store the writer names of many books, all of them in one statement, and record
+them as changed books in the change feed. It doesn't commit, so that it can be a part of a bigger transaction.
+
+:param dict names: A dictionary from book ID to its writer names
+'''
+def store_writer_names(names):
+    if not names:
+        return
+    book_table = Buku.__table__
+    db.session.execute(
+        book_table.update().where(book_table.c.id == bindparam('b_id')).values(nama_penulis = bindparam('b_nama_penulis')),
+        [{'b_id': book_id, 'b_nama_penulis': book_names} for book_id, book_names in names.items()]
+    )
+    record_changes('buku', UPDATE, list(names))
+
+'''
+The following function is designed to recompute the writer names of all books written by a writer, to be called after
+the name of the writer is changed. It doesn't commit, so that it can be a part of the same transaction.
+
+:param integer writer_id: ID of the writer
+'''
+def refresh_writer_names_of_writer(writer_id):
+    book_ids = [row[0] for row in db.session.query(PenulisBuku.id_buku).filter_by(id_penulis = writer_id).distinct()]
+    for start in range(0, len(book_ids), BATCH_SIZE):
+        store_writer_names(compute_writer_names(book_ids[start:start + BATCH_SIZE]))
+
+'''
+The following function is designed to go through all books in batches, and find the books whose stored writer names
+are different from the names computed from "PenulisBuku" table.
+
+:param boolean repair: Set to True to store the computed names of the different books (committed after each batch)
+:return: Return the number of checked books and the IDs of the different books
+'''
+def check_writer_names(repair = False):
+    checked = 0
+    different_ids = []
+    last_id = None
+    while True:
+        batch = db.session.query(Buku.id, Buku.nama_penulis).order_by(Buku.id)
+        if last_id is not None:
+            batch = batch.filter(Buku.id > last_id)
+        batch = batch.limit(BATCH_SIZE).all()
+        if not batch:
+            break
+        last_id = batch[-1][0]
+        checked += len(batch)
+
+        # Compare the stored names with the computed ones
+        computed = compute_writer_names([book_id for book_id, book_names in batch])
+        different = dict([
+            (book_id, computed[book_id]) for book_id, book_names in batch if (book_names or '') != computed[book_id]
+        ])
+        different_ids.extend(sorted(different))
+        if repair and different:
+            store_writer_names(different)
+            db.session.commit()
+    return checked, different_ids
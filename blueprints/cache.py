@@ -0,0 +1,340 @@
+# Import from standard libraries
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from threading import Lock
+
+# Import from related third party
+from blueprints import db
+
+# Import models
+from blueprints.penulis.model import Penulis
+from blueprints.kategori.model import Kategori
+
+# Import helpers
+from blueprints.reads import fetch_all, fetch_first, run
+from blueprints.replicas import may_read_cache, may_fill_cache
+from blueprints.serializers import get_serializer
+
+# Serializers of the categories and the writers read as plain rows, which give the same JSON form as "marshal"
+category_serializer = get_serializer(Kategori, (), None, (Kategori.id,))
+writer_serializer = get_serializer(Penulis, (), None, (Penulis.id,))
+
+# Marker of a key which isn't in the cache (None is a valid cached value, for records which don't exist)
+MISSING = object()
+
+# Generation of each resource read by the current request (see "follow_generations"), None outside of a conditional request
+request_generations = ContextVar('request_generations', default = None)
+
+'''
+The following class is an in-process cache with bounded size (the least recently used entry is dropped first) and
+time-to-live for each entry. It is safe to be used by many threads.
+
+The cache of a resource of the change feed also has a generation: the number of the latest change of the resource which
+it has seen (see "follow_generations"). Its entries are dropped when a request sees a newer change, so that a process
+doesn't keep a record which another process has changed.
+'''
+class LRUCache(object):
+    '''
+    :param integer max_size: Maximum number of entries
+    :param integer ttl: Number of seconds an entry is kept
+    :param string resource: The resource of the change feed whose records are cached, such as "penulis"
+    '''
+    def __init__(self, max_size, ttl, resource = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.resource = resource
+        self.generation = None
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    '''
+    The following method is designed to get a value from the cache.
+
+    :param object self: A must present keyword argument
+    :param any key: The key of the value
+    :return: Return the value, or MISSING if the key isn't in the cache or has expired
+    '''
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] < time.time():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return MISSING
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    '''
+    The following method is designed to put a value into the cache.
+
+    :param object self: A must present keyword argument
+    :param any key: The key of the value
+    :param any value: The value
+    '''
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.time() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last = False)
+
+    '''
+    The following method is designed to remove some keys from the cache.
+
+    :param object self: A must present keyword argument
+    :param list keys: The keys which should be removed
+    '''
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    '''
+    The following method is designed to remove all keys from the cache.
+
+    :param object self: A must present keyword argument
+    '''
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    '''
+    The following method is designed to drop all entries when a newer generation is seen.
+
+    :param object self: A must present keyword argument
+    :param integer generation: The number of the latest change of the resource (None if it has no change)
+    '''
+    def follow(self, generation):
+        with self.lock:
+            if generation is not None and (self.generation is None or generation > self.generation):
+                self.entries.clear()
+                self.generation = generation
+
+    '''
+    The following method is designed to check whether the records read by the current request may be put into the cache:
+    they may not if the cache has followed a newer generation since the request has read its version, as the records
+    may be older than that generation.
+
+    :param object self: A must present keyword argument
+    :return: Return True if they may
+    '''
+    def accepts_current_request(self):
+        generations = request_generations.get()
+        if self.resource is None or generations is None or self.resource not in generations:
+            return True
+        with self.lock:
+            return generations[self.resource] == self.generation
+
+    '''
+    The following method is designed to get the statistics of the cache.
+
+    :param object self: A must present keyword argument
+    :return: Return the number of hits, misses, and entries
+    '''
+    def statistics(self):
+        with self.lock:
+            return {'hit': self.hits, 'miss': self.misses, 'ukuran': len(self.entries)}
+
+    '''
+    The following method is designed to set the hit and miss counters back to zero.
+
+    :param object self: A must present keyword argument
+    '''
+    def reset_statistics(self):
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+
+# Caches of "Kategori" (by ID and by name) and "Penulis" (by ID) records, in JSON form
+category_cache = LRUCache(max_size = 1024, ttl = 300, resource = 'kategori')
+writer_cache = LRUCache(max_size = 10000, ttl = 60, resource = 'penulis')
+
+'''
+The following function is designed to make the caches follow the generations read by a conditional request (the
+numbers of the latest changes, see "blueprints/conditional.py"), so that the body of the response is never older than
+its version. The generations are kept for the rest of the request.
+
+:param dict generations: A dictionary from resource to the number of its latest change
+'''
+def follow_generations(generations):
+    for cache in [category_cache, writer_cache]:
+        if cache.resource in generations:
+            cache.follow(generations[cache.resource])
+    request_generations.set(generations)
+
+'''
+The following function is designed to get the key of a category in the cache by its ID (the cache also holds the
+categories by name).
+
+:param integer category_id: ID of the category
+:return: Return the key
+'''
+def category_key(category_id):
+    return ('id', category_id)
+
+'''
+The following function is designed to get the key of a category in the cache by its name.
+
+:param string name: Name of the category
+:return: Return the key
+'''
+def category_name_key(name):
+    return ('kategori', name)
+
+'''
+The following function is designed to look up many records in a cache. A client which has just written (see
+"blueprints/replicas.py") doesn't read the cache, so it always sees its own writes.
+
+:param object cache: The cache
+:param list record_ids: IDs of the records
+:param function key: The function which gives the key of a record in the cache from its ID
+:return: Return a dictionary from ID to the cached record (only the records which exist), and the IDs which aren't in the
+cache
+'''
+def split_cached(cache, record_ids, key = lambda record_id: record_id):
+    found_records = {}
+    missing_ids = []
+    if not may_read_cache():
+        return found_records, list(record_ids)
+    for record_id in record_ids:
+        record = cache.get(key(record_id))
+        if record is MISSING:
+            missing_ids.append(record_id)
+        elif record is not None:
+            found_records[record_id] = record
+    return found_records, missing_ids
+
+'''
+The following function is designed to put the records which were missing into a cache, including the ones which don't
+exist (as None). Records read from a replica shortly after a write aren't put, since they may be older than the write,
+and neither are the records of a request which the cache has outrun (see "LRUCache.accepts_current_request").
+
+:param object cache: The cache
+:param list missing_ids: IDs of the records which were missing
+:param dict found_records: A dictionary from ID to the record in JSON form, of the records which exist
+:param function key: The function which gives the key of a record in the cache from its ID
+'''
+def store_found(cache, missing_ids, found_records, key = lambda record_id: record_id):
+    if not may_fill_cache() or not cache.accepts_current_request():
+        return
+    for record_id in missing_ids:
+        cache.set(key(record_id), found_records.get(record_id))
+
+'''
+The following function is designed to get many categories by ID, in a read handler (see "blueprints/reads.py").
+Categories which aren't in the cache are queried at once.
+
+:param list category_ids: IDs of the categories (integers)
+:return: Return a dictionary from ID to the category in JSON form, which only contains the categories which exist
+'''
+def read_categories(category_ids):
+    categories, missing_ids = split_cached(category_cache, category_ids, category_key)
+
+    # Query the categories which aren't in the cache
+    if missing_ids:
+        found_categories = yield fetch_all(
+            db.session.query(*category_serializer.columns).filter(Kategori.id.in_(missing_ids))
+        )
+        for category in found_categories:
+            categories[category.id] = category_serializer(category)
+        store_found(category_cache, missing_ids, categories, category_key)
+    return categories
+
+'''
+The following function is designed to get a category by name, from the cache if possible, in a read handler.
+
+:param string name: Name of the category
+:return: Return the category in JSON form, or None if it doesn't exist
+'''
+def read_category_by_name(name):
+    categories, missing_names = split_cached(category_cache, [name], category_name_key)
+    if missing_names:
+        category = yield fetch_first(db.session.query(*category_serializer.columns).filter(Kategori.kategori == name))
+        if category is not None:
+            categories[name] = category_serializer(category)
+        store_found(category_cache, missing_names, categories, category_name_key)
+    return categories.get(name)
+
+'''
+The following function is designed to get many writers by ID, in a read handler. Writers which aren't in the cache are
+queried at once.
+
+:param list writer_ids: IDs of the writers (integers)
+:param boolean cached: Set to False to read all of them from the database (they are still put into the cache)
+:param boolean locked: Set to True to lock the records of the writers until the transaction ends (FOR SHARE), so they
+can't be changed meanwhile; implies reading them from the database
+:return: Return a dictionary from ID to the writer in JSON form, which only contains the writers which exist
+'''
+def read_writers(writer_ids, cached = True, locked = False):
+    if cached and not locked:
+        writers, missing_ids = split_cached(writer_cache, writer_ids)
+    else:
+        writers, missing_ids = {}, list(writer_ids)
+
+    # Query the writers which aren't in the cache
+    if missing_ids:
+        writers_query = db.session.query(*writer_serializer.columns).filter(Penulis.id.in_(missing_ids))
+        if locked:
+            writers_query = writers_query.with_for_update(read = True)
+        found_writers = yield fetch_all(writers_query)
+        for writer in found_writers:
+            writers[writer.id] = writer_serializer(writer)
+        store_found(writer_cache, missing_ids, writers)
+    return writers
+
+'''
+The following function is designed to get many writers by ID, from the cache if possible.
+
+:param list writer_ids: IDs of the writers (integers)
+:return: Return a dictionary from ID to the writer in JSON form, which only contains the writers which exist
+'''
+def get_writers(writer_ids):
+    return run(read_writers(writer_ids))
+
+'''
+The following function is designed to read many writers by ID from the database, and put them into the cache. A write
+which stores something of the writers (such as their names in a book) reads them this way, since the cache of this
+process may still hold a writer changed by another process, and locks them so that a rename can't commit between the
+read and the commit of the write.
+
+:param list writer_ids: IDs of the writers (integers)
+:param boolean locked: Set to True to lock the records of the writers until the transaction ends
+:return: Return a dictionary from ID to the writer in JSON form, which only contains the writers which exist
+'''
+def load_writers(writer_ids, locked = False):
+    return run(read_writers(writer_ids, cached = False, locked = locked))
+
+'''
+The following function is designed to remove categories from the cache, to be called after a category is changed.
+Categories are few, so all of them are removed, including the cached names which didn't exist.
+'''
+def invalidate_categories():
+    category_cache.clear()
+
+'''
+The following function is designed to remove a writer from the cache, to be called after the writer is changed.
+
+:param integer writer_id: ID of the writer
+'''
+def invalidate_writer(writer_id):
+    writer_cache.delete(int(writer_id))
+
+'''
+The following function is designed to get the hit and miss counters of all caches.
+
+:return: Return the statistics of each cache
+'''
+def cache_statistics():
+    return {'kategori': category_cache.statistics(), 'penulis': writer_cache.statistics()}
+
+'''
+The following function is designed to set the hit and miss counters of all caches back to zero.
+'''
+def reset_cache_statistics():
+    for cache in [category_cache, writer_cache]:
+        cache.reset_statistics()
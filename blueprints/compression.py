@@ -0,0 +1,286 @@
+'''
+Compression of the responses, negotiated by "Accept-Encoding": Brotli when the "brotli" package is installed and the
+client accepts it, otherwise gzip. It wraps the WSGI application (see "create_app"), so it compresses the final response
+of every route, after the hooks of CORS, request logging, and metrics.
+
+A response whose size is known is compressed at once, if it has at least COMPRESS_MIN_SIZE bytes. A streamed response
+(such as the NDJSON listing of the books) is compressed as it goes: the compressor is flushed after each
+COMPRESS_FLUSH_BYTES bytes of input, so the client keeps receiving whole lines without losing the ratio of a long stream.
+
+Each compressed response is logged (a "COMPRESSION_LOG" line next to the "REQUEST_LOG" one) with its sizes, its ratio,
+and the CPU time spent compressing it, and is counted in the metrics. Like the request log, the line is turned into JSON
+and written by the writer thread (see "blueprints/request_log.py"), not by the thread of the request.
+'''
+
+# Import from standard libraries
+import time
+import zlib
+
+# Import from related third party
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header, parse_options_header, parse_set_header
+
+# Import helpers
+from blueprints.metrics import (
+    compression_ratio, compression_input_bytes_total, compression_output_bytes_total, compression_cpu_seconds_total
+)
+
+# Brotli is optional, gzip is used without it
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Window bits of zlib which give the gzip format
+GZIP_WBITS = 31
+
+# Types of content which are compressed (the others, such as images, are already compressed)
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'text/')
+
+# Status codes of the responses which don't have a body
+BODYLESS_STATUSES = (204, 304)
+
+'''
+The following class is designed to compress a body with one encoding, piece by piece, and measure the sizes and the CPU
+time of the compression.
+'''
+class Compressor(object):
+    '''
+    :param string encoding: The encoding, "br" or "gzip"
+    :param dict config: Configuration of the application
+    '''
+    def __init__(self, encoding, config):
+        self.encoding = encoding
+        self.input_size = 0
+        self.output_size = 0
+        self.cpu_time = 0.0
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality = config['COMPRESS_BROTLI_QUALITY'])
+            self.steps = (compressor.process, compressor.flush, compressor.finish)
+        else:
+            compressor = zlib.compressobj(config['COMPRESS_GZIP_LEVEL'], zlib.DEFLATED, GZIP_WBITS)
+            self.steps = (compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush)
+
+    def run(self, step, *args):
+        started_at = time.thread_time()
+        output = step(*args)
+        self.cpu_time += time.thread_time() - started_at
+        self.output_size += len(output)
+        return output
+
+    '''
+    The following method is designed to compress a piece of the body. The compressor may keep it until it has enough
+    input, so the output may be empty.
+
+    :param object self: A must present keyword argument
+    :param bytes data: The piece of the body
+    :return: Return the compressed bytes which are ready
+    '''
+    def compress(self, data):
+        self.input_size += len(data)
+        return self.run(self.steps[0], data)
+
+    '''
+    The following method is designed to get the compressed bytes of all the input so far, so that the client can
+    decompress them without waiting for the rest of the body.
+
+    :param object self: A must present keyword argument
+    :return: Return the compressed bytes
+    '''
+    def flush(self):
+        return self.run(self.steps[1])
+
+    '''
+    The following method is designed to end the compressed body.
+
+    :param object self: A must present keyword argument
+    :return: Return the last compressed bytes
+    '''
+    def finish(self):
+        return self.run(self.steps[2])
+
+'''
+The following class is designed to compress a streamed response as it is sent. The compression is recorded at the end of
+the stream, or when the stream is closed before its end (if the client goes away). The original response is closed when
+this one is.
+'''
+class CompressedStream(object):
+    '''
+    :param object middleware: The "CompressionMiddleware" which records the compression
+    :param dict environ: The WSGI environment of the request
+    :param object iterable: The original body
+    :param object compressor: The "Compressor"
+    '''
+    def __init__(self, middleware, environ, iterable, compressor):
+        self.middleware = middleware
+        self.environ = environ
+        self.iterable = iterable
+        self.compressor = compressor
+        self.recorded = False
+
+    def __iter__(self):
+        flush_bytes = self.middleware.config['COMPRESS_FLUSH_BYTES']
+        pending = 0
+        for chunk in self.iterable:
+            data = self.compressor.compress(chunk)
+            pending += len(chunk)
+            if pending >= flush_bytes:
+                data += self.compressor.flush()
+                pending = 0
+            if data:
+                yield data
+        data = self.compressor.finish()
+        self.record()
+        yield data
+
+    def record(self):
+        if not self.recorded:
+            self.recorded = True
+            self.middleware.record(self.environ, self.compressor)
+
+    def close(self):
+        try:
+            if hasattr(self.iterable, 'close'):
+                self.iterable.close()
+        finally:
+            self.record()
+
+'''
+The following function is designed to choose the encoding of a response from the "Accept-Encoding" header of the
+request. The preference of the client comes first, then the order of the given encodings.
+
+:param string accept_encoding: Value of the "Accept-Encoding" header
+:param list encodings: The encodings which can be used, the preferred one first
+:return: Return the encoding, or None if the response shouldn't be compressed
+'''
+def negotiate(accept_encoding, encodings):
+    if not accept_encoding:
+        return None
+    return parse_accept_header(accept_encoding).best_match(encodings)
+
+'''
+The following function is designed to check whether a response can be compressed, whatever the client accepts.
+
+:param dict environ: The WSGI environment of the request
+:param string status: The status line of the response, such as "200 OK"
+:param object headers: The headers of the response
+:return: Return True if the response can be compressed
+'''
+def compressible(environ, status, headers):
+    if environ['REQUEST_METHOD'] == 'HEAD' or 'Content-Encoding' in headers:
+        return False
+    status_code = int(status.split(' ', 1)[0])
+    if status_code < 200 or status_code in BODYLESS_STATUSES:
+        return False
+    if 'no-transform' in headers.get('Cache-Control', ''):
+        return False
+    mimetype = parse_options_header(headers.get('Content-Type', ''))[0]
+    return mimetype.startswith(COMPRESSIBLE_TYPES)
+
+'''
+The following class is the WSGI middleware which compresses the responses of the application.
+'''
+class CompressionMiddleware(object):
+    '''
+    :param object app: The Flask application, whose configuration and logger are used
+    :param function wsgi_app: The WSGI application which is wrapped
+    '''
+    def __init__(self, app, wsgi_app):
+        self.app = app
+        self.wsgi_app = wsgi_app
+        self.config = app.config
+        self.encodings = (['br'] if brotli is not None else []) + ['gzip']
+
+    def __call__(self, environ, start_response):
+        started = []
+
+        def capture_response(status, headers, exc_info = None):
+            started[:] = [status, headers]
+
+        iterable = self.wsgi_app(environ, capture_response)
+        status, headers, iterable = self.compress(environ, started[0], started[1], iterable)
+        start_response(status, headers)
+        return iterable
+
+    '''
+    The following method is designed to compress a response, if the client accepts it and the response is worth it.
+    It is also used by the asynchronous read path (see "blueprints/asgi.py").
+
+    :param object self: A must present keyword argument
+    :param dict environ: The WSGI environment of the request
+    :param string status: The status line of the response
+    :param list headers: The headers of the response, as pairs of name and value
+    :param object iterable: The body of the response
+    :return: Return the status line, the headers, and the body of the response to send
+    '''
+    def compress(self, environ, status, headers, iterable):
+        if not self.config['COMPRESS_ENABLED']:
+            return status, headers, iterable
+        headers = Headers(headers)
+        if not compressible(environ, status, headers):
+            return status, headers.to_wsgi_list(), iterable
+
+        # The response depends on "Accept-Encoding", even when it isn't compressed for this client
+        vary = parse_set_header(headers.get('Vary'))
+        vary.add('Accept-Encoding')
+        headers['Vary'] = vary.to_header()
+        encoding = negotiate(environ.get('HTTP_ACCEPT_ENCODING'), self.encodings)
+        length = headers.get('Content-Length', type = int)
+        if encoding is None or (length is not None and length < self.config['COMPRESS_MIN_SIZE']):
+            return status, headers.to_wsgi_list(), iterable
+
+        # The compressed body is another representation of the same version (see "check_version")
+        headers['Content-Encoding'] = encoding
+        etag = headers.get('ETag')
+        if etag is not None and not etag.startswith('W/'):
+            headers['ETag'] = 'W/' + etag
+        compressor = Compressor(encoding, self.config)
+        if length is None:
+            return status, headers.to_wsgi_list(), CompressedStream(self, environ, iterable, compressor)
+
+        # A body whose size is known is in memory already, it is compressed at once
+        try:
+            body = b''.join(iterable)
+        finally:
+            if hasattr(iterable, 'close'):
+                iterable.close()
+        body = compressor.compress(body) + compressor.finish()
+        headers['Content-Length'] = str(len(body))
+        self.record(environ, compressor)
+        return status, headers.to_wsgi_list(), [body]
+
+    '''
+    The following method is designed to record a compression in the log and the metrics.
+
+    :param object self: A must present keyword argument
+    :param dict environ: The WSGI environment of the request
+    :param object compressor: The "Compressor" of the response
+    '''
+    def record(self, environ, compressor):
+        labels = (compressor.encoding,)
+        ratio = compressor.input_size / float(compressor.output_size) if compressor.output_size else None
+        if ratio is not None:
+            compression_ratio.observe(ratio, labels)
+        compression_input_bytes_total.inc(labels, compressor.input_size)
+        compression_output_bytes_total.inc(labels, compressor.output_size)
+        compression_cpu_seconds_total.inc(labels, compressor.cpu_time)
+
+        query_string = environ.get('QUERY_STRING', '')
+        self.app.logger.info('COMPRESSION_LOG', extra = {'compression_log': {
+            'uri': environ.get('PATH_INFO', '') + ('?' + query_string if query_string else ''),
+            'encoding': compressor.encoding,
+            'original_size': compressor.input_size,
+            'compressed_size': compressor.output_size,
+            'ratio': None if ratio is None else round(ratio, 2),
+            'cpu_ms': round(compressor.cpu_time * 1000, 3),
+        }})
+
+'''
+The following function is designed to compress the responses of the application.
+
+:param object app: The Flask application
+'''
+def init_compression(app):
+    middleware = CompressionMiddleware(app, app.wsgi_app)
+    app.wsgi_app = middleware
+    app.extensions['compression'] = middleware
@@ -0,0 +1,222 @@
+# Import from standard libraries
+import hashlib
+from datetime import datetime
+from functools import wraps
+
+# Import from related third party
+from blueprints import db
+from flask import Response
+from werkzeug.http import http_date
+
+# Import models
+from blueprints.perubahan.model import Perubahan
+
+# Import helpers
+from blueprints.cache import follow_generations, request_generations
+from blueprints.reads import fetch_one
+
+'''
+The versions of the data are taken from the change feed (see "blueprints/perubahan/feed.py"): every write of a book, a
+writer, or a category records a change in the same transaction, numbered in the order of the commits. The number of the
+latest change of a resource (or of a record) changes with every write, even many writes in the same second, and it is
+read from an index of "perubahan" table, so a version costs a few index lookups whatever the size of the tables.
+
+The body must never be older than the version it is sent with, even when another process has just written. A single
+record is read in the same query as its version (see "record_version_query"), and the in-process caches which a
+collection is built from drop their entries once a newer change is seen (see "blueprints/cache.py").
+'''
+
+'''
+The following function is designed to make the subqueries which read the number and the time of the latest change of a
+resource, or of some records of the resource.
+
+:param string resource: The resource, "buku", "penulis", or "kategori"
+:param object records: A condition on "Perubahan.id_data" which selects the records (all records if None)
+:return: Return the two scalar subqueries
+'''
+def latest_change(resource, records = None):
+    changes = db.session.query(Perubahan.urutan).filter(Perubahan.sumber == resource)
+    if records is not None:
+        changes = changes.filter(records)
+    latest = changes.order_by(Perubahan.urutan.desc()).limit(1)
+    return latest.as_scalar(), latest.with_entities(Perubahan.waktu).as_scalar()
+
+'''
+The following function is designed to make the query which computes the version of some resources, from their latest
+change, in a single row.
+
+:param list resources: The resources which should be versioned, such as "buku"
+:return: Return the query
+'''
+def table_version_query(*resources):
+    columns = []
+    for resource in resources:
+        columns.extend(latest_change(resource))
+    return db.session.query(*columns)
+
+'''
+The following function is designed to turn the row of "table_version_query" into the version of the resources. The
+caches of the resources follow the numbers of their latest changes, for the rest of the request.
+
+:param tuple row: The row
+:param tuple resources: The resources of the row, in the same order
+:return: Return the version (a tuple) and the last modified time of the resources
+'''
+def version_of_tables(row, resources = ()):
+    version = tuple(row)
+    if resources:
+        follow_generations(dict(zip(resources, version[::2])))
+    timestamps = [value for value in version if isinstance(value, datetime)]
+    return version, (max(timestamps) if timestamps else None)
+
+'''
+The following function is designed to compute the version of some resources, in a single query, in a read handler (see
+"blueprints/reads.py").
+
+:param list resources: The resources which should be versioned, such as "buku"
+:return: Return the version (a tuple) and the last modified time of the resources
+'''
+def table_version(*resources):
+    row = yield fetch_one(table_version_query(*resources))
+    return version_of_tables(row, resources)
+
+'''
+The following function is designed to make the query which reads the latest change of a single record, only if the record
+exists. The columns of the record which are given are read in the same row, so they belong to that version.
+
+:param object model: The model of the record
+:param string resource: The resource of the record in the change feed, such as "penulis"
+:param integer record_id: ID of the record
+:param tuple columns: Columns of the record which are read after the version
+:return: Return the query
+'''
+def record_version_query(model, resource, record_id, columns = ()):
+    # The ID is labelled, so it isn't merged with the ID among the columns of the record
+    changes = latest_change(resource, Perubahan.id_data == model.id)
+    return db.session.query(model.id.label('id_versi'), *(changes + tuple(columns))).filter(model.id == record_id)
+
+'''
+The following function is designed to turn the row of "record_version_query" into the version of the record.
+
+:param integer record_id: ID of the record
+:param tuple row: The row, or None if the record doesn't exist
+:param tuple columns: Columns of the record which were read after the version
+:return: Return the version and the last modified time of the record, or None if the record doesn't exist
+'''
+def version_of_record(record_id, row, columns = ()):
+    if row is None:
+        return None
+    return version_of_tables(tuple(row)[:len(row) - len(columns)])
+
+'''
+The following function is designed to get the values of the columns of the record from the row of
+"record_version_query".
+
+:param tuple row: The row
+:param tuple columns: Columns of the record which were read after the version
+:return: Return the values of the columns
+'''
+def record_columns(row, columns):
+    return tuple(row)[len(row) - len(columns):]
+
+'''
+The following function is designed to compare the version of the data with the one the client already has. The ETag is
+computed from the version and the request (URL with the query string, and "Accept" header).
+
+:param object req: The request
+:param tuple current: The version and the last modified time of the data
+:param boolean single_record: Set to True if the data is a single record, so "If-Modified-Since" can be trusted
+:return: Return the headers of the version ("ETag" and "Last-Modified"), and whether the client already has it
+'''
+def check_version(req, current, single_record = False):
+    version, last_modified = current
+    key = req.full_path + '|' + req.headers.get('Accept', '') + '|' + repr(version)
+    etag = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    headers = {'ETag': '"' + etag + '"'}
+
+    # The time has a resolution of one second, so a time of the current second is only a weak validator (see RFC 7232,
+    # section 2.2.2): another change may still come in the same second. It is only sent (and compared) once the second
+    # is over. The times of the changes are in UTC, like "http_date" expects.
+    if last_modified is not None:
+        last_modified = last_modified.replace(microsecond = 0)
+        if last_modified < datetime.utcnow().replace(microsecond = 0):
+            headers['Last-Modified'] = http_date(last_modified)
+        else:
+            last_modified = None
+
+    # The client has the latest version if it sends the same ETag (or a time which isn't older, for a single record).
+    # The ETag is compared weakly, so it matches the compressed representation too (see "blueprints/compression.py").
+    if req.if_none_match:
+        not_modified = req.if_none_match.contains_weak(etag)
+    else:
+        not_modified = (
+            single_record and last_modified is not None and req.if_modified_since is not None
+            and last_modified <= req.if_modified_since.replace(tzinfo = None)
+        )
+    return headers, not_modified
+
+'''
+The following function is designed to add the headers of the version to the result of a method, when it succeeds.
+
+:param any result: The result of the method (a response, or a tuple of the body and the status code)
+:param dict headers: The headers of the version
+:return: Return the result with the headers
+'''
+def add_version_headers(result, headers):
+    if isinstance(result, Response):
+        if result.status_code == 200:
+            result.headers.extend(headers)
+        return result
+    if isinstance(result, tuple) and len(result) == 2 and result[1] == 200:
+        return result[0], result[1], headers
+    return result
+
+'''
+The following function is designed to answer a request with 304 if the client already has the latest version, or else
+with the body which is built, along with the headers of the version.
+
+:param object req: The request
+:param tuple current: The version and the last modified time of the data
+:param function build: A function which builds the result of the method
+:param boolean single_record: Set to True if the data is a single record, so "If-Modified-Since" can be trusted
+:return: Return the response
+'''
+def respond_conditionally(req, current, build, single_record = False):
+    headers, not_modified = check_version(req, current, single_record)
+    if not_modified:
+        return Response(status = 304, headers = headers)
+    return add_version_headers(build(), headers)
+
+'''
+The following function is designed to make a read handler (see "blueprints/reads.py") answer conditional requests. The
+ETag is computed from the version of the data and the request (URL with the query string, and "Accept" header), so when
+the client sends "If-None-Match" (or "If-Modified-Since" for a single record) and nothing has changed, 304 is returned
+without building the body.
+
+:param function version_function: A read handler which takes the same arguments as the handler, and returns the version
+and the last modified time of the data (or None, if the data doesn't exist)
+:param boolean single_record: Set to True if the handler returns a single record, so "If-Modified-Since" can be trusted
+(a deleted row doesn't change the last modified time of a collection)
+:return: Return the decorator
+'''
+def conditional(version_function, single_record = False):
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(req, *args, **kwargs):
+            # The generations read by the version are only kept for this request
+            token = request_generations.set(None)
+            try:
+                current = yield from version_function(req, *args, **kwargs)
+                if current is None:
+                    return (yield from handler(req, *args, **kwargs))
+
+                # Answer with 304 if the client already has the latest version, or else build the body and add the
+                # headers to it
+                headers, not_modified = check_version(req, current, single_record)
+                if not_modified:
+                    return Response(status = 304, headers = headers)
+                return add_version_headers((yield from handler(req, *args, **kwargs)), headers)
+            finally:
+                request_generations.reset(token)
+        return wrapper
+    return decorator
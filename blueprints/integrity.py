@@ -0,0 +1,17 @@
+'''
+The following function is designed to check whether an integrity error is caused by a duplicate value in a unique index
+of a model. MySQL (and PostgreSQL) mention the name of the index in the error, while SQLite mentions its columns.
+
+:param object error: The IntegrityError raised by the database
+:param object model: The model which owns the index
+:param string index_name: Name of the unique index
+:return: Return True if the error is caused by the index, or False otherwise
+'''
+def is_duplicate(error, model, index_name):
+    message = str(error.orig)
+    for index in model.__table__.indexes:
+        if index.name != index_name:
+            continue
+        columns = ", ".join([index.table.name + "." + column.name for column in index.columns])
+        return index_name in message or message == "UNIQUE constraint failed: " + columns
+    return False
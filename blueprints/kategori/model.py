@@ -11,10 +11,13 @@ The following class is used to make the model of "Kategori" table.
 class Kategori(db.Model):
     # Define the property (each property associated with a column in database)
     __tablename__ = 'kategori'
+    __table_args__ = (
+        db.Index('uq_kategori_kategori', 'kategori', unique = True),
+    )
     id = db.Column(db.Integer, primary_key = True, autoincrement = True)
     kategori = db.Column(db.String(255), nullable = False, default = '')
-    created_at = db.Column(db.DateTime, default = datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-    updated_at = db.Column(db.DateTime, default = datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    created_at = db.Column(db.DateTime, default = datetime.now)
+    updated_at = db.Column(db.DateTime, default = datetime.now, onupdate = datetime.now)
 
     # The following dictionary is used to serialize "Kategori" instances into JSON form
     response_fields = {
@@ -4,10 +4,11 @@ import math
 from datetime import datetime, timedelta, date
 
 # Import from related third party
-from blueprints import db, app
-from flask import Blueprint
+from blueprints import db
+from flask import Blueprint, request
 from flask_restful import Api, reqparse, Resource, marshal, inputs
 from sqlalchemy import desc
+from sqlalchemy.exc import IntegrityError
 
 # Import models
 from blueprints.buku.model import Buku
@@ -15,10 +16,85 @@ from blueprints.penulis.model import Penulis
 from blueprints.kategori.model import Kategori
 from blueprints.penulis_buku.model import PenulisBuku
 
+# Import helpers
+from blueprints.pagination import add_pagination_arguments, paginate
+from blueprints.cache import read_categories, invalidate_categories
+from blueprints.conditional import (
+    conditional, table_version, record_version_query, version_of_record, record_columns, respond_conditionally
+)
+from blueprints.serializers import add_fieldset_arguments, get_serializer, select_fields, pick_fields
+from blueprints.multiget import add_ids_argument, ids_requested, parse_ids, arrange_by_ids
+from blueprints.integrity import is_duplicate
+from blueprints.response_cache import cached_response, cached_response_async, bump_generations
+from blueprints.perubahan.feed import CREATE, UPDATE, DELETE, record_changes
+from blueprints.reads import async_handler, fetch_first, run
+
 # Creating blueprint
 bp_kategori = Blueprint('kategori', __name__)
 api = Api(bp_kategori)
 
+# Serializer of the categories read as plain rows, which gives the same JSON form as "marshal"
+category_serializer = get_serializer(Kategori, (), None, (Kategori.id,))
+
+'''
+The following function is designed to get all available categories, in a read handler (see "blueprints/reads.py").
+
+:param object req: The request
+:return: Return all available categories as an array (one page of them if "limit" or "cursor" is given), or the
+categories of the given "ids" in the given order
+'''
+@conditional(lambda req: table_version('kategori'))
+def list_categories(req):
+    # Take input from user
+    parser = add_fieldset_arguments(add_pagination_arguments(reqparse.RequestParser()))
+    add_ids_argument(parser)
+    args = parser.parse_args(req = req)
+    try:
+        keys, included = select_fields(args, Kategori)
+        category_ids = parse_ids(args['ids']) if ids_requested(args) else None
+    except ValueError as error:
+        return {'pesan': str(error)}, 400
+
+    # Get the given categories at once (from the cache if possible), and show them in the given order
+    if category_ids is not None:
+        found_categories = yield from read_categories(list(set(category_ids)))
+        return arrange_by_ids(category_ids, dict([
+            (category_id, pick_fields(category, keys)) for category_id, category in found_categories.items()
+        ])), 200
+
+    # Query all categories, only the asked fields
+    serializer = get_serializer(Kategori, (), keys, (Kategori.id,))
+    available_categories = db.session.query(*serializer.columns)
+
+    # Format the array and return is as a result
+    return (yield from paginate(available_categories, Kategori.id, args, serializer))
+
+'''
+The following function is designed to get specific category by ID, in a read handler.
+
+:param object req: The request
+:param integer category_id: ID of the category
+:return: Return specific category or a not-found message if the category doesn't exist
+'''
+def get_category(req, category_id):
+    # Take input from user
+    parser = add_fieldset_arguments(reqparse.RequestParser())
+    args = parser.parse_args(req = req)
+    try:
+        keys, included = select_fields(args, Kategori)
+    except ValueError as error:
+        return {'pesan': str(error)}, 400
+
+    # Search for that specific category, in the same query as its version
+    serializer = get_serializer(Kategori, (), keys)
+    row = yield fetch_first(record_version_query(Kategori, 'kategori', category_id, serializer.columns))
+    if row is None:
+        return {'pesan': 'Kategori yang kamu cari tidak ditemukan'}, 404
+    return respond_conditionally(
+        req, version_of_record(category_id, row, serializer.columns),
+        lambda: (serializer(record_columns(row, serializer.columns)), 200), single_record = True
+    )
+
 '''
 The following class is designed to get all categories and add new category.
 '''
@@ -33,21 +109,14 @@ class CategoryResource(Resource):
         return {'status': 'ok'}, 200
     
     '''
-    The following method is designed to get all available categories
+    The following method is designed to get all available categories (see "list_categories").
 
     :param object self: A must present keyword argument
-    :return: Return all available categories as an array
+    :return: Return all available categories
     '''
+    @cached_response('kategori')
     def get(self):
-        # Query all categories
-        available_categories = Kategori.query
-
-        # Format the array and return is as a result
-        formatted_category = []
-        for category in available_categories:
-            category = marshal(category, Kategori.response_fields)
-            formatted_category.append(category)
-        return formatted_category, 200
+        return run(list_categories(request))
     
     '''
     The following method is designed to add new category
@@ -65,15 +134,19 @@ class CategoryResource(Resource):
         if args['kategori'] == None or args['kategori'] == '':
             return {'pesan': 'Kolom kategori tidak boleh dikosongkan'}, 400
         
-        # Validate whether the category has already exist or not
-        available_categories = Kategori.query.filter_by(kategori = args['kategori'])
-        if available_categories.first() is not None:
-            return {'pesan': 'Kategori tersebut sudah ada'}, 409
-        
-        # Add new category to database
+        # Add new category to database, the unique index rejects a category which has already exist
         new_category = Kategori(args['kategori'])
         db.session.add(new_category)
-        db.session.commit()
+        record_changes('kategori', CREATE, [new_category])
+        try:
+            db.session.commit()
+        except IntegrityError as error:
+            db.session.rollback()
+            if is_duplicate(error, Kategori, 'uq_kategori_kategori'):
+                return {'pesan': 'Kategori tersebut sudah ada'}, 409
+            raise
+        invalidate_categories()
+        bump_generations('kategori')
 
         # Show the new category
         new_category = marshal(new_category, Kategori.response_fields)
@@ -93,19 +166,14 @@ class CategoryResourceById(Resource):
         return {'status': 'ok'}, 200
     
     '''
-    The following method is designed to get specific category by ID
+    The following method is designed to get specific category by ID (see "get_category").
 
     :param object self: A must present keyword argument
     :param integer category_id:
     :return: Return specific category or a not-found message if the category doesn't exist
     '''
     def get(self, category_id):
-        # Search for that specific category
-        category = Kategori.query.filter_by(id = category_id).first()
-        if category is None:
-            return {'pesan': 'Kategori yang kamu cari tidak ditemukan'}, 404
-        category = marshal(category, Kategori.response_fields)
-        return category, 200
+        return run(get_category(request, category_id))
     
     '''
     The following method is designed to edit specific category by ID
@@ -129,15 +197,19 @@ class CategoryResourceById(Resource):
         if args['kategori'] == None or args['kategori'] == '':
             return {'pesan': 'Kolom kategori tidak boleh dikosongkan'}, 400
         
-        # Check uniqueness
-        duplicate_category = Kategori.query.filter_by(kategori = args['kategori']).first()
-        if duplicate_category is not None:
-            return {'pesan': 'Kategori tersebut sudah ada'}, 409
-        
-        # Edit specific record in database
+        # Edit specific record in database, the unique index rejects a category which has already exist
         category.kategori = args['kategori']
-        category.updated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        db.session.commit()
+        category.updated_at = datetime.now()
+        record_changes('kategori', UPDATE, [category])
+        try:
+            db.session.commit()
+        except IntegrityError as error:
+            db.session.rollback()
+            if is_duplicate(error, Kategori, 'uq_kategori_kategori'):
+                return {'pesan': 'Kategori tersebut sudah ada'}, 409
+            raise
+        invalidate_categories()
+        bump_generations('kategori')
 
         # Return the editted category
         category = marshal(category, Kategori.response_fields)
@@ -164,11 +236,20 @@ class CategoryResourceById(Resource):
         # Delete specific record in database
         deleted_category = marshal(category, Kategori.response_fields)
         db.session.delete(category)
+        record_changes('kategori', DELETE, [deleted_category['id']])
         db.session.commit()
+        invalidate_categories()
+        bump_generations('kategori')
 
         # Return the deleted category
         return {'pesan': 'Sukses menghapus kategori', 'kategori': deleted_category}, 200
 
 # Endpoint in "kategori" route
 api.add_resource(CategoryResource, '')
-api.add_resource(CategoryResourceById, '/<category_id>')
\ No newline at end of file
+api.add_resource(CategoryResourceById, '/<category_id>')
+
+# Handlers of the read endpoints of "kategori" route on the asynchronous read path (see "blueprints.asgi")
+handlers = {
+    'kategori.categoryresource': cached_response_async('kategori')(async_handler(list_categories)),
+    'kategori.categoryresourcebyid': async_handler(get_category),
+}
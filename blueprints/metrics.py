@@ -0,0 +1,469 @@
+'''
+Metrics of the application, exposed at "/metrics" in Prometheus text format.
+
+The metrics are kept in the memory of each process. With several workers (gunicorn, see "gunicorn.conf.py"), each
+process also writes a snapshot of its metrics into METRICS_DIR every METRICS_FLUSH_SECONDS, in a file of its own, and
+"/metrics" shows the sum of all the files: a scrape gives the same totals whichever worker answers it. The files of the
+processes which are gone are kept, so a counter never goes backwards when a worker is replaced, but their gauges (such
+as the requests in flight) are left out. The snapshot of another worker may be up to METRICS_FLUSH_SECONDS old.
+'''
+
+# Import from standard libraries
+import atexit
+import json
+import os
+import threading
+import time
+from threading import Lock
+
+# Import from related third party
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Import helpers
+from blueprints.cache import cache_statistics, reset_cache_statistics
+
+'''
+The following function is designed to escape a label value in Prometheus text format.
+
+:param any value: The label value
+:return: Return the escaped value
+'''
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+'''
+The following function is designed to format a set of labels in Prometheus text format.
+
+:param tuple names: Names of the labels
+:param tuple values: Values of the labels
+:return: Return the formatted labels, such as {method="GET",status="200"}
+'''
+def format_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join([name + '="' + escape_label(value) + '"' for name, value in zip(names, values)]) + '}'
+
+'''
+The following class is the base of all metrics. Each metric holds one value (or one set of values) for each combination
+of label values, and it is safe to be updated by many threads.
+'''
+class Metric(object):
+    kind = 'untyped'
+
+    def __init__(self, name, description, label_names = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.values = {}
+        self.lock = Lock()
+
+    '''
+    The following method is designed to copy the values, in a form which can be written as JSON.
+
+    :param object self: A must present keyword argument
+    :return: Return a list of [label values, value]
+    '''
+    def snapshot(self):
+        with self.lock:
+            return [[list(labels), value] for labels, value in self.values.items()]
+
+    def reset(self):
+        with self.lock:
+            self.values.clear()
+
+    '''
+    The following method is designed to add the values of another process to a total.
+
+    :param object self: A must present keyword argument
+    :param dict total: A dictionary from label values to the total value, which is updated
+    :param list values: The values of the other process, as given by "snapshot"
+    '''
+    def add(self, total, values):
+        for labels, value in values:
+            total[tuple(labels)] = total.get(tuple(labels), 0) + value
+
+    '''
+    The following method is designed to format the metric in Prometheus text format.
+
+    :param object self: A must present keyword argument
+    :param dict values: The values to show, the ones of this process by default
+    :return: Return the lines
+    '''
+    def render(self, values = None):
+        if values is None:
+            values = dict([(tuple(labels), value) for labels, value in self.snapshot()])
+        lines = ['# HELP ' + self.name + ' ' + self.description, '# TYPE ' + self.name + ' ' + self.kind]
+        for labels, value in sorted(values.items()):
+            lines.append(self.name + format_labels(self.label_names, labels) + ' ' + repr(float(value)))
+        return lines
+
+'''
+The following class is a counter, a value which only goes up.
+'''
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, labels = (), amount = 1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+'''
+The following class is a gauge, a value which goes up and down.
+'''
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, labels = (), amount = 1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, labels = (), amount = 1):
+        self.inc(labels, -amount)
+
+'''
+The following class is a histogram, which counts observed values into cumulative buckets.
+'''
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, description, label_names = (), buckets = ()):
+        super(Histogram, self).__init__(name, description, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def snapshot(self):
+        with self.lock:
+            return [[list(labels), list(counts)] for labels, counts in self.values.items()]
+
+    def add(self, total, values):
+        for labels, counts in values:
+            current = total.get(tuple(labels))
+            total[tuple(labels)] = counts if current is None else [a + b for a, b in zip(current, counts)]
+
+    def observe(self, value, labels = ()):
+        with self.lock:
+            counts = self.values.get(labels)
+            if counts is None:
+                counts = self.values[labels] = [0] * len(self.buckets) + [0, 0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            counts[-2] += 1
+            counts[-1] += value
+
+    def render(self, values = None):
+        if values is None:
+            values = dict([(tuple(labels), counts) for labels, counts in self.snapshot()])
+        lines = ['# HELP ' + self.name + ' ' + self.description, '# TYPE ' + self.name + ' ' + self.kind]
+        bucket_names = self.label_names + ('le',)
+        for labels, counts in sorted(values.items()):
+            for index, bound in enumerate(self.buckets):
+                lines.append(
+                    self.name + '_bucket' + format_labels(bucket_names, labels + (repr(float(bound)),))
+                    + ' ' + repr(float(counts[index]))
+                )
+            lines.append(self.name + '_bucket' + format_labels(bucket_names, labels + ('+Inf',)) + ' ' + repr(float(counts[-2])))
+            lines.append(self.name + '_count' + format_labels(self.label_names, labels) + ' ' + repr(float(counts[-2])))
+            lines.append(self.name + '_sum' + format_labels(self.label_names, labels) + ' ' + repr(float(counts[-1])))
+        return lines
+
+# Metrics of the application
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+REQUEST_LABELS = ('blueprint', 'endpoint', 'method')
+request_duration = Histogram(
+    'http_request_duration_seconds', 'Time spent to build the response of a request.', REQUEST_LABELS, LATENCY_BUCKETS
+)
+requests_total = Counter('http_requests_total', 'Number of requests, by status code.', REQUEST_LABELS + ('status',))
+requests_in_flight = Gauge('http_requests_in_flight', 'Number of requests being processed.', ('blueprint',))
+request_statements = Histogram(
+    'http_request_sql_statements', 'Number of SQL statements executed by a request.', REQUEST_LABELS, STATEMENT_BUCKETS
+)
+request_sql_duration = Histogram(
+    'http_request_sql_duration_seconds', 'Time spent in SQL statements by a request.', REQUEST_LABELS, LATENCY_BUCKETS
+)
+sql_statements_total = Counter('sql_statements_total', 'Number of SQL statements executed.')
+sql_duration_total = Counter('sql_duration_seconds_total', 'Time spent in SQL statements.')
+database_requests_total = Counter(
+    'database_requests_total', 'Number of read requests, by the database which serves them.', ('database',)
+)
+replica_errors_total = Counter('database_replica_errors_total', 'Number of failures of each replica.', ('replica',))
+RATIO_BUCKETS = (1, 1.5, 2, 3, 5, 10, 20, 50)
+compression_ratio = Histogram(
+    'http_response_compression_ratio', 'Size of a response divided by its compressed size.', ('encoding',),
+    RATIO_BUCKETS
+)
+compression_input_bytes_total = Counter(
+    'http_response_compression_input_bytes_total', 'Number of bytes of the responses before compression.', ('encoding',)
+)
+compression_output_bytes_total = Counter(
+    'http_response_compression_output_bytes_total', 'Number of bytes of the responses after compression.', ('encoding',)
+)
+compression_cpu_seconds_total = Counter(
+    'http_response_compression_cpu_seconds_total', 'CPU time spent compressing the responses.', ('encoding',)
+)
+response_cache_requests_total = Counter(
+    'response_cache_requests_total', 'Number of lookups in the cache of the responses, by result.', ('result',)
+)
+change_stream_connections = Gauge(
+    'change_stream_connections', 'Number of clients of the stream of the changes, by server mode.', ('mode',)
+)
+log_records_dropped_total = Counter(
+    'log_records_dropped_total', 'Number of log records dropped because the queue of the log writer was full.'
+)
+METRICS = [
+    request_duration, requests_total, requests_in_flight, request_statements, request_sql_duration,
+    sql_statements_total, sql_duration_total, database_requests_total, replica_errors_total,
+    compression_ratio, compression_input_bytes_total, compression_output_bytes_total, compression_cpu_seconds_total,
+    response_cache_requests_total, change_stream_connections, log_records_dropped_total
+]
+
+'''
+The following function is designed to record the start of a SQL statement.
+'''
+def before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    connection.info.setdefault('statement_started_at', []).append(time.perf_counter())
+
+'''
+The following function is designed to record the end of a SQL statement, to the request which executes it (if any) and
+to the totals.
+'''
+def after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    started_at = connection.info.get('statement_started_at')
+    if not started_at:
+        return
+    elapsed = time.perf_counter() - started_at.pop()
+    sql_statements_total.inc()
+    sql_duration_total.inc(amount = elapsed)
+    if has_request_context() and 'sql_statements' in g:
+        g.sql_statements += 1
+        g.sql_duration += elapsed
+
+'''
+The following function is designed to get the labels of the current request.
+
+:return: Return the blueprint, the endpoint, and the method of the request
+'''
+def request_labels():
+    return (request.blueprint or 'app', request.endpoint or 'none', request.method)
+
+'''
+The following function is designed to get the metrics of the caches of this process (which keep their own counters).
+
+:return: Return the metrics
+'''
+def cache_metrics():
+    statistics = cache_statistics()
+    metrics = []
+    for metric, key in [
+        (Counter('cache_hits_total', 'Number of cache hits.', ('cache',)), 'hit'),
+        (Counter('cache_misses_total', 'Number of cache misses.', ('cache',)), 'miss'),
+        (Gauge('cache_entries', 'Number of entries in the cache.', ('cache',)), 'ukuran'),
+    ]:
+        for cache_name in statistics:
+            metric.values[(cache_name,)] = statistics[cache_name][key]
+        metrics.append(metric)
+    return metrics
+
+'''
+The following function is designed to take a snapshot of all metrics of this process.
+
+:return: Return a dictionary from the name of each metric to its values (see "Metric.snapshot")
+'''
+def snapshot_metrics():
+    return dict([(metric.name, metric.snapshot()) for metric in METRICS + cache_metrics()])
+
+'''
+The following class is designed to write the snapshot of the metrics of this process into a file of METRICS_DIR, every
+METRICS_FLUSH_SECONDS, from a thread. The file is named by the process ID and the time the process started writing, so
+a new process which gets the ID of a gone one doesn't take its file (and its counters). A thread doesn't survive a fork,
+so a worker forked from the process which has created the application starts its own (see "gunicorn.conf.py").
+'''
+class MetricsWriter(object):
+    '''
+    :param string directory: The directory of the files
+    :param float interval: Number of seconds between two snapshots
+    '''
+    def __init__(self, directory, interval):
+        self.directory = directory
+        self.interval = interval
+        self.path = None
+        self.pid = None
+        self.stopped = threading.Event()
+        atexit.register(self.write)
+
+    '''
+    The following method is designed to start the thread of the current process, if it isn't started yet.
+
+    :param object self: A must present keyword argument
+    '''
+    def start(self):
+        if self.pid == os.getpid():
+            return
+
+        # A forked process has the metrics of its parent, which are already in the file of the parent
+        if self.pid is not None:
+            for metric in METRICS:
+                metric.reset()
+            reset_cache_statistics()
+        os.makedirs(self.directory, exist_ok = True)
+        self.pid = os.getpid()
+        self.path = os.path.join(self.directory, '%d-%d.json' % (self.pid, time.time() * 1000))
+        self.stopped = threading.Event()
+        self.write()
+        threading.Thread(target = self.run, name = 'metrics-writer', daemon = True).start()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.write()
+
+    '''
+    The following method is designed to write the snapshot of this process, replacing the previous one at once.
+
+    :param object self: A must present keyword argument
+    '''
+    def write(self):
+        if self.pid != os.getpid():
+            return
+        temporary_path = self.path + '.tmp'
+        with open(temporary_path, 'w') as snapshot_file:
+            json.dump({'pid': self.pid, 'metrik': snapshot_metrics()}, snapshot_file)
+        os.replace(temporary_path, self.path)
+
+    '''
+    The following method is designed to stop the thread of the current process, once it has written the last snapshot.
+
+    :param object self: A must present keyword argument
+    '''
+    def stop(self):
+        self.stopped.set()
+        self.write()
+
+    '''
+    The following method is designed to read the snapshots of all processes, the one of this process being taken now.
+
+    :param object self: A must present keyword argument
+    :return: Return a list of (whether the process is alive, the snapshot)
+    '''
+    def read_all(self):
+        snapshots = []
+        own_path = self.path if self.pid == os.getpid() else None
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            if not name.endswith('.json') or path == own_path:
+                continue
+            try:
+                with open(path) as snapshot_file:
+                    snapshot = json.load(snapshot_file)
+            except (OSError, ValueError):
+                # A file which is being replaced, or a broken one
+                continue
+            snapshots.append((process_alive(snapshot['pid']), snapshot['metrik']))
+        snapshots.append((True, snapshot_metrics()))
+        return snapshots
+
+'''
+The following function is designed to check whether a process is still running.
+
+:param integer pid: ID of the process
+:return: Return True if the process is running
+'''
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+'''
+The following function is designed to render all metrics in Prometheus text format: the metrics of all processes which
+write into METRICS_DIR, or the ones of this process only.
+
+:param object writer: The "MetricsWriter" of the application, or None
+:return: Return the metrics as a string
+'''
+def render_metrics(writer = None):
+    metrics = METRICS + cache_metrics()
+    if writer is None:
+        snapshots = [(True, snapshot_metrics())]
+    else:
+        snapshots = writer.read_all()
+    lines = []
+    for metric in metrics:
+        total = {}
+        for alive, snapshot in snapshots:
+            # The gauges of a gone process don't count anymore
+            if metric.kind == 'gauge' and not alive:
+                continue
+            metric.add(total, snapshot.get(metric.name, []))
+        lines.extend(metric.render(total))
+    return '\n'.join(lines) + '\n'
+
+'''
+The following function is designed to instrument the application: every request is measured (duration, status code,
+number of SQL statements and time spent in them), and all metrics are exposed at "/metrics".
+
+:param object app: The Flask application
+'''
+def init_metrics(app):
+    # The metrics of the processes are shared through METRICS_DIR, if it is given
+    writer = None
+    if app.config.get('METRICS_DIR'):
+        writer = MetricsWriter(app.config['METRICS_DIR'], app.config.get('METRICS_FLUSH_SECONDS', 1))
+        writer.start()
+    app.extensions['metrics'] = writer
+
+    # SQL statements of every engine are counted
+    if not event.contains(Engine, 'before_cursor_execute', before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+
+    @app.before_request
+    def start_measurement():
+        g.metrics_started_at = time.perf_counter()
+        g.sql_statements = 0
+        g.sql_duration = 0.0
+        requests_in_flight.inc((request.blueprint or 'app',))
+
+    @app.after_request
+    def finish_measurement(response):
+        if 'metrics_started_at' in g:
+            labels = request_labels()
+            request_duration.observe(time.perf_counter() - g.metrics_started_at, labels)
+            requests_total.inc(labels + (str(response.status_code),))
+            request_statements.observe(g.sql_statements, labels)
+            request_sql_duration.observe(g.sql_duration, labels)
+        return response
+
+    @app.teardown_request
+    def end_in_flight(exception):
+        if g.pop('metrics_started_at', None) is not None:
+            requests_in_flight.dec((request.blueprint or 'app',))
+
+    @app.route('/metrics', methods = ['GET'])
+    def show_metrics():
+        return Response(render_metrics(app.extensions['metrics']), mimetype = 'text/plain; version=0.0.4')
+
+'''
+The following function is designed to start the thread which writes the metrics of the current process into
+METRICS_DIR, such as in a worker which has just been forked (see "gunicorn.conf.py"). Nothing is done if the metrics
+aren't shared, or if it is already running.
+
+:param object app: The Flask application
+'''
+def start_metrics_writer(app):
+    if app.extensions.get('metrics') is not None:
+        app.extensions['metrics'].start()
+
+'''
+The following function is designed to stop the thread which writes the metrics of the current process, once it has
+written the last snapshot.
+
+:param object app: The Flask application
+'''
+def stop_metrics_writer(app):
+    if app.extensions.get('metrics') is not None:
+        app.extensions['metrics'].stop()
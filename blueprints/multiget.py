@@ -0,0 +1,56 @@
+# Maximum number of IDs in one request
+MAX_IDS = 500
+
+'''
+The following function is designed to add "ids" argument (a comma separated list of IDs) to a request parser.
+
+:param object parser: An instance of "RequestParser" class
+:return: Return the same parser
+'''
+def add_ids_argument(parser):
+    parser.add_argument('ids', location = 'args', required = False)
+    return parser
+
+'''
+The following function is designed to check whether the client asks for records by their IDs.
+
+:param dict args: Parsed arguments which contain "ids"
+:return: Return True if "ids" is given, or False otherwise
+'''
+def ids_requested(args):
+    return args['ids'] != '' and args['ids'] is not None
+
+'''
+The following function is designed to parse the IDs given by the client.
+
+:param string value: Comma separated IDs, such as "3,1,2"
+:return: Return the IDs as integers in the given order, or raise ValueError with a message for the client
+'''
+def parse_ids(value):
+    ids = []
+    for record_id in value.split(','):
+        record_id = record_id.strip()
+        if record_id == '':
+            continue
+        try:
+            ids.append(int(record_id))
+        except ValueError:
+            raise ValueError('Nomor ID ' + record_id + ' tidak valid')
+    if len(ids) > MAX_IDS:
+        raise ValueError('Jumlah ID tidak boleh lebih dari ' + str(MAX_IDS))
+    return ids
+
+'''
+The following function is designed to arrange the found records in the order of the requested IDs. A record which
+doesn't exist is shown as null, and its ID is listed in "tidak_ditemukan".
+
+:param list ids: The requested IDs
+:param dict records: A dictionary from ID to the record in JSON form, of the records which exist
+:return: Return the records and the IDs which don't exist
+'''
+def arrange_by_ids(ids, records):
+    missing_ids = []
+    for record_id in ids:
+        if record_id not in records and record_id not in missing_ids:
+            missing_ids.append(record_id)
+    return {'data': [records.get(record_id) for record_id in ids], 'tidak_ditemukan': missing_ids}
@@ -0,0 +1,205 @@
+# Import from standard libraries
+import base64
+import binascii
+import json
+
+# Import helpers
+from blueprints.reads import fetch_all
+
+# Default and maximum number of records in one page
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+'''
+The following function is designed to add pagination arguments ("limit" and "cursor") to a request parser.
+
+:param object parser: An instance of "RequestParser" class
+:return: Return the same parser
+'''
+def add_pagination_arguments(parser):
+    parser.add_argument('limit', location = 'args', required = False, type = int)
+    parser.add_argument('cursor', location = 'args', required = False)
+    return parser
+
+'''
+The following function is designed to check whether the client asks for a paginated response or not.
+
+:param dict args: Parsed arguments which contain "limit" and "cursor"
+:return: Return True if the client asks for a paginated response, or False otherwise
+'''
+def is_paginated(args):
+    return args['limit'] is not None or (args['cursor'] != '' and args['cursor'] is not None)
+
+'''
+The following function is designed to turn a position (the last seen ID, or an offset) into an opaque cursor.
+
+:param string key: The kind of the position, "id" or "offset"
+:param integer value: The position itself
+:return: Return the cursor as a string
+'''
+def encode_cursor(key, value):
+    return base64.urlsafe_b64encode(json.dumps({key: value}).encode('utf-8')).decode('ascii')
+
+'''
+The following function is designed to get a position back from an opaque cursor.
+
+:param string cursor: The cursor given by the client
+:param string key: The kind of the position, "id" or "offset"
+:return: Return the position, or raise ValueError if the cursor is invalid
+'''
+def decode_cursor(cursor, key):
+    try:
+        value = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))[key]
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(value, int):
+        raise ValueError('Invalid cursor')
+    return value
+
+'''
+The following function is designed to validate the "limit" given by the client.
+
+:param dict args: Parsed arguments which contain "limit"
+:return: Return the number of records in one page, or None if the limit is invalid
+'''
+def page_size(args):
+    limit = DEFAULT_LIMIT if args['limit'] is None else args['limit']
+    if limit < 1:
+        return None
+    return min(limit, MAX_LIMIT)
+
+'''
+The following function is designed to make the query of one page with keyset (WHERE id > last_id).
+
+:param object query: The query which should be paginated
+:param object column: The unique and indexed column used as the keyset (usually the primary key)
+:param dict args: Parsed arguments which contain "limit" and "cursor"
+:return: Return the query of the page (with one more record than needed, to know whether there is a next page or not)
+and the number of records in the page, or raise ValueError with a message for the client if an argument is invalid
+'''
+def keyset_page(query, column, args):
+    limit = page_size(args)
+    if limit is None:
+        raise ValueError('Limit harus lebih besar dari 0')
+    if args['cursor'] != '' and args['cursor'] is not None:
+        try:
+            last_id = decode_cursor(args['cursor'], 'id')
+        except ValueError:
+            raise ValueError('Cursor tidak valid')
+        query = query.filter(column > last_id)
+    return query.order_by(column).limit(limit + 1), limit
+
+'''
+The following function is designed to format the records of a page taken by "keyset_page".
+
+:param list records: The records of the page
+:param object column: The column used as the keyset
+:param integer limit: The number of records in the page
+:param function formatter: The function which formats a record into JSON form
+:return: Return the formatted records and "next_cursor"
+'''
+def keyset_result(records, column, limit, formatter):
+    next_cursor = None
+    if len(records) > limit:
+        records = records[:limit]
+        next_cursor = encode_cursor('id', getattr(records[-1], column.key))
+    return {'data': [formatter(record) for record in records], 'next_cursor': next_cursor}
+
+'''
+The following function is designed to run a listing query, paginated with keyset (WHERE id > last_id) when
+the client asks for it, in a read handler (see "blueprints/reads.py"). Without "limit" and "cursor", all records are
+returned as an array like before.
+
+:param object query: The query which should be paginated
+:param object column: The unique and indexed column used as the keyset (usually the primary key)
+:param dict args: Parsed arguments which contain "limit" and "cursor"
+:param function formatter: The function which formats a record into JSON form
+:return: Return the formatted records (with "next_cursor" if paginated) and the status code
+'''
+def paginate(query, column, args, formatter):
+    # Keep the old behaviour when the client doesn't ask for pagination
+    if not is_paginated(args):
+        return [formatter(record) for record in (yield fetch_all(query))], 200
+    try:
+        page, limit = keyset_page(query, column, args)
+    except ValueError as error:
+        return {'pesan': str(error)}, 400
+    return keyset_result((yield fetch_all(page)), column, limit, formatter), 200
+
+'''
+The following function is designed to make the query of one page of a query whose order isn't based on a unique column
+(such as a search ordered by relevance), so a keyset can't be used. The cursor holds the offset of the next page instead.
+
+:param object query: The ordered query which should be paginated
+:param dict args: Parsed arguments which contain "limit" and "cursor"
+:return: Return the query of the page (with one more record than needed), the number of records in the page, and the
+offset of the page, or raise ValueError with a message for the client if an argument is invalid
+'''
+def offset_page(query, args):
+    limit = page_size(args)
+    if limit is None:
+        raise ValueError('Limit harus lebih besar dari 0')
+    offset = 0
+    if args['cursor'] != '' and args['cursor'] is not None:
+        try:
+            offset = decode_cursor(args['cursor'], 'offset')
+        except ValueError:
+            raise ValueError('Cursor tidak valid')
+        if offset < 0:
+            raise ValueError('Cursor tidak valid')
+    return query.offset(offset).limit(limit + 1), limit, offset
+
+'''
+The following function is designed to format the records of a page taken by "offset_page".
+
+:param list records: The records of the page
+:param integer limit: The number of records in the page
+:param integer offset: The offset of the page
+:param function formatter: The function which formats a record into JSON form
+:return: Return the formatted records and "next_cursor"
+'''
+def offset_result(records, limit, offset, formatter):
+    next_cursor = None
+    if len(records) > limit:
+        records = records[:limit]
+        next_cursor = encode_cursor('offset', offset + limit)
+    return {'data': [formatter(record) for record in records], 'next_cursor': next_cursor}
+
+'''
+The following function is designed to paginate a query whose order isn't based on a unique column (such as a search
+ordered by relevance) with an offset, in a read handler.
+
+:param object query: The ordered query which should be paginated
+:param dict args: Parsed arguments which contain "limit" and "cursor"
+:param function formatter: The function which formats a record into JSON form
+:return: Return the formatted records (with "next_cursor" if paginated) and the status code
+'''
+def paginate_by_offset(query, args, formatter):
+    # Keep the old behaviour when the client doesn't ask for pagination
+    if not is_paginated(args):
+        return [formatter(record) for record in (yield fetch_all(query))], 200
+    try:
+        page, limit, offset = offset_page(query, args)
+    except ValueError as error:
+        return {'pesan': str(error)}, 400
+    return offset_result((yield fetch_all(page)), limit, offset, formatter), 200
+
+'''
+The following function is designed to iterate over all records of a query in batches, using the same keyset
+as the pagination. Only one batch is held in memory at a time, regardless of the number of records.
+
+:param object query: The query which should be iterated
+:param object column: The unique and indexed column used as the keyset (usually the primary key)
+:param integer batch_size: Number of records fetched in one query
+:return: Yield the records one by one
+'''
+def iterate_in_batches(query, column, batch_size = DEFAULT_LIMIT):
+    last_id = None
+    while True:
+        batch = query if last_id is None else query.filter(column > last_id)
+        records = batch.order_by(column).limit(batch_size).all()
+        for record in records:
+            yield record
+        if len(records) < batch_size:
+            return
+        last_id = getattr(records[-1], column.key)
@@ -11,12 +11,16 @@ The following class is used to make the model of "Penulis" table.
 class Penulis(db.Model):
     # Define the property (each property associated with a column in database)
     __tablename__ = 'penulis'
+    __table_args__ = (
+        db.Index('uq_penulis_nomor_hp', 'nomor_hp', unique = True),
+        db.Index('uq_penulis_email', 'email', unique = True),
+    )
     id = db.Column(db.Integer, primary_key = True, autoincrement = True)
     nama = db.Column(db.String(255), nullable = False, default = '')
     nomor_hp = db.Column(db.String(255), nullable = False, default = '')
     email = db.Column(db.String(255), nullable = False, default = '')
-    created_at = db.Column(db.DateTime, default = datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-    updated_at = db.Column(db.DateTime, default = datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    created_at = db.Column(db.DateTime, default = datetime.now)
+    updated_at = db.Column(db.DateTime, default = datetime.now, onupdate = datetime.now)
 
     # The following dictionary is used to serialize "Penulis" instances into JSON form
     response_fields = {
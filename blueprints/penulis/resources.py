@@ -4,10 +4,11 @@ import math
 from datetime import datetime, timedelta, date
 
 # Import from related third party
-from blueprints import db, app
-from flask import Blueprint
+from blueprints import db
+from flask import Blueprint, request
 from flask_restful import Api, reqparse, Resource, marshal, inputs
 from sqlalchemy import desc
+from sqlalchemy.exc import IntegrityError
 
 # Import models
 from blueprints.buku.model import Buku
@@ -15,10 +16,105 @@ from blueprints.penulis.model import Penulis
 from blueprints.kategori.model import Kategori
 from blueprints.penulis_buku.model import PenulisBuku
 
+# Import helpers
+from blueprints.pagination import add_pagination_arguments, paginate
+from blueprints.cache import read_writers, invalidate_writer
+from blueprints.conditional import (
+    conditional, table_version, record_version_query, version_of_record, record_columns, respond_conditionally
+)
+from blueprints.buku.writer_names import refresh_writer_names_of_writer
+from blueprints.integrity import is_duplicate
+from blueprints.serializers import add_fieldset_arguments, get_serializer, select_fields, pick_fields
+from blueprints.multiget import add_ids_argument, ids_requested, parse_ids, arrange_by_ids
+from blueprints.response_cache import bump_generations
+from blueprints.perubahan.feed import CREATE, UPDATE, DELETE, record_changes
+from blueprints.reads import async_handler, fetch_first, run
+
 # Creating blueprint
 bp_penulis = Blueprint('penulis', __name__)
 api = Api(bp_penulis)
 
+# Serializer of the writers read as plain rows, which gives the same JSON form as "marshal"
+writer_serializer = get_serializer(Penulis, (), None, (Penulis.id,))
+
+'''
+The following function is designed to map a violation of the unique indexes of "Penulis" table into a failure message.
+
+:param object error: The IntegrityError raised by the database
+:return: Return the failure message and status code, or None if the error isn't caused by a duplicate
+'''
+def duplicate_writer_failure(error):
+    if is_duplicate(error, Penulis, 'uq_penulis_nomor_hp'):
+        return {'pesan': 'Nomor HP tersebut sudah digunakan oleh penulis lain'}, 409
+    if is_duplicate(error, Penulis, 'uq_penulis_email'):
+        return {'pesan': 'Email tersebut sudah digunakan oleh penulis lain'}, 409
+    return None
+
+'''
+The following function is designed to get all writers in database, in a read handler (see "blueprints/reads.py"). Can
+also be searched by name.
+
+:param object req: The request
+:return: Return all writers information which are stored in database (one page of them if "limit" or "cursor" is given),
+or the writers of the given "ids" in the given order
+'''
+@conditional(lambda req: table_version('penulis'))
+def list_writers(req):
+    # Take input from user
+    parser = add_fieldset_arguments(add_pagination_arguments(reqparse.RequestParser()))
+    add_ids_argument(parser)
+    parser.add_argument('nama', location = 'args', required = False)
+    args = parser.parse_args(req = req)
+    try:
+        keys, included = select_fields(args, Penulis)
+        writer_ids = parse_ids(args['ids']) if ids_requested(args) else None
+    except ValueError as error:
+        return {'pesan': str(error)}, 400
+
+    # Get the given writers at once (from the cache if possible), and show them in the given order
+    if writer_ids is not None:
+        found_writers = yield from read_writers(list(set(writer_ids)))
+        return arrange_by_ids(writer_ids, dict([
+            (writer_id, pick_fields(writer, keys)) for writer_id, writer in found_writers.items()
+        ])), 200
+
+    # Query all writers, only the asked fields
+    serializer = get_serializer(Penulis, (), keys, (Penulis.id,))
+    writers = db.session.query(*serializer.columns)
+
+    # Filter by name
+    if args['nama'] != '' and args['nama'] is not None:
+        writers = writers.filter(Penulis.nama.like("%" + args['nama'] + "%"))
+
+    # Show the result
+    return (yield from paginate(writers, Penulis.id, args, serializer))
+
+'''
+The following function is designed to get writer information from the given writer ID, in a read handler.
+
+:param object req: The request
+:param integer writer_id: ID of the writer
+:return: Return all information of specified writer
+'''
+def get_writer(req, writer_id):
+    # Take input from user
+    parser = add_fieldset_arguments(reqparse.RequestParser())
+    args = parser.parse_args(req = req)
+    try:
+        keys, included = select_fields(args, Penulis)
+    except ValueError as error:
+        return {'pesan': str(error)}, 400
+
+    # Search for related writer, in the same query as its version
+    serializer = get_serializer(Penulis, (), keys)
+    row = yield fetch_first(record_version_query(Penulis, 'penulis', writer_id, serializer.columns))
+    if row is None:
+        return {'pesan': 'Penulis yang kamu cari tidak ditemukan'}, 404
+    return respond_conditionally(
+        req, version_of_record(writer_id, row, serializer.columns),
+        lambda: (serializer(record_columns(row, serializer.columns)), 200), single_record = True
+    )
+
 '''
 The following class is designed to get all writers and add new writer.
 '''
@@ -33,30 +129,13 @@ class WriterResource(Resource):
         return {'status': 'ok'}, 200
     
     '''
-    The following method is designed to get all writers in database. Can also be searched by name
+    The following method is designed to get all writers in database (see "list_writers").
 
     :param object self: A must present keyword argument
     :return: Return all writers information which are stored in database
     '''
     def get(self):
-        # Take input from user
-        parser = reqparse.RequestParser()
-        parser.add_argument('nama', location = 'args', required = False)
-        args = parser.parse_args()
-
-        # Query all writers
-        writers = Penulis.query
-
-        # Filter by name
-        if args['nama'] != '' and args['nama'] is not None:
-            writers = writers.filter(Penulis.nama.like("%" + args['nama'] + "%"))
-        
-        # Show the result
-        writers_list = []
-        for writer in writers:
-            writer = marshal(writer, Penulis.response_fields)
-            writers_list.append(writer)
-        return writers_list, 200
+        return run(list_writers(request))
 
     '''
     The following method is designed to add new writer
@@ -78,21 +157,20 @@ class WriterResource(Resource):
         or (args['email'] == '' or args['email'] is None)):
             return {'pesan': 'Tidak boleh ada kolom yang dikosongkan'}, 400
         
-        # ----- Check uniqueness -----
-        # By phone number
-        duplicate_phone = Penulis.query.filter_by(nomor_hp = args['nomor_hp']).first()
-        if duplicate_phone is not None:
-            return {'pesan': 'Nomor HP tersebut sudah digunakan oleh penulis lain'}, 409
-        
-        # By email
-        duplicate_email = Penulis.query.filter_by(email = args['email']).first()
-        if duplicate_email is not None:
-            return {'pesan': 'Email tersebut sudah digunakan oleh penulis lain'}, 409
-        
-        # Create new record in database
+        # Create new record in database, the unique indexes reject a phone number or email which is already used
         new_writer = Penulis(args['nama'], args['nomor_hp'], args['email'])
         db.session.add(new_writer)
-        db.session.commit()
+        record_changes('penulis', CREATE, [new_writer])
+        try:
+            db.session.commit()
+        except IntegrityError as error:
+            db.session.rollback()
+            failure = duplicate_writer_failure(error)
+            if failure is None:
+                raise
+            return failure
+        invalidate_writer(new_writer.id)
+        bump_generations('penulis')
 
         # Return success message with the added writer information
         new_writer = marshal(new_writer, Penulis.response_fields)
@@ -112,19 +190,14 @@ class WriterResourceById(Resource):
         return {'status': 'ok'}, 200
     
     '''
-    The following method is designed to get writer information from the given writer ID.
+    The following method is designed to get writer information from the given writer ID (see "get_writer").
 
     :param object self: A must present keyword argument
     :param integer writer_id:
     :return: Return all information of specified writer
     '''
     def get(self, writer_id):
-        # Search for related writer
-        writer = Penulis.query.filter_by(id = writer_id).first()
-        if writer is None:
-            return {'pesan': 'Penulis yang kamu cari tidak ditemukan'}, 404
-        writer = marshal(writer, Penulis.response_fields)
-        return writer, 200
+        return run(get_writer(request, writer_id))
     
     '''
     The following method is designed to edit information of a writer
@@ -152,23 +225,29 @@ class WriterResourceById(Resource):
         or (args['email'] == '' or args['email'] is None)):
             return {'pesan': 'Tidak boleh ada kolom yang dikosongkan'}, 400
         
-        # ----- Check uniqueness -----
-        # By phone number
-        duplicate_phone = Penulis.query.filter_by(nomor_hp = args['nomor_hp']).first()
-        if duplicate_phone is not None and duplicate_phone.nomor_hp != selected_writer.nomor_hp:
-            return {'pesan': 'Nomor HP tersebut sudah digunakan oleh penulis lain'}, 409
-        
-        # By email
-        duplicate_email = Penulis.query.filter_by(email = args['email']).first()
-        if duplicate_email is not None and duplicate_phone.email != selected_writer.email:
-            return {'pesan': 'Email tersebut sudah digunakan oleh penulis lain'}, 409
-
-        # Edit related record in database
+        # Edit related record in database, the unique indexes reject a phone number or email which is used by another
+        # writer
+        name_changed = selected_writer.nama != args['nama']
         selected_writer.nama = args['nama']
         selected_writer.nomor_hp = args['nomor_hp']
         selected_writer.email = args['email']
-        selected_writer.updated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        selected_writer.updated_at = datetime.now()
+        try:
+            db.session.flush()
+        except IntegrityError as error:
+            db.session.rollback()
+            failure = duplicate_writer_failure(error)
+            if failure is None:
+                raise
+            return failure
+
+        # The name of the writer is stored in the books too, they only change with it
+        if name_changed:
+            refresh_writer_names_of_writer(selected_writer.id)
+        record_changes('penulis', UPDATE, [selected_writer])
         db.session.commit()
+        invalidate_writer(selected_writer.id)
+        bump_generations('penulis')
 
         # Return success message with the editted writer information
         selected_writer = marshal(selected_writer, Penulis.response_fields)
@@ -193,11 +272,20 @@ class WriterResourceById(Resource):
         if writer_books is not None:
             return {'pesan': 'Kamu tidak bisa menghapus informasi penulis ini karena informasi penulis ini masih digunakan di beberapa buku yang tersimpan di database'}, 400
         db.session.delete(writer)
+        record_changes('penulis', DELETE, [deleted_writer['id']])
         db.session.commit()
+        invalidate_writer(deleted_writer['id'])
+        bump_generations('penulis')
 
         # Return the message and deleted information
         return {'pesan': 'Sukses menghapus informasi penulis', 'penulis': deleted_writer}, 200
 
 # Endpoint in "penulis" route
 api.add_resource(WriterResource, '')
-api.add_resource(WriterResourceById, '/<writer_id>')
\ No newline at end of file
+api.add_resource(WriterResourceById, '/<writer_id>')
+
+# Handlers of the read endpoints of "penulis" route on the asynchronous read path (see "blueprints.asgi")
+handlers = {
+    'penulis.writerresource': async_handler(list_writers),
+    'penulis.writerresourcebyid': async_handler(get_writer),
+}
@@ -15,10 +15,17 @@ The following class is used to make the model of "PenulisBuku" table.
 class PenulisBuku(db.Model):
     # Define the property (each property associated with a column in database)
     __tablename__ = 'penulis_buku'
+    __table_args__ = (
+        db.Index('uq_penulis_buku_id_buku_id_penulis', 'id_buku', 'id_penulis', unique = True),
+        db.Index('ix_penulis_buku_id_penulis_id_buku', 'id_penulis', 'id_buku'),
+    )
     id = db.Column(db.Integer, primary_key = True, autoincrement = True)
     id_buku = db.Column(db.Integer, db.ForeignKey('buku.id'), nullable = False)
     id_penulis = db.Column(db.Integer, db.ForeignKey('penulis.id'), nullable = False)
 
+    # The writer is always needed when this record is loaded, so load it in the same query
+    penulis = db.relationship('Penulis', lazy = 'joined', viewonly = True)
+
     # The following dictionary is used to serialize "PenulisBuku" instances into JSON form
     response_fields = {
         'id': fields.Integer,
@@ -0,0 +1,125 @@
+'''
+Recording of the change feed of the catalogue (see "blueprints/perubahan/model.py"). A write handler calls
+"record_changes" before it commits, and the changes are written by the commit itself, in the same transaction: a change
+is in the feed if and only if its write is committed, and a rolled back write leaves nothing.
+
+The numbers of the changes are taken from "UrutanPerubahan" at the end of the transaction. Its record stays locked until
+the commit, so a transaction which commits later always gets bigger numbers, and a client which reads the changes after
+a number (GET /buku/perubahan?since=...) never misses a change committed after its read.
+'''
+
+# Import from standard libraries
+from datetime import datetime
+
+# Import from related third party
+from blueprints import db
+from sqlalchemy import event, func, select
+
+# Import helpers
+from blueprints.reads import fetch_all
+from blueprints.serializers import get_serializer
+
+# Import models
+from blueprints.perubahan.model import Perubahan, UrutanPerubahan
+
+# Actions of a change, also the operations of a batch (see "blueprints/buku/batch.py")
+CREATE = 'tambah'
+UPDATE = 'ubah'
+DELETE = 'hapus'
+
+# Key of the changes waiting for the commit, in the "info" dictionary of the session
+PENDING_CHANGES = 'perubahan'
+
+# Key of the number of the last change written by the transaction, in the "info" dictionary of the session (read once it
+# is committed, see "blueprints/perubahan/stream.py")
+LAST_CHANGE = 'perubahan_terakhir'
+
+'''
+The following function is designed to record changes of the current transaction, to be written when it commits.
+
+:param string resource: The changed resource, "buku", "penulis", or "kategori"
+:param string action: The action, CREATE, UPDATE, or DELETE
+:param list records: The changed records, as instances of the model or IDs (a new instance gets its ID when it is
+flushed, before the changes are written)
+'''
+def record_changes(resource, action, records):
+    db.session.info.setdefault(PENDING_CHANGES, []).extend([(resource, action, record) for record in records])
+
+'''
+The following function is designed to write the recorded changes of a session, right before it commits.
+
+Numbering the changes in the order of the commits has a cost: the writes which record changes are serialized on the
+record of "UrutanPerubahan", from the moment they take their numbers until they commit. So the record is locked as late
+as possible. Every write of the transaction is flushed, and the changes are built, before the numbers are taken; while
+the record is locked, only three statements are sent (take the numbers, read the last one, insert the changes), then
+the session commits. A write which doesn't record changes, and every read (the feed included), never waits for the lock.
+
+:param object session: The session
+'''
+def write_changes(session):
+    changes = session.info.pop(PENDING_CHANGES, None)
+    if not changes:
+        return
+
+    # Write everything else first (new records get their IDs), so it isn't done while the counter is locked
+    session.flush()
+    now = datetime.utcnow()
+    rows = [
+        {'sumber': resource, 'id_data': getattr(record, 'id', record), 'aksi': action, 'waktu': now}
+        for resource, action, record in changes
+    ]
+
+    # Take the next numbers, the record of the counter stays locked until the commit
+    counter = UrutanPerubahan.__table__
+    session.execute(counter.update().where(counter.c.id == 1).values(nilai = counter.c.nilai + len(rows)))
+    last = session.execute(select([counter.c.nilai]).where(counter.c.id == 1)).scalar()
+    for number, row in enumerate(rows, last - len(rows) + 1):
+        row['urutan'] = number
+    session.execute(Perubahan.__table__.insert(), rows)
+    session.info[LAST_CHANGE] = last
+
+'''
+The following function is designed to drop the recorded changes of a session which is rolled back.
+
+:param object session: The session
+:param object previous_transaction: The transaction which is rolled back
+'''
+def forget_changes(session, previous_transaction):
+    session.info.pop(PENDING_CHANGES, None)
+    session.info.pop(LAST_CHANGE, None)
+
+event.listen(db.session, 'before_commit', write_changes)
+event.listen(db.session, 'after_soft_rollback', forget_changes)
+
+'''
+The following function is designed to build the query of the changes after a number, in the order of their numbers. The
+query uses the primary key, so its cost depends on the number of changes read, not on the size of the catalogue. It
+reads the columns of the JSON form only, so a change is a row formatted by "get_serializer(Perubahan)". One more change
+than the limit is read, to know whether there are more.
+
+:param integer since: The number of the last change the client has
+:param integer limit: Maximum number of changes
+:return: Return the query
+'''
+def changes_query(since, limit):
+    columns = get_serializer(Perubahan).columns
+    return db.session.query(*columns).filter(Perubahan.urutan > since).order_by(Perubahan.urutan).limit(limit + 1)
+
+'''
+The following function is designed to read the changes after a number, in a read handler (see "blueprints/reads.py").
+
+:param integer since: The number of the last change the client has
+:param integer limit: Maximum number of changes
+:return: Return the changes (as rows), and whether there are more changes after them
+'''
+def read_changes(since, limit):
+    changes = yield fetch_all(changes_query(since, limit))
+    return changes[:limit], len(changes) > limit
+
+'''
+The following function is designed to get the number of the last committed change.
+
+:return: Return the number, or 0 if there isn't any change
+'''
+def last_change():
+    return db.session.query(func.max(Perubahan.urutan)).scalar() or 0
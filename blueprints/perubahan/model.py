@@ -0,0 +1,55 @@
+# Import from standard libraries
+from datetime import datetime
+
+# Import from related third party
+from blueprints import db
+from flask_restful import fields
+from sqlalchemy import DDL, event
+
+'''
+The following class is used to make the model of "Perubahan" table, the change feed of the catalogue. Each record is a
+change (creation, update, or deletion) of a book, a writer, or a category, numbered by "urutan" in the order of the
+commits. A deleted record is kept in the feed as a tombstone (a change whose "aksi" is "hapus").
+'''
+class Perubahan(db.Model):
+    # Define the property (each property associated with a column in database)
+    __tablename__ = 'perubahan'
+    __table_args__ = (
+        # The latest change of a resource, and of a record, are read by the versions of the conditional requests (see
+        # "blueprints/conditional.py")
+        db.Index('ix_perubahan_sumber_urutan', 'sumber', 'urutan'),
+        db.Index('ix_perubahan_sumber_id_data_urutan', 'sumber', 'id_data', 'urutan'),
+    )
+    urutan = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key = True, autoincrement = False)
+    sumber = db.Column(db.String(20), nullable = False)
+    id_data = db.Column(db.Integer, nullable = False)
+    aksi = db.Column(db.String(10), nullable = False)
+    # Time of the commit in UTC, so it can be sent as "Last-Modified" whatever the time zone of the server
+    waktu = db.Column(db.DateTime, nullable = False, default = datetime.utcnow)
+
+    # The following dictionary is used to serialize "Perubahan" instances into JSON form
+    response_fields = {
+        'urutan': fields.Integer,
+        'sumber': fields.String,
+        'id': fields.Integer(attribute = 'id_data'),
+        'aksi': fields.String,
+        'waktu': fields.DateTime,
+    }
+
+    # Reprsentative form to be shown in log
+    def __repr__(self):
+        return "Change " + str(self.urutan) + ": " + self.aksi + " " + self.sumber + " " + str(self.id_data)
+
+'''
+The following class is used to make the model of "UrutanPerubahan" table, which holds a single record: the last number
+given to a change. The transaction which records changes locks this record until it commits, so the numbers follow the
+order of the commits.
+'''
+class UrutanPerubahan(db.Model):
+    # Define the property (each property associated with a column in database)
+    __tablename__ = 'urutan_perubahan'
+    id = db.Column(db.Integer, primary_key = True, autoincrement = False)
+    nilai = db.Column(db.BigInteger, nullable = False, default = 0)
+
+# The single record is created with the table
+event.listen(UrutanPerubahan.__table__, 'after_create', DDL('INSERT INTO urutan_perubahan (id, nilai) VALUES (1, 0)'))
@@ -0,0 +1,516 @@
+'''
+Push of the change feed (see "blueprints/perubahan/feed.py") to connected clients, as Server-Sent Events on
+GET /buku/stream. Each event is a change, whose ID is its number ("urutan"), so a client which reconnects with the
+"Last-Event-ID" header (sent by EventSource) or "since" gets the changes it missed, then the new ones:
+
+    id: 42
+    data: {"urutan": 42, "sumber": "buku", "id": 7, "aksi": "ubah", "waktu": "..."}
+
+Each process reads the new changes once, in a thread, and hands them to all its clients, so the cost of a change doesn't
+depend on the number of clients. The thread is woken up when a transaction which recorded changes commits, through the
+channel given by CHANGE_STREAM_URL (see "blueprints/config.py"):
+
+- "local://" (the default, or empty): inside the process only. The other workers see the changes within
+  CHANGE_STREAM_POLL seconds, when they poll the feed. Under gunicorn the default is "ipc://" instead (see
+  "gunicorn.conf.py").
+- "ipc:///path/of/a/directory": the workers of the same machine (and the commands), through a Unix datagram socket of
+  each process in the directory. It stands in for a broker, without a server to run.
+- "redis://host:6379/0" (or "rediss://", "unix://"): Redis PUBLISH/SUBSCRIBE, for the workers of several machines. The
+  "redis" package must be installed.
+
+A message only tells that there are new changes, the changes themselves are always read from the feed: a lost message
+delays the changes until the next poll, but never loses them.
+
+A client holds its connection for as long as it listens. On the ASGI server (see "asgi.py") a connection is a task of
+the event loop, so a worker holds thousands of idle clients: it is the server to use when many clients listen. On the
+synchronous server each one holds a thread, so at most CHANGE_STREAM_SYNC_LIMIT clients (a quarter of the threads by
+default) are accepted by each process, and the next ones are answered with 503 and "Retry-After".
+'''
+
+# Import from standard libraries
+import asyncio
+import json
+import os
+import queue
+import socket
+import threading
+import time
+
+# Import from related third party
+from blueprints import db
+from flask import current_app, has_app_context
+from sqlalchemy import event
+
+# Import helpers
+from blueprints.metrics import change_stream_connections
+from blueprints.perubahan.feed import LAST_CHANGE, last_change, read_changes
+from blueprints.reads import run
+from blueprints.serializers import get_serializer
+
+# Import models
+from blueprints.perubahan.model import Perubahan
+
+# Headers of a stream, which mustn't be cached, compressed, or buffered by a proxy
+STREAM_HEADERS = [('Cache-Control', 'no-cache, no-transform'), ('X-Accel-Buffering', 'no')]
+
+# Number of milliseconds a client waits before it reconnects, sent at the start of a stream
+RETRY_MILLISECONDS = 3000
+RETRY = ('retry: %d\n\n' % RETRY_MILLISECONDS).encode('utf-8')
+
+# Number of seconds after which a client refused by the synchronous server (CHANGE_STREAM_SYNC_LIMIT) may try again
+SYNC_RETRY_AFTER = 30
+
+# Comment sent when nothing happened for a while, so the proxies keep the connection and a gone client is noticed
+HEARTBEAT = b': ping\n\n'
+
+# Number of changes read at once
+READ_SIZE = 500
+
+# Number of batches of changes which can wait for a client. A client which is further behind is disconnected, and
+# catches up from the feed when it reconnects.
+MAX_PENDING = 100
+
+# Maximum time (in seconds) to wait for Redis when a change is published
+REDIS_TIMEOUT = 0.5
+
+# Number of seconds to wait before a lost subscription to Redis is made again, or before a listener which failed goes on
+RESUBSCRIBE_SECONDS = 1
+
+# Suffix of the sockets of the "ipc://" channel
+SOCKET_SUFFIX = '.sock'
+
+'''
+The following function is designed to format a change as an event of the stream.
+
+:param object change: The change, a row read by "changes_query"
+:return: Return the event, as bytes
+'''
+def format_event(change):
+    data = json.dumps(get_serializer(Perubahan)(change))
+    return ('id: %d\ndata: %s\n\n' % (change.urutan, data)).encode('utf-8')
+
+'''
+The following function is designed to get the number of the last change a client has, from the "Last-Event-ID" header
+or the "since" argument.
+
+:param object req: The request
+:return: Return the number, or None if the client wants the changes from now on
+:raise ValueError: The number isn't a non-negative integer
+'''
+def stream_position(req):
+    value = req.headers.get('Last-Event-ID') or req.args.get('since')
+    if value is None or value == '':
+        return None
+    position = int(value)
+    if position < 0:
+        raise ValueError(value)
+    return position
+
+'''
+The following class is the channel of the "local://" URL, inside the process.
+'''
+class LocalChannel(object):
+    errors = ()
+
+    def __init__(self):
+        self.callback = None
+
+    def publish(self, message):
+        if self.callback is not None:
+            self.callback(message)
+
+    def subscribe(self, callback):
+        self.callback = callback
+
+'''
+The following class is the channel of the "ipc://" URL. Each process which has clients binds a Unix datagram socket in
+the directory, named by its process ID, and a message is sent to every socket of the directory. The socket of a process
+which is gone is removed by the next message. The directory is removed by the server which made it (see the "on_exit"
+hook of "gunicorn.conf.py").
+'''
+class SocketChannel(object):
+    errors = (OSError,)
+
+    '''
+    :param string directory: The directory of the sockets
+    :param object logger: The logger of the application
+    '''
+    def __init__(self, directory, logger):
+        self.directory = directory
+        self.logger = logger
+        self.sender = None
+        self.lock = threading.Lock()
+
+    def publish(self, message):
+        with self.lock:
+            if self.sender is None:
+                self.sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+                self.sender.setblocking(False)
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if not name.endswith(SOCKET_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                self.sender.sendto(message, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            except BlockingIOError:
+                # The process is behind with its messages, it already has one to read the feed
+                pass
+
+    def subscribe(self, callback):
+        os.makedirs(self.directory, exist_ok = True)
+        path = os.path.join(self.directory, str(os.getpid()) + SOCKET_SUFFIX)
+        # A socket left by a process which had the same ID
+        if os.path.exists(path):
+            os.remove(path)
+        receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        receiver.bind(path)
+        threading.Thread(
+            target = self.listen, args = (receiver, callback), name = 'change-stream-listener', daemon = True
+        ).start()
+
+    def listen(self, receiver, callback):
+        while True:
+            try:
+                callback(receiver.recv(64))
+            except Exception:
+                # A lost message only delays the changes until the next poll, so the listener goes on
+                self.logger.exception('Pesan perubahan tidak dapat diterima')
+                time.sleep(RESUBSCRIBE_SECONDS)
+
+'''
+The following class is the channel of a "redis://" URL, a channel of Redis PUBLISH/SUBSCRIBE.
+'''
+class RedisChannel(object):
+    '''
+    :param string url: The URL of the Redis server
+    :param string name: The name of the channel
+    :param object logger: The logger of the application
+    '''
+    def __init__(self, url, name, logger):
+        import redis
+        from redis.exceptions import RedisError
+        self.redis = redis
+        self.url = url
+        self.name = name
+        self.logger = logger
+        self.errors = (RedisError, OSError)
+        self.client = redis.Redis.from_url(url, socket_timeout = REDIS_TIMEOUT, socket_connect_timeout = REDIS_TIMEOUT)
+
+    def publish(self, message):
+        self.client.publish(self.name, message)
+
+    def subscribe(self, callback):
+        threading.Thread(
+            target = self.listen, args = (callback,), name = 'change-stream-listener', daemon = True
+        ).start()
+
+    def listen(self, callback):
+        # The subscription waits for the messages as long as needed, so its connection has no timeout
+        client = self.redis.Redis.from_url(self.url, socket_connect_timeout = REDIS_TIMEOUT, socket_keepalive = True)
+        while True:
+            try:
+                subscription = client.pubsub(ignore_subscribe_messages = True)
+                subscription.subscribe(self.name)
+                for message in subscription.listen():
+                    callback(message['data'])
+            except self.errors as error:
+                self.logger.warning('Langganan perubahan ke Redis terputus: %s', error)
+                time.sleep(RESUBSCRIBE_SECONDS)
+                # The messages sent meanwhile are lost, the feed is read again
+                callback(None)
+            except Exception:
+                self.logger.exception('Pesan perubahan dari Redis tidak dapat diterima')
+                time.sleep(RESUBSCRIBE_SECONDS)
+
+'''
+The following function is designed to create the channel given by CHANGE_STREAM_URL.
+
+:param object app: The Flask application
+:return: Return the channel
+'''
+def create_channel(app):
+    url = app.config['CHANGE_STREAM_URL']
+    if not url or url == 'local://':
+        return LocalChannel()
+    if url.startswith('ipc://'):
+        return SocketChannel(url[len('ipc://'):], app.logger)
+    return RedisChannel(url, app.config['CHANGE_STREAM_CHANNEL'], app.logger)
+
+'''
+The following class is a client of the stream: the changes are handed to it through a queue, which is an asyncio queue
+when the client is served by an event loop, and a queue of threads otherwise.
+'''
+class Subscriber(object):
+    '''
+    :param object loop: The event loop which serves the client, or None if it is served by a thread
+    '''
+    def __init__(self, loop = None):
+        self.loop = loop
+        self.events = queue.Queue() if loop is None else asyncio.Queue()
+        self.overflow = False
+
+    '''
+    The following method is designed to hand a batch of changes to the client. It must be called in the thread of the
+    event loop of the client, if it has one. None is queued when the client is too far behind, to end its stream.
+
+    :param object self: A must present keyword argument
+    :param list events: The changes, as pairs of their number and their event
+    '''
+    def push(self, events):
+        if self.overflow:
+            return
+        if self.events.qsize() >= MAX_PENDING:
+            self.overflow = True
+            events = None
+        self.events.put_nowait(events)
+
+'''
+The following function is designed to hand a batch of changes to several clients.
+
+:param list subscribers: The clients
+:param list events: The changes, as pairs of their number and their event
+'''
+def push_all(subscribers, events):
+    for subscriber in subscribers:
+        subscriber.push(events)
+
+'''
+The following function is designed to join the events of a batch which a client doesn't have yet.
+
+:param list events: The changes, as pairs of their number and their event
+:param integer last: The number of the last change the client has
+:return: Return the joined events, and the number of the last change
+'''
+def new_events(events, last):
+    chunk = b''.join([data for sequence, data in events if sequence > last])
+    return chunk, max(last, events[-1][0])
+
+'''
+The following class is the stream of the changes of a process, shared by all its clients.
+'''
+class ChangeStream(object):
+    '''
+    :param object app: The Flask application
+    :param object channel: The channel which tells that there are new changes
+    '''
+    def __init__(self, app, channel):
+        self.app = app
+        self.channel = channel
+        self.poll_seconds = app.config['CHANGE_STREAM_POLL']
+        self.heartbeat_seconds = app.config['CHANGE_STREAM_HEARTBEAT']
+        self.sync_limit = app.config['CHANGE_STREAM_SYNC_LIMIT']
+        # Clients by the event loop which serves them (None for the threads)
+        self.subscribers = {}
+        self.last_seen = None
+        self.started = False
+        self.wakeup = threading.Event()
+        self.lock = threading.Lock()
+        self.start_lock = threading.Lock()
+
+    '''
+    The following method is designed to tell the other processes (and this one) that there are new changes, after they
+    are committed.
+
+    :param object self: A must present keyword argument
+    :param integer sequence: The number of the last new change
+    '''
+    def publish(self, sequence):
+        try:
+            self.channel.publish(str(sequence).encode('utf-8'))
+        except self.channel.errors as error:
+            self.app.logger.warning('Perubahan tidak dapat diumumkan: %s', error)
+
+    def wake(self, message):
+        self.wakeup.set()
+
+    '''
+    The following method is designed to start reading the changes, when the process gets its first client. The number of
+    the last change is read first, so the clients get the changes committed after it. It waits for the database, so the
+    asynchronous server calls it in a thread.
+
+    :param object self: A must present keyword argument
+    '''
+    def start(self):
+        with self.start_lock:
+            if self.started:
+                return
+            with self.app.app_context():
+                self.last_seen = last_change()
+            self.channel.subscribe(self.wake)
+            threading.Thread(target = self.run, name = 'change-stream-reader', daemon = True).start()
+            self.started = True
+
+    '''
+    The following method is designed to add a client.
+
+    :param object self: A must present keyword argument
+    :param object subscriber: The client
+    :return: Return the number of the last change read before the client was added: the client gets every change after
+    it, the older ones must be read from the feed
+    '''
+    def subscribe(self, subscriber):
+        self.start()
+        with self.lock:
+            self.subscribers.setdefault(subscriber.loop, set()).add(subscriber)
+            position = self.last_seen
+        change_stream_connections.inc(('sync' if subscriber.loop is None else 'async',))
+        return position
+
+    '''
+    The following method is designed to add a client served by a thread, unless CHANGE_STREAM_SYNC_LIMIT clients are
+    already served by threads.
+
+    :param object self: A must present keyword argument
+    :return: Return the client and the number given by "subscribe", or None if there are too many clients
+    '''
+    def subscribe_sync(self):
+        with self.lock:
+            if len(self.subscribers.get(None, ())) >= self.sync_limit:
+                return None
+            # The place is taken before the stream is started, so the limit holds for clients arriving together
+            subscriber = Subscriber()
+            self.subscribers.setdefault(None, set()).add(subscriber)
+        try:
+            self.start()
+        except Exception:
+            self.unsubscribe(subscriber, counted = False)
+            raise
+        with self.lock:
+            position = self.last_seen
+        change_stream_connections.inc(('sync',))
+        return subscriber, position
+
+    def unsubscribe(self, subscriber, counted = True):
+        with self.lock:
+            subscribers = self.subscribers.get(subscriber.loop)
+            if subscribers is None or subscriber not in subscribers:
+                return
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self.subscribers[subscriber.loop]
+        if counted:
+            change_stream_connections.dec(('sync' if subscriber.loop is None else 'async',))
+
+    '''
+    The following method is designed to read the new changes whenever the channel tells there are some, or every
+    CHANGE_STREAM_POLL seconds, in a thread of its own.
+
+    :param object self: A must present keyword argument
+    '''
+    def run(self):
+        while True:
+            self.wakeup.wait(self.poll_seconds)
+            self.wakeup.clear()
+            try:
+                with self.app.app_context():
+                    self.read_new_changes()
+            except Exception:
+                self.app.logger.exception('Perubahan baru tidak dapat dibaca')
+
+    '''
+    The following method is designed to read the changes after the last one read, and hand them to the clients. Each
+    change is formatted once, for all the clients.
+
+    :param object self: A must present keyword argument
+    '''
+    def read_new_changes(self):
+        has_more = True
+        while has_more:
+            changes, has_more = run(read_changes(self.last_seen, READ_SIZE))
+            if not changes:
+                return
+            events = [(change.urutan, format_event(change)) for change in changes]
+            with self.lock:
+                self.last_seen = events[-1][0]
+                for loop, subscribers in self.subscribers.items():
+                    if loop is None:
+                        push_all(subscribers, events)
+                    else:
+                        loop.call_soon_threadsafe(push_all, list(subscribers), events)
+
+    '''
+    The following method is designed to give the body of a stream served by a thread.
+
+    :param object self: A must present keyword argument
+    :param object subscriber: The client, given by "subscribe_sync"
+    :param integer position: The number given by "subscribe_sync"
+    :param integer since: The number of the last change the client has, or None
+    :return: Return the body, whose "close" removes the client
+    '''
+    def sync_events(self, subscriber, position, since):
+        return SyncEvents(self, subscriber, position, since)
+
+'''
+The following class is the body of a stream served by a thread. The client is removed when the server closes the body,
+even if it is closed before its first event.
+'''
+class SyncEvents(object):
+    def __init__(self, stream, subscriber, position, since):
+        self.stream = stream
+        self.subscriber = subscriber
+        self.position = position
+        self.since = since
+
+    def __iter__(self):
+        yield RETRY
+
+        # The changes the client missed, up to the ones the stream hands to it
+        last = self.position if self.since is None else self.since
+        while last < self.position:
+            with self.stream.app.app_context():
+                changes, has_more = run(read_changes(last, READ_SIZE))
+            changes = [change for change in changes if change.urutan <= self.position]
+            if not changes:
+                break
+            yield b''.join([format_event(change) for change in changes])
+            last = changes[-1].urutan
+        last = max(last, self.position)
+
+        # The new changes
+        while True:
+            try:
+                events = self.subscriber.events.get(timeout = self.stream.heartbeat_seconds)
+            except queue.Empty:
+                yield HEARTBEAT
+                continue
+            if events is None:
+                return
+            chunk, last = new_events(events, last)
+            if chunk:
+                yield chunk
+
+    def close(self):
+        self.stream.unsubscribe(self.subscriber)
+
+'''
+The following function is designed to tell the stream that a transaction which recorded changes is committed.
+
+:param object session: The session
+'''
+def publish_changes(session):
+    sequence = session.info.pop(LAST_CHANGE, None)
+    if sequence is None or not has_app_context():
+        return
+    stream = current_app.extensions.get('change_stream')
+    if stream is not None:
+        stream.publish(sequence)
+
+event.listen(db.session, 'after_commit', publish_changes)
+
+'''
+The following function is designed to register the stream of the changes of an application. Nothing is started until
+its first client.
+
+:param object app: The Flask application
+'''
+def init_change_stream(app):
+    app.extensions['change_stream'] = ChangeStream(app, create_channel(app))
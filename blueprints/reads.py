@@ -0,0 +1,115 @@
+'''
+Read handlers, which are shared by the synchronous Flask application and the asynchronous read path (see
+"blueprints.asgi"). A read handler is written once, as a generator: it parses the request, builds the queries, and
+shapes the response, but it doesn't run a query itself. It yields each query it needs (see "fetch_all", "fetch_first",
+and "fetch_one") and gets its rows back:
+
+    def get_writer(req, writer_id):
+        row = yield fetch_first(db.session.query(*serializer.columns).filter(Penulis.id == writer_id))
+        if row is None:
+            return {'pesan': 'Penulis yang kamu cari tidak ditemukan'}, 404
+        return serializer(row), 200
+
+A resource runs it on the session ("run"), and the asynchronous read path on the asynchronous driver ("run_async"), so
+both give the same response. A helper which needs a query is a generator too, and is called with "yield from".
+'''
+
+# Import from standard libraries
+from collections import namedtuple
+from functools import wraps
+
+# Import helpers
+from blueprints.replicas import read_on_primary, replica_failed
+
+# A query which a read handler needs, and how its rows are fetched: "all", "first" (or None), or "one"
+Fetch = namedtuple('Fetch', ['query', 'kind'])
+
+'''
+The following function is designed to ask for all rows of a query, in a read handler.
+
+:param object query: The query
+:return: Return the request, which the handler yields to get the rows
+'''
+def fetch_all(query):
+    return Fetch(query, 'all')
+
+'''
+The following function is designed to ask for the first row of a query, like "Query.first".
+
+:param object query: The query
+:return: Return the request, which the handler yields to get the row (None if there isn't any)
+'''
+def fetch_first(query):
+    return Fetch(query, 'first')
+
+'''
+The following function is designed to ask for the row of a query which always gives a single row, such as an aggregate.
+
+:param object query: The query
+:return: Return the request, which the handler yields to get the row
+'''
+def fetch_one(query):
+    return Fetch(query, 'one')
+
+'''
+The following function is designed to run a read handler on the session of the application. An error of a query is
+raised inside the handler, like a query which it would have run itself, unless the query failed on a replica: it is then
+run again on the primary (see "replica_failed").
+
+:param object steps: The generator of the read handler
+:return: Return the result of the handler
+'''
+def run(steps):
+    try:
+        fetch = next(steps)
+        while True:
+            try:
+                rows = getattr(fetch.query, fetch.kind)()
+            except Exception as error:
+                if replica_failed(error):
+                    read_on_primary()
+                    continue
+                fetch = steps.throw(error)
+            else:
+                fetch = steps.send(rows)
+    except StopIteration as stop:
+        return stop.value
+
+'''
+The following function is designed to run a read handler on the asynchronous driver. Only the queries wait for the
+database; the rest of the handler runs in the event loop.
+
+:param object database: The "AsyncDatabase" which runs the queries (see "blueprints/async_db.py")
+:param object steps: The generator of the read handler
+:return: Return the result of the handler
+'''
+async def run_async(database, steps):
+    try:
+        fetch = next(steps)
+        while True:
+            try:
+                rows = await getattr(database, 'fetch_' + fetch.kind)(fetch.query)
+            except Exception as error:
+                fetch = steps.throw(error)
+            else:
+                fetch = steps.send(rows)
+    except StopIteration as stop:
+        return stop.value
+
+'''
+The following function is designed to make the handler of an endpoint on the asynchronous read path from a read
+handler.
+
+:param function handler: The read handler, which takes the request and the arguments of the URL
+:param function unless: A function which takes the request, and returns True if the request should be left to the Flask
+application (such as a streamed response)
+:return: Return the coroutine which takes the database, the request, and the arguments of the URL, and returns the result
+of the handler (or None if the request is left to the Flask application)
+'''
+def async_handler(handler, unless = None):
+    @wraps(handler)
+    async def serve(database, req, **kwargs):
+        if unless is not None and unless(req):
+            return None
+        return await run_async(database, handler(req, **kwargs))
+    return serve
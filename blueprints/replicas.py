@@ -0,0 +1,308 @@
+'''
+Routing of the queries between the primary database and its read replicas.
+
+The replicas are given by DATABASE_REPLICA_URIS (see "blueprints/config.py"), and are registered as the binds
+"replica_0", "replica_1", ... The reads of a GET (or HEAD) request are served by one replica, taken in turn among the
+healthy ones; every other request, and every flush or write statement, goes to the primary. A replica whose statement
+fails with an operational error (such as a lost connection) is left out for DB_REPLICA_RETRY seconds, and the query is
+run again on the primary, so the request doesn't fail (see "replica_failed"). The primary serves the reads while no
+replica is healthy.
+
+A replica lags behind the primary, so a client which has just written reads from the primary for DB_STICKY_SECONDS
+(read-your-writes): a successful write answers with the end of that window, in the "db_primary_until" cookie and in the
+"X-Primary-Until" header, and every worker honours either of them. A browser keeps the cookie by itself; a client which
+doesn't keep cookies must send the header back on its next reads, otherwise it may not see its own write for as long as
+the replicas lag. The in-process caches follow the same rule: a replica doesn't fill them shortly after a write of this process, and a client
+in its window doesn't read them. Keep DB_STICKY_SECONDS above the usual replication lag.
+
+Two SQLite files can stand for the primary and a replica on a development machine:
+
+    cp /tmp/primary.db /tmp/replica.db
+    DATABASE_URI=sqlite:////tmp/primary.db DATABASE_REPLICA_URIS=sqlite:////tmp/replica.db python app.py
+
+Nothing copies the writes into "/tmp/replica.db", so it behaves as a replica which never catches up.
+'''
+
+# Import from standard libraries
+import itertools
+import time
+from contextvars import ContextVar
+from threading import Lock
+
+# Import from related third party
+from flask import _app_ctx_stack, current_app, request
+from flask_sqlalchemy import SQLAlchemy, SignallingSession, get_state
+from sqlalchemy import event, exc, orm
+from sqlalchemy.sql.expression import UpdateBase
+
+# Prefix of the binds of the replicas
+REPLICA_PREFIX = 'replica_'
+
+# Cookie and header holding the end of the sticky-primary window of a client, as a UNIX timestamp
+PRIMARY_COOKIE = 'db_primary_until'
+PRIMARY_HEADER = 'X-Primary-Until'
+
+# Methods whose reads are served by a replica, and methods which don't write
+READ_METHODS = ('GET', 'HEAD')
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Route of the current request: the bind of the replica which serves its reads (None for the primary), and whether its
+# client is in its sticky-primary window. Each request (a thread of the synchronous path, or a task of the asynchronous
+# one) sees its own values; outside of a request, everything goes to the primary.
+current_replica = ContextVar('current_replica', default = None)
+reading_own_writes = ContextVar('reading_own_writes', default = False)
+
+# Scope of the session of the current task of the asynchronous path, so that the requests served at once by the event
+# loop don't share a session (None on the synchronous path, where the session is scoped by the thread)
+session_scope = ContextVar('session_scope', default = None)
+
+'''
+The following function is designed to get the binds of the replicas.
+
+:param dict config: Configuration of the application
+:return: Return a dictionary from the name of each bind (such as "replica_0") to the URI of the replica
+'''
+def replica_binds(config):
+    return dict([(REPLICA_PREFIX + str(index), uri) for index, uri in enumerate(config['DB_REPLICA_URIS'])])
+
+'''
+The following class holds the replicas of an application: which of them are healthy, whose turn it is, and when this
+process last wrote to the primary.
+'''
+class ReplicaSet(object):
+    '''
+    :param list names: Names of the binds of the replicas
+    :param integer retry_after: Number of seconds a failing replica is left out
+    :param integer sticky_seconds: Length of the sticky-primary window after a write
+    '''
+    def __init__(self, names, retry_after, sticky_seconds):
+        self.names = list(names)
+        self.retry_after = retry_after
+        self.sticky_seconds = sticky_seconds
+        self.down_until = {}
+        self.turns = itertools.count()
+        self.last_write_at = 0.0
+        self.watched = set()
+        self.lock = Lock()
+
+    '''
+    The following method is designed to choose the replica which serves the next request, in turn among the healthy ones.
+
+    :param object self: A must present keyword argument
+    :return: Return the name of the replica, or None if no replica is healthy
+    '''
+    def choose(self):
+        now = time.time()
+        healthy = [name for name in self.names if self.down_until.get(name, 0) <= now]
+        if not healthy:
+            return None
+        return healthy[next(self.turns) % len(healthy)]
+
+    '''
+    The following method is designed to leave a replica out, after it failed.
+
+    :param object self: A must present keyword argument
+    :param string name: Name of the replica
+    '''
+    def mark_down(self, name):
+        from blueprints.metrics import replica_errors_total
+
+        self.down_until[name] = time.time() + self.retry_after
+        replica_errors_total.inc((name,))
+
+    '''
+    The following method is designed to watch the errors of the engine of a replica, once.
+
+    :param object self: A must present keyword argument
+    :param string name: Name of the replica
+    :param object engine: The engine of the replica
+    '''
+    def watch(self, name, engine):
+        if engine in self.watched:
+            return
+        with self.lock:
+            if engine not in self.watched:
+                event.listen(engine, 'handle_error', lambda context: self.check_error(name, context))
+                self.watched.add(engine)
+
+    '''
+    The following method is designed to leave a replica out if its statement failed because of the database itself (a
+    lost connection, a server which is down, a missing table), not because of the statement.
+
+    :param object self: A must present keyword argument
+    :param string name: Name of the replica
+    :param object context: The context of the error, given by SQLAlchemy
+    '''
+    def check_error(self, name, context):
+        if context.is_disconnect or isinstance(context.sqlalchemy_exception, exc.OperationalError):
+            self.mark_down(name)
+
+    '''
+    The following method is designed to record a write of this process, and get the end of the sticky-primary window of
+    its client.
+
+    :param object self: A must present keyword argument
+    :return: Return the end of the window, as a UNIX timestamp
+    '''
+    def record_write(self):
+        self.last_write_at = time.time()
+        return self.last_write_at + self.sticky_seconds
+
+    '''
+    The following method is designed to check whether this process wrote less than DB_STICKY_SECONDS ago.
+
+    :param object self: A must present keyword argument
+    :return: Return True if it did
+    '''
+    def written_recently(self):
+        return time.time() - self.last_write_at < self.sticky_seconds
+
+'''
+The following function is designed to check whether the value of the sticky-primary cookie is a window which isn't over
+yet. A window longer than DB_STICKY_SECONDS is ignored, so a client can't keep its reads on the primary.
+
+:param string value: Value of the cookie
+:param integer sticky_seconds: Length of the window
+:return: Return True if the client is in its window
+'''
+def in_sticky_window(value, sticky_seconds):
+    try:
+        until = float(value)
+    except (TypeError, ValueError):
+        return False
+    now = time.time()
+    return now < until <= now + sticky_seconds
+
+'''
+The following function is designed to set the route of the current request.
+
+:param string replica: Name of the replica which serves the reads, or None for the primary
+:param boolean sticky: Whether the client is in its sticky-primary window
+'''
+def set_route(replica, sticky):
+    current_replica.set(replica)
+    reading_own_writes.set(sticky)
+
+'''
+The following function is designed to choose the database which serves the reads of a request, and set it as the route
+of the current request.
+
+:param object replicas: The "ReplicaSet" of the application
+:param object req: The request
+:return: Return the name of the replica, or None for the primary
+'''
+def route_request(replicas, req):
+    from blueprints.metrics import database_requests_total
+
+    if req.method not in READ_METHODS:
+        set_route(None, False)
+        return None
+    window = req.cookies.get(PRIMARY_COOKIE) or req.headers.get(PRIMARY_HEADER)
+    if in_sticky_window(window, replicas.sticky_seconds):
+        set_route(None, True)
+        database_requests_total.inc(('primary',))
+        return None
+    replica = replicas.choose()
+    set_route(replica, False)
+    database_requests_total.inc((replica or 'primary',))
+    return replica
+
+'''
+The following function is designed to check whether an error of a query comes from the replica of the current request
+(see "ReplicaSet.check_error"), so that the query should be run again on the primary.
+
+:param object error: The error of the query
+:return: Return True if it does
+'''
+def replica_failed(error):
+    if current_replica.get() is None:
+        return False
+    return isinstance(error, exc.OperationalError) or getattr(error, 'connection_invalidated', False)
+
+'''
+The following function is designed to send the rest of the reads of the current request to the primary, after its
+replica failed.
+'''
+def read_on_primary():
+    from blueprints.metrics import database_requests_total
+
+    set_route(None, reading_own_writes.get())
+    database_requests_total.inc(('primary',))
+
+'''
+The following function is designed to check whether the current request may read the in-process caches. A client in
+its sticky-primary window doesn't, since another worker may hold the value from before its write.
+
+:return: Return True if it may
+'''
+def may_read_cache():
+    return not reading_own_writes.get()
+
+'''
+The following function is designed to check whether the records read by the current request may be put into the
+in-process caches. Records read from a replica shortly after a write of this process may be older than the write.
+
+:return: Return True if they may
+'''
+def may_fill_cache():
+    if current_replica.get() is None:
+        return True
+    return not current_app.extensions['replicas'].written_recently()
+
+'''
+The following class is the session of the application. Its reads are sent to the replica of the current request, and
+its flushes and write statements to the primary.
+'''
+class RoutingSession(SignallingSession):
+    def get_bind(self, mapper = None, clause = None):
+        replica = current_replica.get()
+        if replica is not None and not self._flushing and not isinstance(clause, UpdateBase):
+            engine = get_state(self.app).db.get_engine(self.app, bind = replica)
+            self.app.extensions['replicas'].watch(replica, engine)
+            return engine
+        return SignallingSession.get_bind(self, mapper, clause)
+
+'''
+The following class is the Flask-SQLAlchemy extension, whose sessions are "RoutingSession", scoped by the task of the
+asynchronous path (see "session_scope") or else by the thread.
+'''
+class RoutingSQLAlchemy(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_ = RoutingSession, db = self, **options)
+
+    def create_scoped_session(self, options = None):
+        options = dict(options or {})
+        ident = options.pop('scopefunc', _app_ctx_stack.__ident_func__)
+        options['scopefunc'] = lambda: session_scope.get() or ident()
+        return SQLAlchemy.create_scoped_session(self, options)
+
+'''
+The following function is designed to register the replicas of the application as binds, and the hooks which route
+each request. Without replicas, nothing is registered and everything goes to the primary.
+
+:param object app: The Flask application
+'''
+def init_replica_routing(app):
+    binds = replica_binds(app.config)
+    if not binds:
+        return
+    app.config['SQLALCHEMY_BINDS'] = dict(app.config.get('SQLALCHEMY_BINDS') or {}, **binds)
+    replicas = ReplicaSet(sorted(binds), app.config['DB_REPLICA_RETRY'], app.config['DB_STICKY_SECONDS'])
+    app.extensions['replicas'] = replicas
+
+    @app.before_request
+    def route():
+        route_request(replicas, request)
+
+    # A successful write starts the sticky-primary window of its client
+    @app.after_request
+    def start_sticky_window(response):
+        if request.method not in SAFE_METHODS and response.status_code < 400 and replicas.sticky_seconds > 0:
+            until = '%.3f' % replicas.record_write()
+            response.set_cookie(PRIMARY_COOKIE, until, max_age = replicas.sticky_seconds, httponly = True)
+            response.headers[PRIMARY_HEADER] = until
+        return response
+
+    @app.teardown_request
+    def end_route(exception):
+        set_route(None, False)
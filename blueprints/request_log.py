@@ -0,0 +1,216 @@
+# Import from standard libraries
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# Import from related third party
+from flask import g, request
+from flask.logging import default_handler
+
+# Import helpers
+from blueprints.metrics import log_records_dropped_total
+
+# Default configuration of request logging. Only metadata of each request is logged by default; the body of the
+# response can be captured too (truncated, and only for a sample of the requests). At most REQUEST_LOG_QUEUE_SIZE records
+# wait for the writer thread; the next ones are dropped (and counted) rather than held in memory or waited for.
+DEFAULT_CONFIG = {
+    'REQUEST_LOG_QUEUE_SIZE': 10000,
+    'REQUEST_LOG_BODY': False,
+    'REQUEST_LOG_BODY_MAX_BYTES': 2048,
+    'REQUEST_LOG_BODY_SAMPLE_RATE': 1.0,
+    'REQUEST_LOG_MAX_BYTES': 10000000,
+    'REQUEST_LOG_BACKUP_COUNT': 10,
+}
+
+# Attributes of a log record which hold the data of a structured line, written as "<NAME>\t<JSON>" (such as
+# "REQUEST_LOG\t{...}")
+STRUCTURED_LOGS = ('request_log', 'compression_log')
+
+# Formats of a line of the log file and of the console
+FILE_FORMAT = "[%(asctime)s] {%(pathname)s:%(lineno)d} %(levelname)s - %(message)s"
+CONSOLE_FORMAT = "[%(asctime)s] %(levelname)s in %(module)s: %(message)s"
+
+'''
+The following class is designed to format the log records on the writer thread. A request only gives the data of its log
+as a dictionary (in an attribute of the record named in STRUCTURED_LOGS, such as "request_log"), which is turned into
+JSON here.
+'''
+class RequestLogFormatter(logging.Formatter):
+    def format(self, record):
+        for name in STRUCTURED_LOGS:
+            log_data = getattr(record, name, None)
+            if log_data is not None:
+                record.msg = name.upper() + '\t%s'
+                record.args = (json.dumps(log_data),)
+        return super().format(record)
+
+'''
+The following class is designed to put the log records into the queue as they are. The queue is read by a thread of
+the same process, so the records don't have to be formatted first (which "QueueHandler" does on the calling thread).
+When the queue is full, the record is dropped and counted, so a request never waits for the writer.
+'''
+class RawQueueHandler(QueueHandler):
+    def __init__(self, queue):
+        super().__init__(queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            log_records_dropped_total.inc()
+
+'''
+The following class is designed to read the queue of the log records, from the writer thread. When it is stopped, it
+waits for room in the queue for its end mark (the queue is bounded), since the thread keeps emptying it.
+'''
+class RequestLogListener(QueueListener):
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+'''
+The following class is designed to write the logs of the application from a separate thread: the application only puts
+the log records into a queue, so a request never waits for the formatting nor for the disk.
+
+A thread doesn't survive a fork, so a worker forked from the process which has created the application (gunicorn with
+"preload_app", see "gunicorn.conf.py") starts its own thread, with its own queue.
+'''
+class RequestLogWriter(object):
+    '''
+    :param list handlers: The handlers which write the records, used by the writer thread
+    :param integer queue_size: Maximum number of records which wait for the writer thread
+    '''
+    def __init__(self, handlers, queue_size):
+        self.handlers = handlers
+        self.queue_size = queue_size
+        self.queue_handler = RawQueueHandler(queue.Queue(queue_size))
+        self.listener = None
+        self.pid = None
+
+        # The records which are still in the queue are written when the process exits
+        atexit.register(self.stop)
+
+    '''
+    The following method is designed to start the writer thread of the current process, if it isn't started yet.
+
+    :param object self: A must present keyword argument
+    '''
+    def start(self):
+        if self.listener is not None and self.pid == os.getpid():
+            return
+        self.queue_handler.queue = queue.Queue(self.queue_size)
+        self.listener = RequestLogListener(self.queue_handler.queue, *self.handlers, respect_handler_level = True)
+        self.listener.start()
+        self.pid = os.getpid()
+
+    '''
+    The following method is designed to stop the writer thread, once it has written the records which are in the queue.
+
+    :param object self: A must present keyword argument
+    '''
+    def stop(self):
+        if self.listener is not None and self.pid == os.getpid():
+            self.listener.stop()
+        self.listener = None
+        self.pid = None
+
+'''
+The following function is designed to register the hooks which log every request, and to start the thread which writes
+the logs into a rotating file (REQUEST_LOG_PATH, see "blueprints/config.py") and the console. The hooks only put the data
+of the request into a queue; formatting and writing it is done by the writer thread.
+
+:param object app: The Flask application
+'''
+def init_request_logging(app):
+    for key, value in DEFAULT_CONFIG.items():
+        app.config.setdefault(key, value)
+
+    # The records are only formatted by the writer thread, so the default handler of Flask (which formats them on the
+    # request thread) is replaced by the console handler of the writer
+    formatter = RequestLogFormatter(CONSOLE_FORMAT)
+    console_handler = logging.StreamHandler(sys.stderr)
+    console_handler.setFormatter(formatter)
+    handlers = [console_handler]
+    path = app.config.get('REQUEST_LOG_PATH')
+    if path is None:
+        path = os.path.join(app.root_path, '..', 'storage', 'log', 'app.log')
+    if path:
+        file_handler = RotatingFileHandler(
+            path, maxBytes = app.config['REQUEST_LOG_MAX_BYTES'], backupCount = app.config['REQUEST_LOG_BACKUP_COUNT'],
+            delay = True
+        )
+        file_handler.setFormatter(RequestLogFormatter(FILE_FORMAT))
+        handlers.append(file_handler)
+    writer = RequestLogWriter(handlers, app.config['REQUEST_LOG_QUEUE_SIZE'])
+    app.extensions['request_log'] = writer
+
+    # The logger is shared by the applications of the same package, so the queue of a previous one is replaced. The
+    # records aren't passed to the handlers of the root logger, which would format them on the request thread.
+    for handler in list(app.logger.handlers):
+        if handler is default_handler or isinstance(handler, RawQueueHandler):
+            app.logger.removeHandler(handler)
+    app.logger.addHandler(writer.queue_handler)
+    app.logger.propagate = False
+    app.logger.setLevel(logging.INFO)
+    writer.start()
+
+    # Remember when the request started, to measure its duration
+    @app.before_request
+    def start_timer():
+        g.request_started_at = time.perf_counter()
+
+    # Handle response from a request
+    @app.after_request
+    def after_request(response):
+        started_at = g.get('request_started_at')
+        log_data = {
+            'status_code': response.status_code,
+            'method': request.method,
+            'code': response.status,
+            'uri': request.full_path,
+            'duration_ms': None if started_at is None else round((time.perf_counter() - started_at) * 1000, 3),
+            'response_size': response.content_length,
+        }
+
+        # Capture (part of) the body if it is enabled, except for a streamed response which can't be read here
+        # without consuming it
+        if (
+            app.config['REQUEST_LOG_BODY'] and not response.is_streamed
+            and random.random() < app.config['REQUEST_LOG_BODY_SAMPLE_RATE']
+        ):
+            body = response.get_data()
+            max_bytes = app.config['REQUEST_LOG_BODY_MAX_BYTES']
+            log_data['response'] = body[:max_bytes].decode('utf-8', 'replace')
+            log_data['response_truncated'] = len(body) > max_bytes
+
+        level = logging.INFO if response.status_code == 200 else logging.WARNING
+        app.logger.log(level, 'REQUEST_LOG', extra = {'request_log': log_data})
+        return response
+
+'''
+The following function is designed to start the writer thread of the request log in the current process, such as in a
+worker which has just been forked (see "gunicorn.conf.py"). Nothing is done if it is already running.
+
+:param object app: The Flask application
+'''
+def start_request_log_writer(app):
+    app.extensions['request_log'].start()
+
+'''
+The following function is designed to stop the writer thread of the request log, once it has written the records which
+are in the queue (it is also stopped when the process exits).
+
+:param object app: The Flask application
+'''
+def stop_request_log_writer(app):
+    app.extensions['request_log'].stop()
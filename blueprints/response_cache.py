@@ -0,0 +1,430 @@
+'''
+Cache of whole responses of some expensive read endpoints (such as GET /buku/<id> and the listings by category), shared
+by all workers when it is kept in Redis.
+
+RESPONSE_CACHE_URL chooses where the responses are kept (see "blueprints/config.py"):
+
+- "redis://host:6379/0" (or "rediss://", "unix://"): a Redis server, or any server speaking its protocol, shared by the
+  workers. The "redis" package must be installed.
+- "local://": the memory of the process, for a single worker or a development machine. A worker wouldn't see the
+  writes of the others, so it is refused when WEB_CONCURRENCY is above 1 (which "gunicorn.conf.py" sets).
+- "fakeredis://": an in-process stand-in of a Redis client, to exercise the Redis backend without a server.
+- Empty (the default): no response is cached.
+
+A response is cached under its path, its query string (whose arguments are sorted by name), its "Accept" header, and the
+generation of each resource it is built from ("buku", "penulis", "kategori"). Every write of a resource increments its
+generation (see "bump_generations"), so the next reads use new keys and never see a response from before the write; the
+old entries expire after RESPONSE_CACHE_TTL seconds. The generations are kept without expiry, so Redis must not evict
+them: give it a "volatile-*" eviction policy, which only evicts the keys with a time-to-live (the responses).
+
+A hit is answered without any SQL statement, including 304 when the client already has its ETag. With read replicas,
+a response read from a replica less than DB_STICKY_SECONDS after a write of one of its resources (by any worker) isn't
+cached, since the replica may not have the write yet (see "blueprints/replicas.py").
+'''
+
+# Import from standard libraries
+import asyncio
+import hashlib
+import json
+import queue
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+from urllib.parse import urlencode
+
+# Import from related third party
+from flask import Response, current_app, request
+from werkzeug.datastructures import Headers
+from werkzeug.http import unquote_etag
+
+# Import helpers
+from blueprints.cache import LRUCache, MISSING
+from blueprints.metrics import response_cache_requests_total
+from blueprints.replicas import current_replica
+
+# Headers of a response which are cached with its body
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+# Headers of a 304 response built from a cached response
+VERSION_HEADERS = ('ETag', 'Last-Modified')
+
+# Maximum time (in seconds) to wait for Redis, so a slow server doesn't hold the requests back
+REDIS_TIMEOUT = 0.5
+
+# Number of responses which can wait to be written to Redis
+WRITE_QUEUE_SIZE = 1000
+
+# Key and generations of the response which the current request should cache, set when the cache misses
+pending_entry = ContextVar('pending_entry', default = None)
+
+'''
+The following class is an in-process stand-in of a Redis client, with the commands used by "RedisBackend" and the same
+return values as the "redis" package (the values are bytes). It is shared by nothing but its own process.
+'''
+class FakeRedis(object):
+    def __init__(self):
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def read(self, name):
+        value, expire_at = self.values.get(name, (None, None))
+        if expire_at is not None and expire_at <= time.time():
+            del self.values[name]
+            return None
+        return value
+
+    def get(self, name):
+        with self.lock:
+            return self.read(name)
+
+    def mget(self, keys):
+        with self.lock:
+            return [self.read(name) for name in keys]
+
+    def set(self, name, value, ex = None):
+        if not isinstance(value, bytes):
+            value = str(value).encode('utf-8')
+        with self.lock:
+            self.values[name] = (value, None if ex is None else time.time() + ex)
+        return True
+
+    def incr(self, name):
+        with self.lock:
+            value = int(self.read(name) or 0) + 1
+            self.values[name] = (str(value).encode('utf-8'), None)
+            return value
+
+'''
+The following class is the backend which keeps the cache in Redis, through a client of the "redis" package (or any client
+with the same commands, such as "FakeRedis"). Its calls wait for the server, so the asynchronous read path makes them in
+a thread.
+'''
+class RedisBackend(object):
+    blocking = True
+
+    '''
+    :param object client: The Redis client
+    '''
+    def __init__(self, client):
+        self.client = client
+        try:
+            from redis.exceptions import RedisError
+            self.errors = (RedisError, OSError)
+        except ImportError:
+            self.errors = (OSError,)
+
+    def get(self, key):
+        value = self.client.get(key)
+        return None if value is None else value.decode('utf-8')
+
+    def get_many(self, keys):
+        return [None if value is None else value.decode('utf-8') for value in self.client.mget(keys)]
+
+    def set(self, key, value, ttl = None):
+        self.client.set(key, value, ex = ttl)
+
+    def incr(self, key):
+        return self.client.incr(key)
+
+'''
+The following class is the backend which keeps the cache in the memory of the process. The responses are kept in a
+"LRUCache" (so their number is bounded), and the generations in a dictionary, since they must never be dropped.
+'''
+class LocalBackend(object):
+    blocking = False
+    errors = ()
+
+    '''
+    :param integer max_size: Maximum number of cached responses
+    :param integer ttl: Number of seconds a response is kept
+    '''
+    def __init__(self, max_size, ttl):
+        self.entries = LRUCache(max_size, ttl)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key in self.values:
+                return self.values[key]
+        value = self.entries.get(key)
+        return None if value is MISSING else value
+
+    def get_many(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, ttl = None):
+        if ttl is None:
+            with self.lock:
+                self.values[key] = value
+        else:
+            self.entries.set(key, value)
+
+    def incr(self, key):
+        with self.lock:
+            value = int(self.values.get(key) or 0) + 1
+            self.values[key] = str(value)
+            return value
+
+'''
+The following function is designed to create the backend given by RESPONSE_CACHE_URL.
+
+:param dict config: Configuration of the application
+:return: Return the backend, or None if the responses shouldn't be cached, or raise ValueError if the backend can't serve
+the workers of the application
+'''
+def create_backend(config):
+    url = config['RESPONSE_CACHE_URL']
+    if not url:
+        return None
+    if url == 'local://':
+        # The generations of a process only follow its own writes, so another worker would serve stale responses
+        if config['WORKERS'] > 1:
+            raise ValueError(
+                'RESPONSE_CACHE_URL "local://" hanya untuk satu worker (WEB_CONCURRENCY ' + str(config['WORKERS']) +
+                '), gunakan "redis://"'
+            )
+        return LocalBackend(config['RESPONSE_CACHE_SIZE'], config['RESPONSE_CACHE_TTL'])
+    if url == 'fakeredis://':
+        return RedisBackend(FakeRedis())
+    import redis
+    return RedisBackend(redis.Redis.from_url(url, socket_timeout = REDIS_TIMEOUT, socket_connect_timeout = REDIS_TIMEOUT))
+
+'''
+The following class is the cache of the responses of an application.
+'''
+class ResponseCache(object):
+    '''
+    :param object app: The Flask application
+    :param object backend: The backend which keeps the cache
+    '''
+    def __init__(self, app, backend):
+        self.app = app
+        self.backend = backend
+        self.prefix = app.config['RESPONSE_CACHE_PREFIX']
+        self.ttl = app.config['RESPONSE_CACHE_TTL']
+        self.max_bytes = app.config['RESPONSE_CACHE_MAX_BYTES']
+        self.sticky_seconds = app.config['DB_STICKY_SECONDS']
+        # The time of the writes is only needed to protect the cache from the lag of the replicas
+        self.track_writes = bool(app.config['DB_REPLICA_URIS'])
+        self.writes = queue.Queue(maxsize = WRITE_QUEUE_SIZE)
+        self.writer = None
+        self.lock = threading.Lock()
+
+    def generation_key(self, resource):
+        return self.prefix + 'generasi:' + resource
+
+    def written_at_key(self, resource):
+        return self.prefix + 'ditulis:' + resource
+
+    '''
+    The following method is designed to compute the key of the response of a request.
+
+    :param object self: A must present keyword argument
+    :param object req: The request
+    :param list generations: The generation of each resource of the response
+    :return: Return the key
+    '''
+    def key(self, req, generations):
+        query = urlencode(sorted(req.args.items(multi = True), key = lambda argument: argument[0]))
+        text = '|'.join([req.path, query, req.headers.get('Accept', ''), ','.join(generations)])
+        return self.prefix + 'respons:' + hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    '''
+    The following method is designed to find the cached response of a request. It doesn't use the request context, so
+    the asynchronous read path can call it from a thread.
+
+    :param object self: A must present keyword argument
+    :param object req: The request
+    :param list resources: The resources the response is built from
+    :return: Return the cached response (or None), and what to cache if the response is built (or None)
+    '''
+    def lookup(self, req, resources):
+        # Without an ETag, "If-Modified-Since" is answered by the method itself
+        if req.if_modified_since is not None and not req.if_none_match:
+            return None, None
+        keys = [self.generation_key(resource) for resource in resources]
+        if self.track_writes:
+            keys += [self.written_at_key(resource) for resource in resources]
+        try:
+            values = self.backend.get_many(keys)
+            generations = [value or '0' for value in values[:len(resources)]]
+            key = self.key(req, generations)
+            entry = self.backend.get(key)
+        except self.backend.errors as error:
+            self.app.logger.warning('Cache respons tidak dapat dibaca: %s', error)
+            response_cache_requests_total.inc(('error',))
+            return None, None
+
+        if entry is None:
+            response_cache_requests_total.inc(('miss',))
+            written_at = [float(value) for value in values[len(resources):] if value]
+            return None, (key, max(written_at) if written_at else None)
+        response_cache_requests_total.inc(('hit',))
+        return self.cached_response(req, json.loads(entry)), None
+
+    '''
+    The following method is designed to build the response of a request from a cached response, or 304 if the client
+    already has its version (the ETag is compared weakly, like "check_version" does).
+
+    :param object self: A must present keyword argument
+    :param object req: The request
+    :param dict entry: The cached response
+    :return: Return the response
+    '''
+    def cached_response(self, req, entry):
+        headers = Headers(entry['headers'])
+        etag = headers.get('ETag')
+        if etag is not None and req.if_none_match and req.if_none_match.contains_weak(unquote_etag(etag)[0]):
+            return Response(status = 304, headers = [(name, headers[name]) for name in VERSION_HEADERS if name in headers])
+        return Response(entry['body'], status = 200, headers = headers)
+
+    '''
+    The following method is designed to cache the response of the current request, if its lookup missed and the
+    response can be shared.
+
+    :param object self: A must present keyword argument
+    :param object response: The response
+    '''
+    def store(self, response):
+        pending = pending_entry.get()
+        if pending is None:
+            return
+        pending_entry.set(None)
+        key, written_at = pending
+        if response.status_code != 200 or response.is_streamed or 'Set-Cookie' in response.headers:
+            return
+        if written_at is not None and current_replica.get() is not None and time.time() - written_at < self.sticky_seconds:
+            return
+        body = response.get_data()
+        if len(body) > self.max_bytes:
+            return
+        entry = json.dumps({
+            'headers': [[name, response.headers[name]] for name in CACHED_HEADERS if name in response.headers],
+            'body': body.decode('utf-8'),
+        })
+
+        if not self.backend.blocking:
+            self.backend.set(key, entry, self.ttl)
+            return
+
+        # A response doesn't wait for Redis: the entry is written by a thread of the process
+        self.start_writer()
+        try:
+            self.writes.put_nowait((key, entry))
+        except queue.Full:
+            pass
+
+    def start_writer(self):
+        if self.writer is not None:
+            return
+        with self.lock:
+            if self.writer is None:
+                self.writer = threading.Thread(target = self.write_entries, name = 'response-cache-writer', daemon = True)
+                self.writer.start()
+
+    def write_entries(self):
+        while True:
+            key, entry = self.writes.get()
+            try:
+                self.backend.set(key, entry, self.ttl)
+            except self.backend.errors as error:
+                self.app.logger.warning('Cache respons tidak dapat ditulis: %s', error)
+            finally:
+                self.writes.task_done()
+
+    '''
+    The following method is designed to increment the generation of some resources, after they are written. The time of
+    the write is stored first, so a reader which sees the new generation also sees the time.
+
+    :param object self: A must present keyword argument
+    :param list resources: The written resources
+    '''
+    def bump(self, resources):
+        try:
+            for resource in resources:
+                if self.track_writes:
+                    self.backend.set(self.written_at_key(resource), repr(time.time()))
+                self.backend.incr(self.generation_key(resource))
+        except self.backend.errors as error:
+            self.app.logger.error('Generasi cache respons tidak dapat dinaikkan: %s', error)
+
+'''
+The following function is designed to increment the generation of some resources in the cache of the responses, to be
+called after they are committed. It does nothing when the responses aren't cached.
+
+:param list resources: The written resources, such as "buku"
+'''
+def bump_generations(*resources):
+    cache = current_app.extensions.get('response_cache')
+    if cache is not None:
+        cache.bump(resources)
+
+'''
+The following function is designed to cache the responses of a GET method. It is put above "conditional", so that a hit
+is answered before the version of the data is queried.
+
+:param list resources: The resources the response is built from, such as "buku"
+:return: Return the decorator
+'''
+def cached_response(*resources):
+    def decorator(method):
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            cache = current_app.extensions.get('response_cache')
+            if cache is None:
+                return method(*args, **kwargs)
+            response, pending = cache.lookup(request, resources)
+            if response is not None:
+                return response
+            pending_entry.set(pending)
+            return method(*args, **kwargs)
+        return wrapper
+    return decorator
+
+'''
+The following function is designed to do the same as "cached_response" for a coroutine of the asynchronous read path
+(see "blueprints.asgi"). A backend which waits for a server is read in a thread, so the event loop isn't blocked.
+
+:param list resources: The resources the response is built from
+:return: Return the decorator
+'''
+def cached_response_async(*resources):
+    def decorator(handler):
+        @wraps(handler)
+        async def wrapper(database, req, **kwargs):
+            cache = current_app.extensions.get('response_cache')
+            if cache is None:
+                return await handler(database, req, **kwargs)
+            if cache.backend.blocking:
+                response, pending = await asyncio.get_event_loop().run_in_executor(None, cache.lookup, req, resources)
+            else:
+                response, pending = cache.lookup(req, resources)
+            if response is not None:
+                return response
+            pending_entry.set(pending)
+            return await handler(database, req, **kwargs)
+        return wrapper
+    return decorator
+
+'''
+The following function is designed to cache the responses of the application, if RESPONSE_CACHE_URL is set.
+
+:param object app: The Flask application
+'''
+def init_response_cache(app):
+    backend = create_backend(app.config)
+    if backend is None:
+        return
+    cache = ResponseCache(app, backend)
+    app.extensions['response_cache'] = cache
+
+    @app.after_request
+    def store_response(response):
+        cache.store(response)
+        return response
+
+    @app.teardown_request
+    def forget_response(exception):
+        pending_entry.set(None)
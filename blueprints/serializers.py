@@ -0,0 +1,192 @@
+# Import from standard libraries
+from functools import lru_cache
+
+# Import from related third party
+from flask_restful import fields
+
+# Names used by the RFC 822 format of "fields.DateTime"
+DAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+'''
+The following function is designed to format a datetime the same way as "fields.DateTime" (RFC 822, in UTC), without
+converting it to a timestamp and back.
+
+:param object value: The datetime
+:return: Return the formatted datetime, such as "Sat, 01 Jan 2011 00:00:00 -0000"
+'''
+def format_rfc822(value):
+    time_tuple = value.utctimetuple()
+    return '%s, %02d %s %04d %02d:%02d:%02d -0000' % (
+        DAY_NAMES[time_tuple.tm_wday], time_tuple.tm_mday, MONTH_NAMES[time_tuple.tm_mon - 1], time_tuple.tm_year,
+        time_tuple.tm_hour, time_tuple.tm_min, time_tuple.tm_sec
+    )
+
+'''
+The following function is designed to format a datetime the same way as "fields.DateTime" with ISO 8601 format.
+
+:param object value: The datetime
+:return: Return the formatted datetime
+'''
+def format_iso8601(value):
+    return value.isoformat()
+
+'''
+The following function is designed to get the expression which formats a value the same way as a field of
+"response_fields". Fields which don't have a fast form are formatted by the field itself.
+
+:param object field: The field (such as "fields.Integer")
+:param string name: Name of the field in the generated code
+:param string value: Name of the variable which holds the value in the generated code
+:return: Return the expression, as Python code
+'''
+def format_expression(field, name, value):
+    field_class = field if isinstance(field, type) else type(field)
+    if field_class is fields.Integer:
+        return 'int(' + value + ')'
+    if field_class is fields.String:
+        return 'str(' + value + ')'
+    if field_class is fields.DateTime and getattr(field, 'dt_format', 'rfc822') == 'rfc822':
+        return 'format_rfc822(' + value + ')'
+    if field_class is fields.DateTime and field.dt_format == 'iso8601':
+        return 'format_iso8601(' + value + ')'
+    return name + '.format(' + value + ')'
+
+'''
+The following class is designed to serialize rows (tuples of column values, as returned by a query of columns) into
+the same JSON form as "marshal(record, Model.response_fields)". A function is generated once for each serializer, which
+formats every field inline, so serializing a row doesn't create an ORM object nor call a formatter per field.
+'''
+class RowSerializer(object):
+    '''
+    :param object model: The model whose "response_fields" should be followed
+    :param list extra_fields: Pairs of key and column which are added after "response_fields" (formatted as a string)
+    :param tuple keys: Keys of "response_fields" which should be shown (all of them if None)
+    :param tuple hidden_columns: Columns which are read but not shown, such as the keyset of the pagination
+    '''
+    def __init__(self, model, extra_fields = (), keys = None, hidden_columns = ()):
+        self.keys = []
+        self.columns = []
+        self.fields = []
+        for key, field in model.response_fields.items():
+            if keys is not None and key not in keys:
+                continue
+            field = field() if isinstance(field, type) else field
+            self.keys.append(key)
+            self.columns.append(getattr(model, field.attribute or key))
+            self.fields.append(field)
+        for key, column in extra_fields:
+            self.keys.append(key)
+            self.columns.append(column)
+            self.fields.append(fields.String())
+        for column in hidden_columns:
+            if not any([column is shown_column for shown_column in self.columns]):
+                self.columns.append(column)
+        self.serialize = self.compile()
+
+    '''
+    The following method is designed to generate the function which serializes a row.
+
+    :param object self: A must present keyword argument
+    :return: Return the function
+    '''
+    def compile(self):
+        namespace = {'format_rfc822': format_rfc822, 'format_iso8601': format_iso8601}
+        lines = ['def serialize(row):']
+        items = []
+        for index, (key, field) in enumerate(zip(self.keys, self.fields)):
+            name = 'field_' + str(index)
+            value = 'value_' + str(index)
+            namespace[name] = field
+            namespace[name + '_default'] = field.default
+            lines.append('    ' + value + ' = row[' + str(index) + ']')
+            items.append(
+                repr(key) + ': ' + name + '_default if ' + value + ' is None else '
+                + format_expression(field, name, value)
+            )
+        lines.append('    return {' + ', '.join(items) + '}')
+        exec(compile('\n'.join(lines), '<serializer>', 'exec'), namespace)
+        return namespace['serialize']
+
+    def __call__(self, row):
+        return self.serialize(row)
+
+'''
+The following function is designed to get a serializer, which is generated once for each combination of arguments.
+
+:param object model: The model whose "response_fields" should be followed
+:param tuple extra_fields: Pairs of key and column which are added after "response_fields"
+:param tuple keys: Keys of "response_fields" which should be shown (all of them if None)
+:param tuple hidden_columns: Columns which are read but not shown
+:return: Return the serializer
+'''
+@lru_cache(maxsize = 512)
+def get_serializer(model, extra_fields = (), keys = None, hidden_columns = ()):
+    return RowSerializer(model, extra_fields, keys, hidden_columns)
+
+'''
+The following function is designed to add the arguments of sparse fieldsets ("fields", and "include" if the resource
+has something to include) to a request parser.
+
+:param object parser: An instance of "RequestParser" class
+:param boolean include: Set to True to add "include" argument too
+:return: Return the same parser
+'''
+def add_fieldset_arguments(parser, include = False):
+    parser.add_argument('fields', location = 'args', required = False)
+    if include:
+        parser.add_argument('include', location = 'args', required = False)
+    return parser
+
+'''
+The following function is designed to split a comma separated list of names.
+
+:param string value: The list given by the client
+:return: Return the names, without empty names and duplicates
+'''
+def split_names(value):
+    names = []
+    for name in value.split(','):
+        name = name.strip()
+        if name != '' and name not in names:
+            names.append(name)
+    return names
+
+'''
+The following function is designed to validate the fields ("fields" argument) and the relations ("include" argument)
+asked by the client.
+
+:param dict args: Parsed arguments which contain "fields" (and "include")
+:param object model: The model whose "response_fields" are the valid fields
+:param list includes: Names of the valid relations
+:return: Return the keys of the fields (None if all fields are asked) and the names of the relations, or raise
+ValueError with a message for the client if a name isn't valid
+'''
+def select_fields(args, model, includes = ()):
+    keys = None
+    if args.get('fields') != '' and args.get('fields') is not None:
+        keys = tuple(split_names(args['fields']))
+        for key in keys:
+            if key not in model.response_fields:
+                raise ValueError('Kolom ' + key + ' tidak ada')
+        if not keys:
+            raise ValueError('Kolom tidak boleh dikosongkan')
+    included = []
+    if args.get('include') != '' and args.get('include') is not None:
+        included = split_names(args['include'])
+        for name in included:
+            if name not in includes:
+                raise ValueError('Relasi ' + name + ' tidak ada')
+    return keys, included
+
+'''
+The following function is designed to keep only the fields asked by the client of a record in JSON form.
+
+:param dict record: The record in JSON form
+:param tuple keys: Keys which should be kept (all of them if None)
+:return: Return the record with the asked fields only
+'''
+def pick_fields(record, keys):
+    if keys is None or record is None:
+        return record
+    return dict([(key, value) for key, value in record.items() if key in keys])
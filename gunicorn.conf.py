@@ -0,0 +1,69 @@
+# Configuration of gunicorn, used as "gunicorn -c gunicorn.conf.py wsgi:app" (see "wsgi.py")
+
+# Import from standard libraries
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+# Address to listen to
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+
+# One process per core (plus one), each serving several requests at once with threads. A thread mostly waits for the
+# database, so keep the number of threads close to DB_POOL_SIZE.
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+
+# The application knows how many workers serve it, to refuse the settings which only work in a single process, and how
+# many threads each one has, to bound the streams which hold one (CHANGE_STREAM_SYNC_LIMIT)
+os.environ['WEB_CONCURRENCY'] = str(workers)
+os.environ['GUNICORN_THREADS'] = str(threads)
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+
+# The application is loaded once in the master process, then forked into the workers
+preload_app = True
+
+# Directories of this server, removed when it exits
+SERVER_DIRECTORY = os.path.join(tempfile.gettempdir(), 'kiostix-' + str(os.getpid()))
+
+# The workers tell each other that changes are committed (for GET /buku/stream) through the sockets of a directory of
+# this server, unless CHANGE_STREAM_URL is given: with "local://", a worker would only hear of the changes of the others
+# when it polls the feed (see "blueprints/perubahan/stream.py")
+os.environ.setdefault('CHANGE_STREAM_URL', 'ipc://' + os.path.join(SERVER_DIRECTORY, 'perubahan'))
+
+# Each worker writes its metrics into a directory of this server, so that "/metrics" shows the sum of all workers,
+# whichever one is scraped (see "blueprints/metrics.py")
+os.environ.setdefault('METRICS_DIR', os.path.join(SERVER_DIRECTORY, 'metrik'))
+
+'''
+The following function is designed to run in each worker right after it is forked. Connections of the pool opened by the
+master process (if anything used the database there) are dropped, so that the workers never share a connection. The
+threads which write the request log and the metrics aren't forked either, so each worker starts its own.
+'''
+def post_fork(server, worker):
+    from blueprints import dispose_engine
+    from blueprints.metrics import start_metrics_writer
+    from blueprints.request_log import start_request_log_writer
+    from wsgi import app
+    dispose_engine(app)
+    start_request_log_writer(app)
+    start_metrics_writer(app)
+
+'''
+The following function is designed to run in each worker when it exits, to write the rest of the request log and the
+last snapshot of its metrics.
+'''
+def worker_exit(server, worker):
+    from blueprints.metrics import stop_metrics_writer
+    from blueprints.request_log import stop_request_log_writer
+    from wsgi import app
+    stop_request_log_writer(app)
+    stop_metrics_writer(app)
+
+'''
+The following function is designed to run in the master process when the server exits, to remove the directories of
+this server.
+'''
+def on_exit(server):
+    shutil.rmtree(SERVER_DIRECTORY, ignore_errors = True)
@@ -0,0 +1,41 @@
+"""add nama_penulis to buku
+
+Revision ID: 3b8d52a7c1e9
+Revises: f126f4c042ec
+Create Date: 2026-10-18 15:42:37.106284
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b8d52a7c1e9'
+down_revision = 'f126f4c042ec'
+branch_labels = None
+depends_on = None
+
+# Number of books filled in one statement
+BATCH_SIZE = 1000
+
+
+def upgrade():
+    op.add_column('buku', sa.Column('nama_penulis', sa.String(length=2000), nullable=False, server_default=''))
+
+    # Fill the writer names of the existing books, in the order of "penulis_buku" records
+    bind = op.get_bind()
+    rows = bind.execute(sa.text(
+        'SELECT penulis_buku.id_buku, penulis.nama FROM penulis_buku '
+        'JOIN penulis ON penulis.id = penulis_buku.id_penulis ORDER BY penulis_buku.id'
+    ))
+    names = {}
+    for book_id, name in rows:
+        names.setdefault(book_id, []).append(name)
+    parameters = [{'b_id': book_id, 'b_nama_penulis': ', '.join(book_names)} for book_id, book_names in names.items()]
+    update = sa.text('UPDATE buku SET nama_penulis = :b_nama_penulis WHERE id = :b_id')
+    for start in range(0, len(parameters), BATCH_SIZE):
+        bind.execute(update, parameters[start:start + BATCH_SIZE])
+
+
+def downgrade():
+    op.drop_column('buku', 'nama_penulis')
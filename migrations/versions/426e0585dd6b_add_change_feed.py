@@ -0,0 +1,41 @@
+"""add change feed
+
+Revision ID: 426e0585dd6b
+Revises: 8e4f1d6a9b23
+Create Date: 2026-10-18 14:05:41.208113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '426e0585dd6b'
+down_revision = '8e4f1d6a9b23'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The changes are read in the order of their number, by the primary key
+    op.create_table('perubahan',
+        sa.Column('urutan', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=False, nullable=False),
+        sa.Column('sumber', sa.String(length=20), nullable=False),
+        sa.Column('id_data', sa.Integer(), nullable=False),
+        sa.Column('aksi', sa.String(length=10), nullable=False),
+        sa.Column('waktu', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('urutan')
+    )
+
+    # The counter of the numbers has a single record
+    counter = op.create_table('urutan_perubahan',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('nilai', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.bulk_insert(counter, [{'id': 1, 'nilai': 0}])
+
+
+def downgrade():
+    op.drop_table('urutan_perubahan')
+    op.drop_table('perubahan')
@@ -0,0 +1,64 @@
+"""create catalogue tables
+
+Revision ID: 5d1c0a7e2b94
+Revises:
+Create Date: 2026-10-18 12:48:20.531907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d1c0a7e2b94'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The tables as they were created by "db.create_all()" before the schema was managed by the migrations. A database
+    # which already has them is marked as up to date with this revision instead ("python app.py db stamp 5d1c0a7e2b94"),
+    # then upgraded.
+    op.create_table('kategori',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('kategori', sa.String(length=255), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('penulis',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('nama', sa.String(length=255), nullable=False),
+        sa.Column('nomor_hp', sa.String(length=255), nullable=False),
+        sa.Column('email', sa.String(length=255), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('buku',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('id_kategori', sa.Integer(), nullable=False),
+        sa.Column('judul', sa.String(length=255), nullable=False),
+        sa.Column('penerbit', sa.String(length=255), nullable=False),
+        sa.Column('nomor_isbn', sa.String(length=255), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['id_kategori'], ['kategori.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('penulis_buku',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('id_buku', sa.Integer(), nullable=False),
+        sa.Column('id_penulis', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['id_buku'], ['buku.id']),
+        sa.ForeignKeyConstraint(['id_penulis'], ['penulis.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('penulis_buku')
+    op.drop_table('buku')
+    op.drop_table('penulis')
+    op.drop_table('kategori')
@@ -0,0 +1,41 @@
+"""add unique and lookup indexes
+
+Revision ID: 8e4f1d6a9b23
+Revises: 3b8d52a7c1e9
+Create Date: 2026-10-18 16:20:05.533817
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4f1d6a9b23'
+down_revision = '3b8d52a7c1e9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Uniqueness is enforced by the database, the duplicates must be removed before upgrading
+    op.create_index('uq_buku_nomor_isbn', 'buku', ['nomor_isbn'], unique=True)
+    op.create_index('uq_penulis_nomor_hp', 'penulis', ['nomor_hp'], unique=True)
+    op.create_index('uq_penulis_email', 'penulis', ['email'], unique=True)
+    op.create_index('uq_kategori_kategori', 'kategori', ['kategori'], unique=True)
+
+    # Writers of a book, and books of a writer, are both read from the index only
+    op.create_index('uq_penulis_buku_id_buku_id_penulis', 'penulis_buku', ['id_buku', 'id_penulis'], unique=True)
+    op.create_index('ix_penulis_buku_id_penulis_id_buku', 'penulis_buku', ['id_penulis', 'id_buku'])
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'mysql':
+        # MySQL may use the new indexes for the foreign keys, so give the foreign keys their own indexes back first
+        op.create_index('id_buku', 'penulis_buku', ['id_buku'])
+        op.create_index('id_penulis', 'penulis_buku', ['id_penulis'])
+    op.drop_index('ix_penulis_buku_id_penulis_id_buku', table_name='penulis_buku')
+    op.drop_index('uq_penulis_buku_id_buku_id_penulis', table_name='penulis_buku')
+    op.drop_index('uq_kategori_kategori', table_name='kategori')
+    op.drop_index('uq_penulis_email', table_name='penulis')
+    op.drop_index('uq_penulis_nomor_hp', table_name='penulis')
+    op.drop_index('uq_buku_nomor_isbn', table_name='buku')
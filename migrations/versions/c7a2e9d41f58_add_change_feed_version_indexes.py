@@ -0,0 +1,27 @@
+"""add change feed version indexes
+
+Revision ID: c7a2e9d41f58
+Revises: 426e0585dd6b
+Create Date: 2026-10-18 18:10:27.905114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7a2e9d41f58'
+down_revision = '426e0585dd6b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The versions of the conditional requests read the latest change of a resource, and of a record
+    op.create_index('ix_perubahan_sumber_urutan', 'perubahan', ['sumber', 'urutan'])
+    op.create_index('ix_perubahan_sumber_id_data_urutan', 'perubahan', ['sumber', 'id_data', 'urutan'])
+
+
+def downgrade():
+    op.drop_index('ix_perubahan_sumber_id_data_urutan', table_name='perubahan')
+    op.drop_index('ix_perubahan_sumber_urutan', table_name='perubahan')
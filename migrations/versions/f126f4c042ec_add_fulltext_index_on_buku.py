@@ -0,0 +1,58 @@
+"""add full-text index on buku
+
+Revision ID: f126f4c042ec
+Revises: 5d1c0a7e2b94
+Create Date: 2026-10-18 13:05:12.418305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f126f4c042ec'
+down_revision = '5d1c0a7e2b94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        # FULLTEXT indexes used by MATCH ... AGAINST, one for each searchable column
+        op.create_index('ft_buku_judul', 'buku', ['judul'], mysql_prefix='FULLTEXT')
+        op.create_index('ft_buku_penerbit', 'buku', ['penerbit'], mysql_prefix='FULLTEXT')
+    elif dialect == 'sqlite':
+        # FTS5 index which reads its content from "buku" table, kept in sync by triggers
+        op.execute(
+            "CREATE VIRTUAL TABLE buku_fts USING fts5(judul, penerbit, content='buku', content_rowid='id')"
+        )
+        op.execute(
+            "CREATE TRIGGER buku_fts_after_insert AFTER INSERT ON buku BEGIN "
+            "INSERT INTO buku_fts(rowid, judul, penerbit) VALUES (new.id, new.judul, new.penerbit); "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER buku_fts_after_delete AFTER DELETE ON buku BEGIN "
+            "INSERT INTO buku_fts(buku_fts, rowid, judul, penerbit) VALUES ('delete', old.id, old.judul, old.penerbit); "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER buku_fts_after_update AFTER UPDATE ON buku BEGIN "
+            "INSERT INTO buku_fts(buku_fts, rowid, judul, penerbit) VALUES ('delete', old.id, old.judul, old.penerbit); "
+            "INSERT INTO buku_fts(rowid, judul, penerbit) VALUES (new.id, new.judul, new.penerbit); "
+            "END"
+        )
+        op.execute("INSERT INTO buku_fts(buku_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        op.drop_index('ft_buku_penerbit', table_name='buku')
+        op.drop_index('ft_buku_judul', table_name='buku')
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER buku_fts_after_update")
+        op.execute("DROP TRIGGER buku_fts_after_delete")
+        op.execute("DROP TRIGGER buku_fts_after_insert")
+        op.execute("DROP TABLE buku_fts")
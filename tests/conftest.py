@@ -0,0 +1,175 @@
+# Import from standard libraries
+import json
+
+# Import from related third party
+import pytest
+from sqlalchemy import event
+
+# Import helpers
+from blueprints import create_app, db
+from blueprints.cache import category_cache, writer_cache
+from blueprints.request_log import stop_request_log_writer
+
+'''
+The following fixture is designed to create the application on a new SQLite database for each test. The tables are
+created by the first request, like the application does with DB_CREATE_ALL.
+
+:param object tmp_path: The temporary directory of the test
+:return: Yield the Flask application
+'''
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'kiostix.db'),
+        'DB_CREATE_ALL': True,
+        'RESPONSE_CACHE_URL': '',
+        'REQUEST_LOG_PATH': '',
+        'APP_DEBUG': False,
+        'TESTING': True,
+    })
+
+    # The in-process caches outlive the application, so each test starts with empty ones
+    for cache in [category_cache, writer_cache]:
+        cache.clear()
+        cache.generation = None
+    yield app
+    stop_request_log_writer(app)
+    with app.app_context():
+        db.session.remove()
+        db.get_engine(app).dispose()
+
+'''
+The following fixture is designed to get the test client of the application.
+
+:param object app: The Flask application
+:return: Return the client
+'''
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+'''
+The following function is designed to send a JSON request and read the JSON of the response.
+
+:param object client: The test client
+:param string method: The HTTP method, such as "POST"
+:param string path: The path of the request
+:param dict body: The body of the request
+:return: Return the status code and the JSON of the response
+'''
+def send(client, method, path, body = None):
+    response = client.open(path, method = method, data = json.dumps(body), content_type = 'application/json')
+    return response.status_code, response.get_json()
+
+'''
+The following class is designed to fill the catalogue of a test through the API, like a client would.
+'''
+class Catalogue(object):
+    '''
+    :param object client: The test client
+    '''
+    def __init__(self, client):
+        self.client = client
+        self.count = 0
+        self.categories = []
+        self.writers = []
+
+    '''
+    The following method is designed to create a category.
+
+    :param object self: A must present keyword argument
+    :param string name: Name of the category
+    :return: Return the category in JSON form
+    '''
+    def category(self, name):
+        status, body = send(self.client, 'POST', '/kategori', {'kategori': name})
+        assert status == 200, body
+        return body['kategori_baru']
+
+    '''
+    The following method is designed to create a writer whose phone number and email are unique.
+
+    :param object self: A must present keyword argument
+    :param string name: Name of the writer
+    :return: Return the writer in JSON form
+    '''
+    def writer(self, name):
+        self.count += 1
+        status, body = send(self.client, 'POST', '/penulis', {
+            'nama': name, 'nomor_hp': '0812' + str(self.count).zfill(8), 'email': 'penulis' + str(self.count) + '@kiostix.id'
+        })
+        assert status == 200, body
+        return body['penulis_baru']
+
+    '''
+    The following method is designed to create a book.
+
+    :param object self: A must present keyword argument
+    :param dict category: The category of the book
+    :param list writers: The writers of the book
+    :param string title: Title of the book
+    :param string publisher: Publisher of the book
+    :param string isbn: ISBN of the book, unique by default
+    :return: Return the book in JSON form
+    '''
+    def book(self, category, writers, title, publisher = 'Gramedia', isbn = None):
+        self.count += 1
+        status, body = send(self.client, 'POST', '/buku', {
+            'id_kategori': category['id'], 'judul': title, 'penerbit': publisher,
+            'nomor_isbn': isbn or '978-' + str(self.count).zfill(9), 'id_penulis': [writer['id'] for writer in writers]
+        })
+        assert status == 200, body
+        return body['buku_baru']
+
+    '''
+    The following method is designed to create many books, spread over a few categories and writers (created by the
+    first call, and shared by the next ones).
+
+    :param object self: A must present keyword argument
+    :param integer number: Number of books
+    :return: Return the books in JSON form
+    '''
+    def books(self, number):
+        if not self.categories:
+            self.categories = [self.category('Kategori ' + str(index)) for index in range(3)]
+            self.writers = [self.writer('Penulis ' + str(index)) for index in range(4)]
+        books = []
+        for index in range(self.count, self.count + number):
+            writers = [self.writers[index % 4], self.writers[(index + 1) % 4]]
+            books.append(self.book(self.categories[index % 3], writers, 'Buku ' + str(index)))
+        return books
+
+'''
+The following fixture is designed to fill the catalogue of a test.
+
+:param object client: The test client
+:return: Return the helper which creates the records
+'''
+@pytest.fixture
+def catalogue(client):
+    return Catalogue(client)
+
+'''
+The following class is designed to count the SQL statements sent to the database, by "before_cursor_execute" event.
+'''
+class StatementCounter(object):
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, connection, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+'''
+The following fixture is designed to count the SQL statements of the engine of the application.
+
+:param object app: The Flask application
+:return: Yield the counter, whose "statements" can be cleared before the measured requests
+'''
+@pytest.fixture
+def statements(app):
+    counter = StatementCounter()
+    with app.app_context():
+        engine = db.get_engine(app)
+    event.listen(engine, 'before_cursor_execute', counter)
+    yield counter
+    event.remove(engine, 'before_cursor_execute', counter)
@@ -0,0 +1,117 @@
+# Import from standard libraries
+import asyncio
+import json
+import threading
+from contextvars import ContextVar
+
+# Import from related third party
+import pytest
+
+# Import helpers
+from blueprints import db, reads
+from blueprints.asgi import AsgiApplication
+from blueprints.buku import resources
+
+# The asynchronous read path needs the asynchronous driver of SQLite
+pytest.importorskip('aiosqlite')
+
+# Requests of each read endpoint served natively, including the invalid ones
+PATHS = [
+    '/buku', '/buku?include=kategori', '/buku?limit=2', '/buku?limit=2&fields=id,judul', '/buku?ids=3,1,999', '/buku?ids=x',
+    '/buku?limit=0', '/buku?cursor=salah', '/buku/1', '/buku/1?include=kategori', '/buku/999', '/buku/sesuai-judul?judul=buku',
+    '/buku/sesuai-judul?judul=buku&limit=2', '/buku/sesuai-penulis?penulis=Penulis 1',
+    '/buku/sesuai-kategori?kategori=Kategori 1', '/buku/sesuai-kategori?kategori=Kategori 1&fields=id',
+    '/buku/sesuai-kategori?kategori=Lain', '/buku/cari?judul=buku&kategori=Kategori 0', '/buku/cari?penerbit=Gramedia&limit=2',
+    '/penulis', '/penulis?limit=2', '/penulis?ids=2,1,999', '/penulis?fields=nama', '/penulis/1', '/penulis/999',
+    '/kategori', '/kategori?ids=2,1,999', '/kategori/1', '/kategori/1?fields=salah', '/kategori/999',
+]
+
+# Path of the request sent by the current task
+request_paths = ContextVar('request_paths')
+
+'''
+The following function is designed to send a GET request to an ASGI application.
+
+:param object asgi: The ASGI application
+:param string path: The path of the request, with the query string
+:return: Return the status code, the headers, and the body of the response
+'''
+async def asgi_get(asgi, path):
+    path, _, query_string = path.partition('?')
+    scope = {
+        'type': 'http', 'method': 'GET', 'path': path, 'query_string': query_string.encode(), 'headers': [],
+        'http_version': '1.1', 'scheme': 'http', 'server': ('localhost', 80), 'client': ('127.0.0.1', 1234),
+        'root_path': '',
+    }
+    messages = []
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+    async def send(message):
+        messages.append(message)
+    await asgi(scope, receive, send)
+    headers = dict([(name.decode(), value.decode()) for name, value in messages[0]['headers']])
+    return messages[0]['status'], headers, b''.join([message.get('body', b'') for message in messages[1:]])
+
+'''
+The following function is designed to send the requests to the asynchronous read path, on one event loop.
+
+:param object app: The Flask application
+:param list paths: The paths of the requests
+:return: Return the status code, the headers, and the body of each response
+'''
+def asgi_responses(app, paths):
+    asgi = AsgiApplication(app)
+    async def send_all():
+        try:
+            return [await asgi_get(asgi, path) for path in paths]
+        finally:
+            await asgi.shutdown()
+    return asyncio.run(send_all())
+
+def test_async_read_path_gives_the_same_responses(client, catalogue):
+    catalogue.books(5)
+    for (status, headers, body), path in zip(asgi_responses(client.application, PATHS), PATHS):
+        response = client.get(path)
+        assert status == response.status_code, path
+        assert json.loads(body) == response.get_json(), path
+        assert headers.get('etag') == response.headers.get('ETag'), path
+
+def test_concurrent_requests_build_their_queries_on_their_own_session(client, catalogue, monkeypatch):
+    catalogue.books(2)
+    sessions = {}
+    original = reads.run_async
+
+    # Each request gives way to the others between two looks at its session
+    async def run_async(database, steps):
+        path = request_paths.get()
+        sessions.setdefault(path, []).append(db.session())
+        await asyncio.sleep(0)
+        sessions[path].append(db.session())
+        return await original(database, steps)
+    monkeypatch.setattr(reads, 'run_async', run_async)
+
+    asgi = AsgiApplication(client.application)
+    async def get(path):
+        request_paths.set(path)
+        return await asgi_get(asgi, path)
+    async def send_all():
+        try:
+            return await asyncio.gather(*[get(path) for path in ['/buku', '/penulis', '/kategori']])
+        finally:
+            await asgi.shutdown()
+    assert [status for status, _, _ in asyncio.run(send_all())] == [200, 200, 200]
+    assert all([len(set(map(id, seen))) == 1 for seen in sessions.values()])
+    assert len(set([id(seen[0]) for seen in sessions.values()])) == 3
+
+def test_exports_are_served_by_their_own_threads(client, catalogue, monkeypatch):
+    catalogue.books(2)
+    threads = []
+    original = resources.iterate_in_batches
+    def iterate_in_batches(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        return original(*args, **kwargs)
+    monkeypatch.setattr(resources, 'iterate_in_batches', iterate_in_batches)
+
+    status, headers, body = asgi_responses(client.application, ['/buku?format=ndjson'])[0]
+    assert status == 200 and len(body.splitlines()) == 2
+    assert len(threads) == 1 and threads[0].startswith('asgi_export_threads')
@@ -0,0 +1,128 @@
+# Import from related third party
+import pytest
+
+# Import helpers
+from blueprints import db
+from blueprints.buku import batch
+from blueprints.cache import get_writers
+from conftest import send
+
+# Import models
+from blueprints.penulis.model import Penulis
+
+'''
+The following function is designed to send a batch and check that its response is successful.
+
+:param object client: The test client
+:param list operations: The operations
+:return: Return the status code of each operation
+'''
+def apply_batch(client, operations):
+    status, body = send(client, 'POST', '/buku/batch', {'operasi': operations})
+    assert status == 200, body
+    return [result['status'] for result in body['hasil']]
+
+'''
+The following function is designed to get the ISBN of each book.
+
+:param object client: The test client
+:return: Return a dictionary from ID to ISBN
+'''
+def isbns(client):
+    return dict([(book['id'], book['nomor_isbn']) for book in client.get('/buku').get_json()])
+
+'''
+The following function is designed to make an operation which edits a book.
+
+:param dict book: The book in JSON form
+:param string isbn: The new ISBN
+:param list writers: The writers of the book
+:return: Return the operation
+'''
+def edit(book, isbn, writers):
+    return {
+        'aksi': 'ubah', 'id': book['id'], 'id_kategori': book['id_kategori'], 'judul': book['judul'],
+        'penerbit': book['penerbit'], 'nomor_isbn': isbn, 'id_penulis': [writer['id'] for writer in writers]
+    }
+
+def test_each_operation_gets_its_own_result(client, catalogue):
+    first, second, third = catalogue.books(3)
+    writers = catalogue.writers[:1]
+    create = dict(edit(first, '978-BARU', writers), aksi = 'tambah')
+    statuses = apply_batch(client, [
+        create,
+        edit(first, first['nomor_isbn'], writers),
+        {'aksi': 'hapus', 'id': second['id']},
+        {'aksi': 'hapus', 'id': second['id']},
+        {'aksi': 'hapus', 'id': 999999},
+        {'aksi': 'pinjam'},
+        dict(create, id_penulis = [999999]),
+        dict(create, id_kategori = 999999),
+        edit(third, first['nomor_isbn'], writers),
+    ])
+    assert statuses == [200, 200, 200, 409, 404, 400, 400, 400, 409]
+    assert isbns(client) == {first['id']: first['nomor_isbn'], third['id']: third['nomor_isbn'], third['id'] + 1: '978-BARU'}
+    changes = client.get('/buku/perubahan?since=0').get_json()['data'][-3:]
+    assert [(change['aksi'], change['id']) for change in changes] == [
+        ('tambah', third['id'] + 1), ('ubah', first['id']), ('hapus', second['id'])
+    ]
+
+def test_books_can_swap_their_isbn(client, catalogue):
+    first, second, third = catalogue.books(3)
+    writers = catalogue.writers[:1]
+    statuses = apply_batch(client, [
+        edit(first, second['nomor_isbn'], writers),
+        edit(second, third['nomor_isbn'], writers),
+        edit(third, first['nomor_isbn'], writers),
+    ])
+    assert statuses == [200, 200, 200]
+    assert isbns(client) == {
+        first['id']: second['nomor_isbn'], second['id']: third['nomor_isbn'], third['id']: first['nomor_isbn']
+    }
+
+def test_isbn_of_a_deleted_book_can_be_used(client, catalogue):
+    first, = catalogue.books(1)
+    create = dict(edit(first, first['nomor_isbn'], catalogue.writers[:1]), aksi = 'tambah')
+    assert apply_batch(client, [create, {'aksi': 'hapus', 'id': first['id']}]) == [200, 200]
+    assert list(isbns(client).values()) == [first['nomor_isbn']]
+
+def test_isbn_isnt_given_up_by_a_failed_operation(client, catalogue):
+    first, second, third = catalogue.books(3)
+    writers = catalogue.writers[:1]
+
+    # The first book can't take the ISBN of the third one, so the second book can't take the ISBN of the first one
+    statuses = apply_batch(client, [
+        edit(first, third['nomor_isbn'], writers),
+        edit(second, first['nomor_isbn'], writers),
+        dict(edit(first, 'lain', writers), aksi = 'tambah', nomor_isbn = second['nomor_isbn']),
+    ])
+    assert statuses == [409, 409, 409]
+    assert isbns(client) == {
+        first['id']: first['nomor_isbn'], second['id']: second['nomor_isbn'], third['id']: third['nomor_isbn']
+    }
+
+def test_linked_operations_are_applied_together(client, catalogue, monkeypatch):
+    monkeypatch.setattr(batch, 'CHUNK_SIZE', 2)
+    books = catalogue.books(4)
+    writers = catalogue.writers[:1]
+    statuses = apply_batch(client, [
+        edit(books[0], books[3]['nomor_isbn'], writers),
+        edit(books[1], books[1]['nomor_isbn'] + '-2', writers),
+        edit(books[2], books[2]['nomor_isbn'] + '-3', writers),
+        edit(books[3], books[0]['nomor_isbn'], writers),
+    ])
+    assert statuses == [200, 200, 200, 200]
+    assert isbns(client)[books[0]['id']] == books[3]['nomor_isbn']
+    assert isbns(client)[books[3]['id']] == books[0]['nomor_isbn']
+
+def test_writer_names_are_read_from_the_database(app, client, catalogue):
+    first, = catalogue.books(1)
+    writer = catalogue.writers[0]
+    with app.test_request_context():
+        get_writers([writer['id']])
+
+        # Another process renames the writer, while this process still has the old name in its cache
+        Penulis.query.filter_by(id = writer['id']).update({'nama': 'Nama Baru'})
+        db.session.commit()
+    assert apply_batch(client, [edit(first, first['nomor_isbn'], [writer])]) == [200]
+    assert client.get('/buku/' + str(first['id'])).get_json()['penulis'] == 'Nama Baru'
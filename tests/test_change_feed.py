@@ -0,0 +1,72 @@
+'''
+The following function is designed to read the changes after a number.
+
+:param object client: The test client
+:param integer since: The number of the last change the client has
+:return: Return the changes as (resource, action, ID)
+'''
+def changes_since(client, since):
+    body = client.get('/buku/perubahan', query_string = {'since': since}).get_json()
+    return [(change['sumber'], change['aksi'], change['id']) for change in body['data']]
+
+'''
+The following function is designed to get the number of the last change.
+
+:param object client: The test client
+:return: Return the number, or 0 if there isn't any change
+'''
+def last_number(client):
+    changes = client.get('/buku/perubahan').get_json()['data']
+    return changes[-1]['urutan'] if changes else 0
+
+def test_deleted_records_are_kept_as_tombstones(client, catalogue):
+    category = catalogue.category('Novel')
+    writer = catalogue.writer('Andi')
+    book = catalogue.book(category, [writer], 'Buku')
+    since = last_number(client)
+
+    # The book goes first, so its writer and its category can be deleted
+    for path in ['/buku/' + str(book['id']), '/penulis/' + str(writer['id']), '/kategori/' + str(category['id'])]:
+        assert client.delete(path).status_code == 200
+        assert client.get(path).status_code == 404
+    assert changes_since(client, since) == [
+        ('buku', 'hapus', book['id']), ('penulis', 'hapus', writer['id']), ('kategori', 'hapus', category['id'])
+    ]
+
+    # The numbers follow each other, and a client which has read the tombstones gets nothing more
+    numbers = [change['urutan'] for change in client.get('/buku/perubahan?since=' + str(since)).get_json()['data']]
+    assert numbers == [since + 1, since + 2, since + 3]
+    assert changes_since(client, since + 3) == []
+
+def test_rejected_deletes_leave_no_tombstone(client, catalogue):
+    category = catalogue.category('Novel')
+    writer = catalogue.writer('Andi')
+    catalogue.book(category, [writer], 'Buku')
+    since = last_number(client)
+    assert client.delete('/penulis/' + str(writer['id'])).status_code == 400
+    assert client.delete('/kategori/' + str(category['id'])).status_code == 400
+    assert client.delete('/buku/999').status_code == 404
+    assert changes_since(client, since) == []
+
+def test_tombstone_stays_when_the_isbn_is_used_again(client, catalogue):
+    category = catalogue.category('Novel')
+    writer = catalogue.writer('Andi')
+    book = catalogue.book(category, [writer], 'Buku')
+    since = last_number(client)
+    assert client.delete('/buku/' + str(book['id'])).status_code == 200
+    new_book = catalogue.book(category, [writer], 'Buku', isbn = book['nomor_isbn'])
+
+    # The new book may even get the same ID (SQLite reuses the biggest one), the tombstone is still read first
+    assert changes_since(client, since) == [('buku', 'hapus', book['id']), ('buku', 'tambah', new_book['id'])]
+
+def test_counter_is_locked_after_every_other_write(client, catalogue, statements):
+    book, = catalogue.books(1)
+    statements.statements[:] = []
+    assert client.delete('/buku/' + str(book['id'])).status_code == 200
+
+    # Only the numbers are taken and the changes inserted while the counter is locked, before the commit
+    locked = [statement.split()[0:3] for statement in statements.statements]
+    start = locked.index(['UPDATE', 'urutan_perubahan', 'SET'])
+    assert [statement[0] for statement in locked[start + 1:]] == ['SELECT', 'INSERT']
+    assert locked[-1][:3] == ['INSERT', 'INTO', 'perubahan']
+    assert ['DELETE', 'FROM', 'buku'] in locked[:start]
@@ -0,0 +1,75 @@
+# Import from standard libraries
+import logging
+import os
+import queue
+import runpy
+
+# Import from related third party
+import pytest
+
+# Import helpers
+from blueprints.config import load_config
+from blueprints.perubahan import stream
+from blueprints.perubahan.stream import SYNC_RETRY_AFTER, SocketChannel
+
+# Configuration of gunicorn
+GUNICORN_CONF = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gunicorn.conf.py')
+
+def test_streams_over_the_limit_are_refused(app, client):
+    app.extensions['change_stream'].sync_limit = 1
+    stream = client.get('/buku/stream', buffered = False)
+    assert stream.status_code == 200
+
+    # The thread of the first stream is taken until it is closed
+    refused = client.get('/buku/stream')
+    assert refused.status_code == 503
+    assert refused.headers['Retry-After'] == str(SYNC_RETRY_AFTER)
+    assert 'GET /buku/perubahan' in refused.get_json()['pesan']
+    stream.close()
+    second = client.get('/buku/stream', buffered = False)
+    assert second.status_code == 200
+    second.close()
+
+def test_gunicorn_workers_hear_of_each_other(monkeypatch):
+    monkeypatch.setattr(os, 'environ', {})
+    runpy.run_path(GUNICORN_CONF)
+    assert os.environ['CHANGE_STREAM_URL'].startswith('ipc://')
+
+    # A given channel is kept
+    monkeypatch.setattr(os, 'environ', {'CHANGE_STREAM_URL': 'redis://localhost:6379/0'})
+    runpy.run_path(GUNICORN_CONF)
+    assert os.environ['CHANGE_STREAM_URL'] == 'redis://localhost:6379/0'
+
+@pytest.mark.parametrize('environ, limit', [
+    ({}, 1),
+    ({'GUNICORN_THREADS': '16'}, 4),
+    ({'GUNICORN_THREADS': '2'}, 1),
+    ({'GUNICORN_THREADS': '1'}, 0),
+    ({'GUNICORN_THREADS': '4', 'CHANGE_STREAM_SYNC_LIMIT': '10'}, 3),
+])
+def test_stream_limit_leaves_threads_to_the_other_requests(monkeypatch, environ, limit):
+    for name in ['GUNICORN_THREADS', 'CHANGE_STREAM_SYNC_LIMIT']:
+        monkeypatch.delenv(name, raising = False)
+    for name, value in environ.items():
+        monkeypatch.setenv(name, value)
+    assert load_config()['CHANGE_STREAM_SYNC_LIMIT'] == limit
+
+def test_gunicorn_tells_its_threads(monkeypatch):
+    monkeypatch.setattr(os, 'environ', {'GUNICORN_THREADS': '8'})
+    runpy.run_path(GUNICORN_CONF)
+    assert os.environ['GUNICORN_THREADS'] == '8'
+    assert load_config()['CHANGE_STREAM_SYNC_LIMIT'] == 2
+
+def test_socket_listener_goes_on_after_an_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(stream, 'RESUBSCRIBE_SECONDS', 0)
+    received = queue.Queue()
+    def callback(message):
+        if message == b'rusak':
+            raise ValueError(message)
+        received.put(message)
+    logger = logging.getLogger('test_change_stream')
+    channel = SocketChannel(str(tmp_path / 'perubahan'), logger)
+    channel.subscribe(callback)
+    channel.publish(b'rusak')
+    channel.publish(b'1')
+    assert received.get(timeout = 5) == b'1'
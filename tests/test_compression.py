@@ -0,0 +1,144 @@
+# Import from standard libraries
+import gzip
+import json
+import threading
+import zlib
+
+# Import from related third party
+import pytest
+from werkzeug.datastructures import Headers
+
+# Import helpers
+from blueprints import compression, create_app, request_log
+from blueprints.compression import GZIP_WBITS, CompressionMiddleware, negotiate
+from blueprints.request_log import stop_request_log_writer
+
+'''
+The following function is designed to send a GET request which accepts some encodings.
+
+:param object client: The test client
+:param string path: The path of the request
+:param string accept_encoding: Value of the "Accept-Encoding" header
+:return: Return the response
+'''
+def get_encoded(client, path, accept_encoding = 'gzip', **kwargs):
+    headers = dict(kwargs.pop('headers', {}), **{'Accept-Encoding': accept_encoding})
+    return client.get(path, headers = headers, **kwargs)
+
+'''
+The following function is designed to compress a response with a middleware, outside of any request.
+
+:param object app: The Flask application
+:param list headers: The headers of the response
+:param bytes body: The body of the response
+:param string accept_encoding: Value of the "Accept-Encoding" header of the request
+:return: Return the headers and the body of the compressed response
+'''
+def compress(app, headers, body, accept_encoding = 'gzip'):
+    middleware = CompressionMiddleware(app, None)
+    environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': '/', 'HTTP_ACCEPT_ENCODING': accept_encoding}
+    _, headers, iterable = middleware.compress(environ, '200 OK', headers, [body])
+    return Headers(headers), b''.join(iterable)
+
+def test_encoding_follows_the_preference_of_the_client():
+    assert negotiate('gzip, br', ['br', 'gzip']) == 'br'
+    assert negotiate('gzip, br', ['gzip']) == 'gzip'
+    assert negotiate('br;q=0.5, gzip', ['br', 'gzip']) == 'gzip'
+    assert negotiate('br;q=0, gzip;q=0', ['br', 'gzip']) is None
+    assert negotiate('*', ['gzip']) == 'gzip'
+    assert negotiate('identity', ['br', 'gzip']) is None
+    assert negotiate('', ['br', 'gzip']) is None
+
+def test_large_responses_are_compressed(client, catalogue):
+    for index in range(60):
+        catalogue.category('Kategori dengan nama yang cukup panjang ' + str(index))
+    plain = client.get('/kategori')
+    response = get_encoded(client, '/kategori')
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert int(response.headers['Content-Length']) == len(response.data) < len(plain.data)
+    assert gzip.decompress(response.data) == plain.data
+
+    # Without "Accept-Encoding", or when gzip is refused, the body is sent as it is
+    assert 'Content-Encoding' not in plain.headers
+    assert 'Content-Encoding' not in get_encoded(client, '/kategori', 'gzip;q=0').headers
+
+def test_small_responses_are_not_compressed(app, client, catalogue):
+    catalogue.category('Novel')
+    response = get_encoded(client, '/kategori')
+    assert len(response.data) < app.config['COMPRESS_MIN_SIZE']
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+def test_streamed_responses_are_compressed_as_they_go(app, client, catalogue):
+    catalogue.books(30)
+    app.config['COMPRESS_FLUSH_BYTES'] = 512
+    plain = client.get('/buku?format=ndjson').data
+    response = get_encoded(client, '/buku?format=ndjson', buffered = False)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+
+    # Each flush gives the client whole lines, without waiting for the end of the stream
+    decompressor = zlib.decompressobj(GZIP_WBITS)
+    pieces = [decompressor.decompress(chunk) for chunk in response.response]
+    response.close()
+    flushed = [piece for piece in pieces if piece]
+    assert len(flushed) > 1
+    assert all([piece.endswith(b'\n') for piece in flushed])
+    assert b''.join(pieces) == plain
+
+def test_no_transform_responses_are_left_alone(app):
+    body = b'{"data": "' + b'x' * 4096 + b'"}'
+    headers, compressed = compress(app, [('Content-Type', 'application/json'), ('Content-Length', str(len(body)))], body)
+    assert headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed) == body
+
+    headers, sent = compress(app, [
+        ('Content-Type', 'application/json'), ('Content-Length', str(len(body))), ('Cache-Control', 'no-transform')
+    ], body)
+    assert 'Content-Encoding' not in headers
+    assert sent == body
+
+def test_the_etag_of_a_compressed_response_is_weak(client, catalogue):
+    for index in range(60):
+        catalogue.category('Kategori dengan nama yang cukup panjang ' + str(index))
+    etag = client.get('/kategori').headers['ETag']
+    response = get_encoded(client, '/kategori')
+    assert not etag.startswith('W/')
+    assert response.headers['ETag'] == 'W/' + etag
+
+    # Either form of the ETag is the same version
+    for version in [etag, response.headers['ETag']]:
+        assert get_encoded(client, '/kategori', headers = {'If-None-Match': version}).status_code == 304
+
+@pytest.mark.skipif(compression.brotli is None, reason = 'brotli is not installed')
+def test_brotli_is_preferred_when_installed(app):
+    import brotli
+
+    body = b'{"data": "' + b'x' * 4096 + b'"}'
+    headers, compressed = compress(app, [('Content-Type', 'application/json')], body, 'gzip, br')
+    assert headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(compressed) == body
+
+def test_compressions_are_logged_by_the_writer_thread(tmp_path, monkeypatch):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'kiostix.db'), 'RESPONSE_CACHE_URL': '',
+        'REQUEST_LOG_PATH': str(tmp_path / 'app.log'), 'APP_DEBUG': False, 'TESTING': True,
+    })
+    threads = []
+    format_record = request_log.RequestLogFormatter.format
+
+    # Record the thread which turns the data of a compression into JSON
+    def recorded_format(formatter, record):
+        if getattr(record, 'compression_log', None) is not None:
+            threads.append(threading.current_thread())
+        return format_record(formatter, record)
+    monkeypatch.setattr(request_log.RequestLogFormatter, 'format', recorded_format)
+
+    body = b'{"data": "' + b'x' * 4096 + b'"}'
+    compress(app, [('Content-Type', 'application/json'), ('Content-Length', str(len(body)))], body)
+    stop_request_log_writer(app)
+    with open(app.config['REQUEST_LOG_PATH']) as log_file:
+        logged = [json.loads(line.split('COMPRESSION_LOG\t', 1)[1]) for line in log_file if 'COMPRESSION_LOG\t' in line]
+    assert [(data['uri'], data['encoding'], data['original_size']) for data in logged] == [('/', 'gzip', len(body))]
+    assert threads and threading.current_thread() not in threads
@@ -0,0 +1,161 @@
+# Import from standard libraries
+import time
+from datetime import datetime, timedelta
+
+# Import from related third party
+import pytest
+from werkzeug.http import http_date, parse_date
+
+# Import helpers
+from blueprints import db
+from blueprints.cache import request_generations, store_found, writer_cache
+from blueprints.perubahan.feed import UPDATE, record_changes
+from conftest import send
+
+# Import models
+from blueprints.kategori.model import Kategori
+from blueprints.penulis.model import Penulis
+from blueprints.perubahan.model import Perubahan
+
+'''
+The following function is designed to get the ETag of a response, and check that it is sent.
+
+:param object client: The test client
+:param string path: The path of the request
+:return: Return the ETag
+'''
+def etag_of(client, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    return response.headers['ETag']
+
+'''
+The following function is designed to make an operation which renames a book.
+
+:param dict book: The book in JSON form
+:param string title: The new title
+:param list writers: The writers of the book
+:return: Return the body of PUT /buku/<book_id>
+'''
+def renamed_book(book, title, writers):
+    return {
+        'id_kategori': book['id_kategori'], 'judul': title, 'penerbit': book['penerbit'],
+        'nomor_isbn': book['nomor_isbn'], 'id_penulis': [writer['id'] for writer in writers]
+    }
+
+@pytest.mark.parametrize('path', ['/buku', '/buku?include=kategori', '/buku/1', '/buku/sesuai-kategori?kategori=Kategori 0'])
+def test_every_write_in_the_same_second_changes_the_etag(client, catalogue, path):
+    book, = catalogue.books(1)
+    etags = [etag_of(client, path)]
+    for title in ['Judul 1', 'Judul 2', 'Judul 3']:
+        assert send(client, 'PUT', '/buku/1', renamed_book(book, title, catalogue.writers[:1]))[0] == 200
+        etags.append(etag_of(client, path))
+    assert len(set(etags)) == len(etags)
+    assert client.get(path, headers = {'If-None-Match': etags[-1]}).status_code == 304
+
+def test_book_version_follows_its_writers_and_category(client, catalogue):
+    book, = catalogue.books(1)
+    other = catalogue.writer('Penulis lain')
+    etag = etag_of(client, '/buku/1')
+
+    # A writer which isn't a writer of the book doesn't change its version
+    assert send(client, 'PUT', '/penulis/' + str(other['id']), dict(other, nama = 'Nama lain'))[0] == 200
+    assert client.get('/buku/1', headers = {'If-None-Match': etag}).status_code == 304
+
+    writer = catalogue.writers[0]
+    assert send(client, 'PUT', '/penulis/' + str(writer['id']), dict(writer, nama = 'Nama baru'))[0] == 200
+    assert etag_of(client, '/buku/1') != etag
+    etag = etag_of(client, '/buku/1')
+    assert send(client, 'PUT', '/kategori/' + str(book['id_kategori']), {'kategori': 'Kategori baru'})[0] == 200
+    assert etag_of(client, '/buku/1') != etag
+
+def test_writer_and_category_versions(client, catalogue):
+    writer = catalogue.writer('Andi')
+    category = catalogue.category('Novel')
+    for path, body in [
+        ('/penulis/' + str(writer['id']), dict(writer, nama = 'Budi')),
+        ('/kategori/' + str(category['id']), {'kategori': 'Komik'}),
+    ]:
+        collection = path.rsplit('/', 1)[0]
+        etags = [etag_of(client, path), etag_of(client, collection)]
+        assert send(client, 'PUT', path, body)[0] == 200
+        assert etag_of(client, path) != etags[0]
+        assert etag_of(client, collection) != etags[1]
+    assert client.get('/penulis/999').status_code == 404
+
+'''
+The following function is designed to change a record the way another process does: in the database and the change
+feed, without touching the caches of this process.
+
+:param object app: The application
+:param object model: The model of the record
+:param string resource: The resource of the record in the change feed
+:param integer record_id: ID of the record
+:param dict values: The new values of the columns
+'''
+def change_in_another_process(app, model, resource, record_id, values):
+    with app.app_context():
+        record = model.query.get(record_id)
+        for key, value in values.items():
+            setattr(record, key, value)
+        record_changes(resource, UPDATE, [record])
+        db.session.commit()
+
+@pytest.mark.parametrize('model, resource, path, values', [
+    (Penulis, 'penulis', '/penulis/{}', {'nama': 'Nama dari proses lain'}),
+    (Penulis, 'penulis', '/penulis?ids={}', {'nama': 'Nama dari proses lain'}),
+    (Kategori, 'kategori', '/kategori/{}', {'kategori': 'Kategori dari proses lain'}),
+    (Kategori, 'kategori', '/kategori?ids={}', {'kategori': 'Kategori dari proses lain'}),
+])
+def test_body_is_as_new_as_its_etag(app, client, catalogue, model, resource, path, values):
+    record = catalogue.writer('Andi') if model is Penulis else catalogue.category('Novel')
+    path = path.format(record['id'])
+
+    # The records are in the caches of this process, then another process changes one of them
+    old = client.get(path)
+    assert client.get(path).get_data() == old.get_data()
+    change_in_another_process(app, model, resource, record['id'], values)
+
+    new = client.get(path)
+    assert new.headers['ETag'] != old.headers['ETag']
+    body = new.get_json()
+    for key, value in values.items():
+        assert body.get('data', [body])[0][key] == value
+
+def test_records_older_than_the_cache_are_not_stored(app):
+    writer_cache.follow(2)
+
+    # A request which has read an older version may have read older records
+    with app.test_request_context():
+        token = request_generations.set({'penulis': 1})
+        store_found(writer_cache, [1], {1: {'nama': 'Lama'}})
+        request_generations.reset(token)
+    assert writer_cache.statistics()['ukuran'] == 0
+
+def test_last_modified_is_only_sent_once_the_second_is_over(app, client, catalogue):
+    catalogue.books(1)
+    assert 'Last-Modified' not in client.get('/buku/1').headers
+
+    # The same change, one minute ago
+    with app.app_context():
+        last_modified = (datetime.utcnow() - timedelta(minutes = 1)).replace(microsecond = 0)
+        Perubahan.query.update({'waktu': last_modified})
+        db.session.commit()
+    response = client.get('/buku/1')
+    assert response.headers['Last-Modified'] == http_date(last_modified)
+    assert client.get('/buku/1', headers = {'If-Modified-Since': http_date(last_modified)}).status_code == 304
+    assert client.get('/buku/1', headers = {
+        'If-Modified-Since': http_date(last_modified - timedelta(seconds = 1))
+    }).status_code == 200
+
+def test_last_modified_is_in_utc_whatever_the_time_zone(client, catalogue, monkeypatch):
+    monkeypatch.setenv('TZ', 'America/New_York')
+    time.tzset()
+    try:
+        book, = catalogue.books(1)
+        time.sleep(1.1)
+        last_modified = parse_date(client.get('/buku/' + str(book['id'])).headers['Last-Modified'])
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+    assert abs((datetime.utcnow() - last_modified).total_seconds()) < 60
@@ -0,0 +1,60 @@
+# Import from related third party
+import pytest
+
+# Books of the catalogue of the tests: title, category, publisher, and writer
+BOOKS = [
+    ('Buku A', 'Novel', 'Gramedia', 'Andi'),
+    ('Buku B', 'Novel', 'Mizan', 'Andi'),
+    ('Kisah C', 'Novel', 'Gramedia', 'Budi'),
+    ('Buku D', 'Puisi', 'Gramedia', 'Budi'),
+    ('Buku E', 'Puisi', 'Mizan', 'Andi'),
+]
+
+# Searches, with the titles they find and their facets: each facet ignores its own criterion, but follows the others
+SEARCHES = [
+    ({}, ['Buku A', 'Buku B', 'Kisah C', 'Buku D', 'Buku E'], [('Novel', 3), ('Puisi', 2)], [('Gramedia', 3), ('Mizan', 2)]),
+    ({'kategori': 'Novel'}, ['Buku A', 'Buku B', 'Kisah C'], [('Novel', 3), ('Puisi', 2)], [('Gramedia', 2), ('Mizan', 1)]),
+    ({'penerbit': 'Mizan'}, ['Buku B', 'Buku E'], [('Novel', 1), ('Puisi', 1)], [('Gramedia', 3), ('Mizan', 2)]),
+    ({'kategori': 'Novel', 'penerbit': 'Mizan'}, ['Buku B'], [('Novel', 1), ('Puisi', 1)], [('Gramedia', 2), ('Mizan', 1)]),
+    ({'judul': 'buku'}, ['Buku A', 'Buku B', 'Buku D', 'Buku E'], [('Novel', 2), ('Puisi', 2)], [('Gramedia', 2), ('Mizan', 2)]),
+    ({'penulis': 'Budi'}, ['Kisah C', 'Buku D'], [('Novel', 1), ('Puisi', 1)], [('Gramedia', 2)]),
+    ({'kategori': 'Lain'}, [], [('Novel', 3), ('Puisi', 2)], []),
+]
+
+@pytest.fixture
+def shelves(catalogue):
+    categories = dict([(name, catalogue.category(name)) for name in ['Novel', 'Puisi']])
+    writers = dict([(name, catalogue.writer(name)) for name in ['Andi', 'Budi']])
+    for title, category, publisher, writer in BOOKS:
+        catalogue.book(categories[category], [writers[writer]], title, publisher = publisher)
+
+'''
+The following function is designed to search the catalogue.
+
+:param object client: The test client
+:param dict criteria: The criteria of the search
+:return: Return the JSON of the response
+'''
+def search(client, criteria):
+    response = client.get('/buku/cari', query_string = criteria)
+    assert response.status_code == 200
+    return response.get_json()
+
+@pytest.mark.parametrize('criteria, titles, categories, publishers', SEARCHES)
+def test_facets_count_the_books_of_every_other_choice(client, shelves, criteria, titles, categories, publishers):
+    body = search(client, criteria)
+    assert sorted([book['judul'] for book in body['data']]) == sorted(titles)
+    assert [(facet['kategori'], facet['jumlah']) for facet in body['facet']['kategori']] == categories
+    assert [(facet['penerbit'], facet['jumlah']) for facet in body['facet']['penerbit']] == publishers
+
+def test_facets_count_every_page(client, shelves):
+    first = search(client, {'limit': 1})
+    assert len(first['data']) == 1 and first['next_cursor'] is not None
+    assert first['facet'] == search(client, {})['facet']
+    second = search(client, {'limit': 1, 'cursor': first['next_cursor']})
+    assert second['facet'] == first['facet']
+
+def test_facets_are_counted_in_one_query(client, shelves, statements):
+    statements.statements[:] = []
+    search(client, {'judul': 'buku', 'penerbit': 'Gramedia'})
+    assert len([statement for statement in statements.statements if 'GROUP BY' in statement]) == 1
@@ -0,0 +1,106 @@
+# Import from standard libraries
+import json
+import os
+
+# Import helpers
+from blueprints import create_app
+from blueprints.metrics import start_metrics_writer, stop_metrics_writer
+from blueprints.request_log import stop_request_log_writer
+
+# Series of the requests of GET /kategori which succeeded
+CATEGORY_REQUESTS = 'http_requests_total{blueprint="kategori",endpoint="kategori.categoryresource",method="GET",status="200"}'
+CATEGORY_DURATION = 'http_request_duration_seconds_{}{{blueprint="kategori",endpoint="kategori.categoryresource",method="GET"}}'
+
+'''
+The following function is designed to read the metrics shown at "/metrics".
+
+:param object client: The test client
+:return: Return a dictionary from each series to its value, and the types of the metrics
+'''
+def scrape(client):
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    series = {}
+    types = {}
+    for line in response.get_data(as_text = True).splitlines():
+        if line.startswith('# TYPE '):
+            name, kind = line[len('# TYPE '):].split(' ')
+            types[name] = kind
+        elif line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            series[name] = float(value)
+    return series, types
+
+def test_metrics_are_rendered_in_prometheus_format(client):
+    before, _ = scrape(client)
+    for _ in range(3):
+        assert client.get('/kategori').status_code == 200
+    after, types = scrape(client)
+
+    assert types['http_requests_total'] == 'counter'
+    assert types['http_request_duration_seconds'] == 'histogram'
+    assert types['http_requests_in_flight'] == 'gauge'
+    assert after[CATEGORY_REQUESTS] - before.get(CATEGORY_REQUESTS, 0) == 3
+
+    # The buckets are cumulative, and the last one is the number of requests
+    buckets = [
+        value for name, value in after.items()
+        if name.startswith('http_request_duration_seconds_bucket{blueprint="kategori",endpoint="kategori.categoryresource",method="GET"')
+    ]
+    assert buckets == sorted(buckets)
+    assert buckets[-1] == after[CATEGORY_DURATION.format('count')]
+    assert after[CATEGORY_DURATION.format('count')] == sum([
+        value for name, value in after.items()
+        if name.startswith('http_requests_total{blueprint="kategori",endpoint="kategori.categoryresource",method="GET"')
+    ])
+
+def test_metrics_of_all_workers_are_summed(tmp_path):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'kiostix.db'), 'DB_CREATE_ALL': True,
+        'RESPONSE_CACHE_URL': '', 'REQUEST_LOG_PATH': '', 'METRICS_DIR': str(tmp_path / 'metrik'),
+        'METRICS_FLUSH_SECONDS': 60,
+    })
+    client = app.test_client()
+    client.get('/kategori')
+    before, _ = scrape(client)
+
+    # A worker forked from this process serves three requests, then exits
+    pid = os.fork()
+    if pid == 0:
+        try:
+            start_metrics_writer(app)
+            for _ in range(3):
+                client.get('/kategori')
+            stop_metrics_writer(app)
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+
+    # Its counters are still counted once it is gone, but not what it had from this process
+    after, _ = scrape(client)
+    assert after[CATEGORY_REQUESTS] == before[CATEGORY_REQUESTS] + 3
+    stop_metrics_writer(app)
+    stop_request_log_writer(app)
+
+def test_gauges_of_gone_processes_are_left_out(tmp_path):
+    directory = tmp_path / 'metrik'
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'kiostix.db'), 'DB_CREATE_ALL': True,
+        'RESPONSE_CACHE_URL': '', 'REQUEST_LOG_PATH': '', 'METRICS_DIR': str(directory), 'METRICS_FLUSH_SECONDS': 60,
+    })
+    client = app.test_client()
+    before, _ = scrape(client)
+
+    # Snapshots of a running process (the parent of this one) and of a gone one
+    for pid in [os.getppid(), 2 ** 22 + 1]:
+        with open(str(directory / '{}-1.json'.format(pid)), 'w') as snapshot_file:
+            json.dump({'pid': pid, 'metrik': {
+                'http_requests_in_flight': [[['buku'], 2]],
+                'sql_statements_total': [[[], 10]],
+            }}, snapshot_file)
+    after, _ = scrape(client)
+    assert after['http_requests_in_flight{blueprint="buku"}'] == before.get('http_requests_in_flight{blueprint="buku"}', 0) + 2
+    assert after['sql_statements_total'] >= before['sql_statements_total'] + 20
+    stop_metrics_writer(app)
+    stop_request_log_writer(app)
@@ -0,0 +1,51 @@
+# Import from standard libraries
+import logging.config
+import os
+
+# Import from related third party
+from flask_migrate import downgrade, upgrade
+from sqlalchemy import inspect
+
+# Import helpers
+from blueprints import create_app, db, init_migrations
+from blueprints.request_log import stop_request_log_writer
+
+# The migrations of the project
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+'''
+The following function is designed to describe the schema of a database: the columns and the indexes of each table.
+
+:param object engine: The engine of the database
+:return: Return a dictionary from table name to its columns and indexes
+'''
+def schema_of(engine):
+    inspector = inspect(engine)
+    return dict([
+        (table, (
+            sorted([column['name'] for column in inspector.get_columns(table)]),
+            sorted([(index['name'], tuple(index['column_names'])) for index in inspector.get_indexes(table)])
+        )) for table in inspector.get_table_names() if table != 'alembic_version' and not table.startswith('buku_fts')
+    ])
+
+def test_migrations_create_the_schema_of_the_models(app, tmp_path, catalogue, monkeypatch):
+    catalogue.books(1)
+    with app.app_context():
+        expected = schema_of(db.engine)
+
+    # The logging of "alembic.ini" would disable the loggers of the application for the next tests
+    monkeypatch.setattr(logging.config, 'fileConfig', lambda *args, **kwargs: None)
+
+    # An empty database is upgraded to the same schema, and back to nothing
+    migrated = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'migrated.db'), 'DB_CREATE_ALL': False,
+        'REQUEST_LOG_PATH': '',
+    })
+    init_migrations(migrated)
+    with migrated.app_context():
+        upgrade(directory = MIGRATIONS)
+        assert schema_of(db.engine) == expected
+        downgrade(directory = MIGRATIONS, revision = 'base')
+        assert schema_of(db.engine) == {}
+        db.get_engine(migrated).dispose()
+    stop_request_log_writer(migrated)
@@ -0,0 +1,58 @@
+# Import from related third party
+import pytest
+
+# Import helpers
+from blueprints.multiget import MAX_IDS
+
+# The listings which give records by their IDs
+LISTINGS = ['/buku', '/penulis', '/kategori']
+
+'''
+The following function is designed to get records by their IDs.
+
+:param object client: The test client
+:param string path: The path of the listing
+:param list ids: The IDs, given as they are
+:return: Return the status code and the JSON of the response
+'''
+def get_by_ids(client, path, ids):
+    response = client.get(path, query_string = {'ids': ','.join([str(record_id) for record_id in ids])})
+    return response.status_code, response.get_json()
+
+@pytest.mark.parametrize('path', LISTINGS)
+def test_records_are_given_in_the_order_of_the_ids(client, catalogue, path):
+    catalogue.books(5)
+    records = dict([(record['id'], record) for record in client.get(path).get_json()])
+    ids = sorted(records, reverse = True)[:3]
+    status, body = get_by_ids(client, path, [ids[1], 999, ids[0], ids[1], ids[2], 998, 999])
+    assert status == 200
+    assert body == {
+        'data': [records[ids[1]], None, records[ids[0]], records[ids[1]], records[ids[2]], None, None],
+        'tidak_ditemukan': [999, 998],
+    }
+
+@pytest.mark.parametrize('path', LISTINGS)
+def test_invalid_ids_are_refused(client, path):
+    assert get_by_ids(client, path, [1, 'x']) == (400, {'pesan': 'Nomor ID x tidak valid'})
+
+@pytest.mark.parametrize('path', LISTINGS)
+def test_number_of_ids_is_bounded(client, path):
+    status, body = get_by_ids(client, path, range(1, MAX_IDS + 1))
+    assert status == 200
+    assert body['tidak_ditemukan'] == list(range(1, MAX_IDS + 1))
+    status, body = get_by_ids(client, path, range(1, MAX_IDS + 2))
+    assert (status, body) == (400, {'pesan': 'Jumlah ID tidak boleh lebih dari ' + str(MAX_IDS)})
+
+def test_empty_ids_give_the_whole_listing(client, catalogue):
+    catalogue.books(2)
+    assert client.get('/buku?ids=').get_json() == client.get('/buku').get_json()
+
+def test_books_are_read_in_one_query(client, catalogue, statements):
+    books = catalogue.books(6)
+    for number in [1, 6]:
+        statements.statements[:] = []
+        assert get_by_ids(client, '/buku', [book['id'] for book in books[:number]])[0] == 200
+
+        # The version of the books, then the books themselves
+        assert len(statements.statements) == 2
+        assert 'FROM buku' in statements.statements[1]
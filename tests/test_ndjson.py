@@ -0,0 +1,51 @@
+# Import from standard libraries
+import json
+
+# Import from related third party
+import pytest
+
+# Import helpers
+from blueprints.buku import resources
+
+'''
+The following function is designed to read the books of the NDJSON export, one JSON per line.
+
+:param object response: The streamed response
+:return: Return the books
+'''
+def exported_books(response):
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    body = response.get_data(as_text = True)
+    assert body == '' or body.endswith('\n')
+    return [json.loads(line) for line in body.splitlines()]
+
+@pytest.mark.parametrize('query_string, headers', [
+    ({'format': 'ndjson'}, {}),
+    ({}, {'Accept': 'application/x-ndjson'}),
+    ({'include': 'kategori', 'format': 'ndjson'}, {}),
+    ({'fields': 'id,judul', 'format': 'ndjson'}, {}),
+])
+def test_export_gives_the_books_of_the_listing(client, catalogue, query_string, headers):
+    catalogue.books(7)
+    listing = client.get('/buku', query_string = dict([
+        (name, value) for name, value in query_string.items() if name != 'format'
+    ])).get_json()
+    response = client.get('/buku', query_string = query_string, headers = headers, buffered = False)
+    assert response.is_streamed and 'Content-Length' not in response.headers
+    assert exported_books(response) == listing
+
+def test_empty_catalogue_gives_an_empty_export(client):
+    assert exported_books(client.get('/buku?format=ndjson')) == []
+
+def test_books_are_read_in_batches_of_a_constant_size(client, catalogue, statements, monkeypatch):
+    books = catalogue.books(7)
+    monkeypatch.setattr(resources, 'NDJSON_BATCH_SIZE', 3)
+    statements.statements[:] = []
+    assert [book['id'] for book in exported_books(client.get('/buku?format=ndjson'))] == [book['id'] for book in books]
+
+    # Three batches of at most three books, each one after the last ID of the previous one
+    batches = [statement for statement in statements.statements if statement.lstrip().startswith('SELECT') and 'FROM buku' in statement]
+    assert len(batches) == 3
+    assert all(['LIMIT' in batch for batch in batches])
+    assert all(['buku.id >' in batch for batch in batches[1:]])
@@ -0,0 +1,76 @@
+# Import from standard libraries
+import base64
+import json
+
+# Import from related third party
+import pytest
+
+# Import helpers
+from blueprints import pagination
+from blueprints.pagination import encode_cursor
+
+'''
+The following function is designed to read every page of a listing, following "next_cursor" until the last page.
+
+:param object client: The test client
+:param string path: The path of the listing
+:param dict arguments: The other arguments of the listing
+:param integer limit: Number of records in one page
+:return: Return the IDs of the records of each page
+'''
+def read_pages(client, path, arguments, limit):
+    pages = []
+    query_string = dict(arguments, limit = limit)
+    while True:
+        response = client.get(path, query_string = query_string)
+        assert response.status_code == 200, response.get_json()
+        body = response.get_json()
+        pages.append([record['id'] for record in body['data']])
+        if body['next_cursor'] is None:
+            return pages
+        query_string = dict(arguments, limit = limit, cursor = body['next_cursor'])
+
+@pytest.mark.parametrize('path, arguments', [
+    ('/buku', {}), ('/penulis', {}), ('/kategori', {}), ('/buku/sesuai-judul', {'judul': 'buku'})
+])
+def test_pages_give_every_record_once_in_order(client, catalogue, path, arguments):
+    catalogue.books(7)
+    every_id = [record['id'] for record in client.get(path, query_string = arguments).get_json()]
+    pages = read_pages(client, path, arguments, 2)
+    assert [len(page) for page in pages[:-1]] == [2] * (len(pages) - 1)
+    assert 1 <= len(pages[-1]) <= 2
+    assert sum(pages, []) == every_id
+
+@pytest.mark.parametrize('cursor', [
+    'salah',
+    '!!!',
+    base64.urlsafe_b64encode(b'bukan json').decode('ascii'),
+    encode_cursor('offset', 2),
+    encode_cursor('id', '1 OR 1=1'),
+    base64.urlsafe_b64encode(json.dumps([1]).encode('utf-8')).decode('ascii'),
+])
+def test_invalid_or_tampered_cursors_are_refused(client, catalogue, cursor):
+    catalogue.books(3)
+    response = client.get('/buku', query_string = {'limit': 2, 'cursor': cursor})
+    assert response.status_code == 400
+    assert response.get_json() == {'pesan': 'Cursor tidak valid'}
+
+def test_offset_cursors_are_checked_too(client, catalogue):
+    catalogue.books(3)
+    for cursor in [encode_cursor('offset', -1), encode_cursor('id', 2), 'salah']:
+        response = client.get('/buku/sesuai-judul', query_string = {'judul': 'buku', 'limit': 2, 'cursor': cursor})
+        assert response.status_code == 400
+        assert response.get_json() == {'pesan': 'Cursor tidak valid'}
+
+@pytest.mark.parametrize('limit', [0, -1])
+def test_limit_must_be_positive(client, limit):
+    response = client.get('/buku', query_string = {'limit': limit})
+    assert response.status_code == 400
+    assert response.get_json() == {'pesan': 'Limit harus lebih besar dari 0'}
+
+def test_limit_is_clamped_to_the_maximum(client, catalogue, monkeypatch):
+    catalogue.books(5)
+    monkeypatch.setattr(pagination, 'MAX_LIMIT', 3)
+    body = client.get('/buku', query_string = {'limit': 1000}).get_json()
+    assert len(body['data']) == 3
+    assert body['next_cursor'] == encode_cursor('id', body['data'][-1]['id'])
@@ -0,0 +1,94 @@
+# Import from related third party
+import pytest
+from sqlalchemy import event
+
+# Import helpers
+from blueprints import db
+from blueprints.cache import category_cache, writer_cache
+from conftest import send
+
+# Read endpoints whose number of statements must not grow with the number of books
+PATHS = [
+    '/buku',
+    '/buku?include=kategori',
+    '/buku?limit=10',
+    '/buku/1',
+    '/buku/1?include=kategori',
+    '/buku/sesuai-penulis?penulis=Penulis',
+    '/buku/sesuai-kategori?kategori=Kategori 0',
+]
+
+'''
+The following function is designed to count the statements of a request, with cold in-process caches so that each
+request does the same work.
+
+:param object client: The test client
+:param object statements: The statement counter
+:param string path: The path of the request
+:return: Return the number of statements
+'''
+def count_statements(client, statements, path):
+    category_cache.clear()
+    writer_cache.clear()
+    del statements.statements[:]
+    response = client.get(path)
+    assert response.status_code == 200, response.get_data()
+    return len(statements.statements)
+
+@pytest.mark.parametrize('path', PATHS)
+def test_statements_dont_grow_with_books(client, catalogue, statements, path):
+    catalogue.books(1)
+    with_one_book = count_statements(client, statements, path)
+
+    catalogue.books(24)
+    with_many_books = count_statements(client, statements, path)
+    assert with_many_books == with_one_book, statements.statements
+
+'''
+The following function is designed to count the statements and the commits of a write.
+
+:param object app: The Flask application
+:param object client: The test client
+:param object statements: The statement counter
+:param string method: The HTTP method, such as "POST"
+:param string path: The path of the request
+:param dict body: The body of the request
+:return: Return the number of statements and the number of commits
+'''
+def count_write(app, client, statements, method, path, body = None):
+    commits = []
+    with app.app_context():
+        engine = db.get_engine(app)
+    listener = lambda connection: commits.append(connection)
+    event.listen(engine, 'commit', listener)
+    try:
+        category_cache.clear()
+        writer_cache.clear()
+        del statements.statements[:]
+        status, response = send(client, method, path, body)
+        assert status == 200, response
+    finally:
+        event.remove(engine, 'commit', listener)
+    return len(statements.statements), len(commits)
+
+@pytest.mark.parametrize('method', ['POST', 'PUT', 'DELETE'])
+def test_book_writes_dont_grow_with_writers(app, client, catalogue, statements, method):
+    category = catalogue.category('Novel')
+    writers = [catalogue.writer('Penulis ' + str(index)) for index in range(10)]
+    counts = []
+    for number in [1, 5]:
+        book = catalogue.book(category, writers[:number], 'Buku ' + str(number))
+        body = {
+            'id_kategori': category['id'], 'judul': 'Judul ' + str(number), 'penerbit': 'Gramedia',
+            'nomor_isbn': '979-' + str(number).zfill(9), 'id_penulis': [writer['id'] for writer in writers[5:5 + number]]
+        }
+        if method == 'POST':
+            counts.append(count_write(app, client, statements, 'POST', '/buku', body))
+        elif method == 'PUT':
+            counts.append(count_write(app, client, statements, 'PUT', '/buku/' + str(book['id']), body))
+        else:
+            counts.append(count_write(app, client, statements, 'DELETE', '/buku/' + str(book['id'])))
+
+    # The same statements for one writer and for five, in a single transaction
+    assert counts[0] == counts[1]
+    assert counts[0][1] == 1
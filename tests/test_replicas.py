@@ -0,0 +1,156 @@
+# Import from standard libraries
+import json
+import shutil
+import sqlite3
+import time
+
+# Import from related third party
+import pytest
+
+# Import helpers
+from blueprints import create_app, dispose_engine
+from blueprints.cache import category_cache, writer_cache
+from blueprints.replicas import PRIMARY_COOKIE, PRIMARY_HEADER
+from blueprints.request_log import stop_request_log_writer
+from conftest import Catalogue, send
+
+'''
+The following class is designed to hold a primary database and its replica, two SQLite files. Nothing copies the writes
+into the replica but "sync", so it lags behind the primary until then.
+'''
+class Replication(object):
+    '''
+    :param object tmp_path: The temporary directory of the test
+    '''
+    def __init__(self, tmp_path):
+        self.primary = str(tmp_path / 'primary.db')
+        self.replica = str(tmp_path / 'replica.db')
+        self.app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + self.primary, 'DB_REPLICA_URIS': ['sqlite:///' + self.replica],
+            'DB_STICKY_SECONDS': 5, 'DB_CREATE_ALL': True, 'RESPONSE_CACHE_URL': '', 'REQUEST_LOG_PATH': '',
+            'APP_DEBUG': False, 'TESTING': True,
+        })
+
+    '''
+    The following method is designed to copy the primary into the replica, like a replica which catches up.
+
+    :param object self: A must present keyword argument
+    '''
+    def sync(self):
+        dispose_engine(self.app)
+        shutil.copyfile(self.primary, self.replica)
+
+    '''
+    The following method is designed to drop a table of the replica, so that its reads fail.
+
+    :param object self: A must present keyword argument
+    '''
+    def break_replica(self):
+        dispose_engine(self.app)
+        connection = sqlite3.connect(self.replica)
+        connection.execute('DROP TABLE kategori')
+        connection.close()
+
+    '''
+    The following method is designed to read the names of the categories straight from a database file.
+
+    :param object self: A must present keyword argument
+    :param string path: The file of the database
+    :return: Return the names
+    '''
+    def categories_in(self, path):
+        connection = sqlite3.connect(path)
+        try:
+            return [row[0] for row in connection.execute('SELECT kategori FROM kategori ORDER BY id')]
+        finally:
+            connection.close()
+
+'''
+The following fixture is designed to create the application on a primary database with one replica, where a category
+"Novel" is written and copied into the replica.
+
+:param object tmp_path: The temporary directory of the test
+:return: Yield the replication, and the category
+'''
+@pytest.fixture
+def replication(tmp_path):
+    for cache in [category_cache, writer_cache]:
+        cache.clear()
+        cache.generation = None
+    replication = Replication(tmp_path)
+    category = Catalogue(replication.app.test_client()).category('Novel')
+    replication.sync()
+    yield replication, category
+    stop_request_log_writer(replication.app)
+    dispose_engine(replication.app)
+
+'''
+The following function is designed to read the names of the categories through the API.
+
+:param object client: The test client
+:return: Return the names
+'''
+def categories_of(client, **kwargs):
+    response = client.get('/kategori', **kwargs)
+    assert response.status_code == 200
+    return [category['kategori'] for category in response.get_json()]
+
+def test_reads_go_to_the_replica_and_writes_to_the_primary(replication):
+    replication, category = replication
+    writer = replication.app.test_client()
+    assert send(writer, 'PUT', '/kategori/' + str(category['id']), {'kategori': 'Roman'})[0] == 200
+    assert replication.categories_in(replication.primary) == ['Roman']
+    assert replication.categories_in(replication.replica) == ['Novel']
+
+    # Another client reads from the replica, which doesn't have the write yet
+    reader = replication.app.test_client()
+    assert categories_of(reader) == ['Novel']
+    replication.sync()
+    assert categories_of(reader) == ['Roman']
+
+def test_a_writer_reads_from_the_primary_for_a_while(replication):
+    replication, category = replication
+    writer = replication.app.test_client()
+    response = writer.put('/kategori/' + str(category['id']), json = {'kategori': 'Roman'})
+    assert response.status_code == 200
+    until = response.headers[PRIMARY_HEADER]
+    assert float(until) > time.time()
+
+    # By its cookie, or by the header given back by a client which doesn't keep cookies
+    assert categories_of(writer) == ['Roman']
+    reader = replication.app.test_client()
+    assert categories_of(reader, headers = {PRIMARY_HEADER: until}) == ['Roman']
+
+    # A window which is over, or longer than DB_STICKY_SECONDS, is ignored
+    assert categories_of(reader, headers = {PRIMARY_HEADER: '%.3f' % (time.time() - 1)}) == ['Novel']
+    assert categories_of(reader, headers = {PRIMARY_HEADER: '%.3f' % (time.time() + 3600)}) == ['Novel']
+    writer.set_cookie('localhost', PRIMARY_COOKIE, '%.3f' % (time.time() - 1))
+    assert categories_of(writer) == ['Novel']
+
+def test_a_failing_replica_is_left_out_and_its_read_served_by_the_primary(replication):
+    replication, category = replication
+    writer = replication.app.test_client()
+    assert send(writer, 'PUT', '/kategori/' + str(category['id']), {'kategori': 'Roman'})[0] == 200
+
+    # The replica loses its tables: the read fails there, and is run again on the primary
+    replication.break_replica()
+    reader = replication.app.test_client()
+    assert categories_of(reader) == ['Roman']
+    replicas = replication.app.extensions['replicas']
+    assert replicas.choose() is None
+
+    # The next reads don't try the replica until DB_REPLICA_RETRY is over
+    assert categories_of(reader) == ['Roman']
+
+def test_the_asynchronous_read_path_serves_a_failed_read_from_the_primary(replication):
+    pytest.importorskip('aiosqlite')
+    from test_async_read_path import asgi_responses
+
+    replication, category = replication
+    writer = replication.app.test_client()
+    assert send(writer, 'PUT', '/kategori/' + str(category['id']), {'kategori': 'Roman'})[0] == 200
+    replication.break_replica()
+    (status, headers, body), = asgi_responses(replication.app, ['/kategori'])
+    assert status == 200
+    assert [category['kategori'] for category in json.loads(body)] == ['Roman']
+    assert replication.app.extensions['replicas'].choose() is None
@@ -0,0 +1,100 @@
+# Import from standard libraries
+import json
+import threading
+
+# Import from related third party
+import pytest
+
+# Import helpers
+from blueprints import create_app, request_log
+from blueprints.metrics import log_records_dropped_total
+from blueprints.request_log import start_request_log_writer, stop_request_log_writer
+
+@pytest.fixture
+def logged_app(tmp_path):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'kiostix.db'),
+        'RESPONSE_CACHE_URL': '',
+        'REQUEST_LOG_PATH': str(tmp_path / 'app.log'),
+        'APP_DEBUG': False,
+        'TESTING': True,
+    })
+    yield app
+    stop_request_log_writer(app)
+
+'''
+The following function is designed to read the data of the requests logged into the file, once the writer has written
+everything.
+
+:param object app: The Flask application
+:return: Return the data of each request
+'''
+def logged_requests(app):
+    stop_request_log_writer(app)
+    with open(app.config['REQUEST_LOG_PATH']) as log_file:
+        return [json.loads(line.split('REQUEST_LOG\t', 1)[1]) for line in log_file if 'REQUEST_LOG\t' in line]
+
+def test_requests_are_written_by_the_writer_thread(logged_app, monkeypatch):
+    threads = []
+    format_record = request_log.RequestLogFormatter.format
+
+    # Record the thread which turns the data of a request into JSON
+    def recorded_format(formatter, record):
+        threads.append(threading.current_thread())
+        return format_record(formatter, record)
+    monkeypatch.setattr(request_log.RequestLogFormatter, 'format', recorded_format)
+
+    client = logged_app.test_client()
+    assert client.get('/cache').status_code == 200
+    assert client.get('/tidak-ada').status_code == 404
+    logged = logged_requests(logged_app)
+    assert [(data['method'], data['uri'], data['status_code']) for data in logged] == [
+        ('GET', '/cache?', 200), ('GET', '/tidak-ada?', 404)
+    ]
+    assert threads and threading.current_thread() not in threads
+
+def test_forked_worker_starts_its_own_writer(logged_app):
+    writer = logged_app.extensions['request_log']
+
+    # The thread of the parent isn't copied into a forked worker, which is seen as another process
+    writer.pid = -1
+    start_request_log_writer(logged_app)
+    assert writer.pid is not None and writer.pid != -1 and writer.listener._thread.is_alive()
+    assert logged_app.test_client().get('/cache').status_code == 200
+    assert [data['uri'] for data in logged_requests(logged_app)] == ['/cache?']
+
+def test_records_are_dropped_when_the_queue_is_full(tmp_path, monkeypatch):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'kiostix.db'), 'RESPONSE_CACHE_URL': '',
+        'REQUEST_LOG_PATH': str(tmp_path / 'app.log'), 'REQUEST_LOG_QUEUE_SIZE': 2, 'APP_DEBUG': False, 'TESTING': True,
+    })
+    released = threading.Event()
+    format_record = request_log.RequestLogFormatter.format
+
+    # The writer thread is stuck on its first record until the requests are over
+    def slow_format(formatter, record):
+        released.wait(10)
+        return format_record(formatter, record)
+    monkeypatch.setattr(request_log.RequestLogFormatter, 'format', slow_format)
+
+    dropped = log_records_dropped_total.values.get((), 0)
+    client = app.test_client()
+    for _ in range(10):
+        assert client.get('/cache').status_code == 200
+    released.set()
+    logged = logged_requests(app)
+
+    # At most the record of the writer thread and a full queue are written, the others are counted
+    writer = app.extensions['request_log']
+    assert len(logged) <= 3
+    assert writer.queue_handler.dropped == 10 - len(logged)
+    assert log_records_dropped_total.values.get((), 0) - dropped == writer.queue_handler.dropped
+
+def test_the_writer_is_stopped_at_exit_once(monkeypatch):
+    registered = []
+    monkeypatch.setattr(request_log.atexit, 'register', registered.append)
+    writer = request_log.RequestLogWriter([], 10)
+    for _ in range(3):
+        writer.start()
+        writer.stop()
+    assert registered == [writer.stop]
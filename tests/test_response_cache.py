@@ -0,0 +1,153 @@
+# Import from standard libraries
+import os
+import runpy
+
+# Import from related third party
+import pytest
+from flask import request
+
+# Import helpers
+from blueprints.config import load_config
+from blueprints.response_cache import create_backend, init_response_cache
+from conftest import send
+from test_change_stream import GUNICORN_CONF
+
+'''
+The following fixture is designed to cache the responses of the application of a test, in the in-process stand-in of
+Redis, so the backend shared by the workers is the one tested.
+
+:param object app: The Flask application
+:return: Return the application
+'''
+@pytest.fixture
+def app(app):
+    app.config['RESPONSE_CACHE_URL'] = 'fakeredis://'
+    init_response_cache(app)
+    return app
+
+'''
+The following function is designed to read a path, and wait until its response is written into the cache.
+
+:param object app: The Flask application
+:param object client: The test client
+:param string path: The path of the request
+:return: Return the response
+'''
+def read(app, client, path, **kwargs):
+    response = client.get(path, **kwargs)
+    app.extensions['response_cache'].writes.join()
+    return response
+
+'''
+The following function is designed to read the generation of each resource in the cache.
+
+:param object app: The Flask application
+:return: Return a dictionary from resource to its generation
+'''
+def generations(app):
+    cache = app.extensions['response_cache']
+    return dict([
+        (resource, int(cache.backend.get(cache.generation_key(resource)) or 0)) for resource in ['buku', 'penulis', 'kategori']
+    ])
+
+def test_query_arguments_are_sorted_in_the_key(app):
+    cache = app.extensions['response_cache']
+    keys = []
+    for path, accept in [
+        ('/kategori?limit=2&fields=kategori', 'application/json'),
+        ('/kategori?fields=kategori&limit=2', 'application/json'),
+        ('/kategori?fields=kategori&limit=3', 'application/json'),
+        ('/kategori?limit=2&fields=kategori', 'application/x-ndjson'),
+    ]:
+        with app.test_request_context(path, headers = {'Accept': accept}):
+            keys.append(cache.key(request, ['1']))
+    assert keys[0] == keys[1]
+    assert len(set(keys)) == 3
+
+    # Another generation of a resource gives another key
+    with app.test_request_context('/kategori'):
+        assert cache.key(request, ['1']) != cache.key(request, ['2'])
+
+def test_a_hit_sends_no_statement(app, client, catalogue, statements):
+    catalogue.category('Novel')
+    first = read(app, client, '/kategori?limit=2&fields=kategori')
+    statements.statements[:] = []
+    second = client.get('/kategori?fields=kategori&limit=2')
+    assert second.get_json() == first.get_json()
+    assert statements.statements == []
+
+    # The client which has the version is answered with 304, still without a statement
+    assert client.get('/kategori?fields=kategori&limit=2', headers = {'If-None-Match': first.headers['ETag']}).status_code == 304
+    assert statements.statements == []
+
+def test_writes_bump_the_generation_of_their_resource(app, client, catalogue):
+    category = catalogue.category('Novel')
+    writer = catalogue.writer('Andi')
+    book = catalogue.book(category, [writer], 'Buku')
+    writes = [
+        ('kategori', 'POST', '/kategori', {'kategori': 'Puisi'}),
+        ('kategori', 'PUT', '/kategori/' + str(category['id']), {'kategori': 'Roman'}),
+        ('penulis', 'POST', '/penulis', {'nama': 'Budi', 'nomor_hp': '0899', 'email': 'budi@kiostix.id'}),
+        ('penulis', 'PUT', '/penulis/' + str(writer['id']), dict(writer, nama = 'Citra')),
+        ('buku', 'PUT', '/buku/' + str(book['id']), {
+            'id_kategori': category['id'], 'judul': 'Judul baru', 'penerbit': book['penerbit'],
+            'nomor_isbn': book['nomor_isbn'], 'id_penulis': [writer['id']]
+        }),
+        ('buku', 'DELETE', '/buku/' + str(book['id']), None),
+        ('penulis', 'DELETE', '/penulis/' + str(writer['id']), None),
+        ('kategori', 'DELETE', '/kategori/' + str(category['id']), None),
+    ]
+    for resource, method, path, body in writes:
+        before = generations(app)
+        status, response = send(client, method, path, body)
+        assert status == 200, response
+        after = generations(app)
+        assert after[resource] == before[resource] + 1, (method, path)
+        assert [name for name in after if after[name] != before[name]] == [resource]
+
+    # A write of a new book too
+    before = generations(app)
+    catalogue.book(catalogue.category('Sejarah'), [catalogue.writer('Dewi')], 'Buku baru')
+    assert generations(app)['buku'] == before['buku'] + 1
+
+def test_a_stale_response_is_never_served(app, client, catalogue):
+    category = catalogue.category('Novel')
+    writer = catalogue.writer('Andi')
+    book = catalogue.book(category, [writer], 'Buku')
+    path = '/buku/' + str(book['id'])
+    cached = read(app, client, path)
+    assert read(app, client, path).get_json() == cached.get_json()
+
+    # Each resource the response is built from makes it stale when written
+    assert send(client, 'PUT', path, {
+        'id_kategori': category['id'], 'judul': 'Judul baru', 'penerbit': book['penerbit'],
+        'nomor_isbn': book['nomor_isbn'], 'id_penulis': [writer['id']]
+    })[0] == 200
+    assert read(app, client, path).get_json()['judul'] == 'Judul baru'
+    assert send(client, 'PUT', '/penulis/' + str(writer['id']), dict(writer, nama = 'Budi'))[0] == 200
+    assert read(app, client, path).get_json()['penulis'] == 'Budi'
+    response = read(app, client, path, headers = {'If-None-Match': cached.headers['ETag']})
+    assert response.status_code == 200
+    assert response.get_json()['penulis'] == 'Budi'
+
+    # A listing too, even for a client which has its old version
+    listing = read(app, client, '/kategori')
+    assert send(client, 'PUT', '/kategori/' + str(category['id']), {'kategori': 'Roman'})[0] == 200
+    response = read(app, client, '/kategori', headers = {'If-None-Match': listing.headers['ETag']})
+    assert response.status_code == 200
+    assert [category['kategori'] for category in response.get_json()] == ['Roman']
+    assert send(client, 'DELETE', path)[0] == 200
+    assert client.get(path).status_code == 404
+
+def test_local_cache_is_refused_with_several_workers(monkeypatch):
+    monkeypatch.setenv('RESPONSE_CACHE_URL', 'local://')
+    monkeypatch.setenv('WEB_CONCURRENCY', '1')
+    assert create_backend(load_config()) is not None
+    monkeypatch.setenv('WEB_CONCURRENCY', '2')
+    with pytest.raises(ValueError):
+        create_backend(load_config())
+
+    # Gunicorn tells the application how many workers it has
+    monkeypatch.setattr(os, 'environ', {'GUNICORN_WORKERS': '3'})
+    runpy.run_path(GUNICORN_CONF)
+    assert load_config()['WORKERS'] == 3
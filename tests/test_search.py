@@ -0,0 +1,61 @@
+# Import from standard libraries
+import time
+
+# Import from related third party
+import pytest
+
+# Import helpers
+from blueprints import db
+from blueprints.buku import search
+
+# Titles of the books, and the titles found by each search: every word must be the beginning of a word of the title
+TITLES = ['Hujan Bulan Juni', 'Senja dan Hujan', 'Menghujani Kota', 'Juni yang Hujan-Deras', 'Bulan']
+SEARCHES = [
+    ('hujan', ['Hujan Bulan Juni', 'Senja dan Hujan', 'Juni yang Hujan-Deras']),
+    ('HUJ', ['Hujan Bulan Juni', 'Senja dan Hujan', 'Juni yang Hujan-Deras']),
+    ('juni hujan', ['Hujan Bulan Juni', 'Juni yang Hujan-Deras']),
+    ('ujan', []),
+    ('deras', ['Juni yang Hujan-Deras']),
+    ('bulan kota', []),
+]
+
+'''
+The following function is designed to get the titles found by GET /buku/sesuai-judul, in the order of the IDs.
+
+:param object client: The test client
+:param string text: The search text
+:return: Return the titles
+'''
+def search_titles(client, text):
+    response = client.get('/buku/sesuai-judul', query_string = {'judul': text})
+    assert response.status_code == 200
+    return sorted([book['judul'] for book in response.get_json()], key = TITLES.index)
+
+@pytest.fixture
+def titles(catalogue):
+    category = catalogue.category('Novel')
+    writer = catalogue.writer('Sapardi')
+    for title in TITLES:
+        catalogue.book(category, [writer], title)
+
+def test_full_text_table_is_created_with_the_schema(app, titles):
+    with app.app_context():
+        assert search.fts_table_exists()
+        assert db.session.execute("SELECT count(*) FROM buku_fts WHERE buku_fts MATCH 'juni'").scalar() == 2
+
+@pytest.mark.parametrize('text, expected', SEARCHES)
+def test_search_matches_word_prefixes(client, titles, text, expected):
+    assert search_titles(client, text) == expected
+
+@pytest.mark.parametrize('text, expected', SEARCHES)
+def test_fallback_gives_the_same_books(client, titles, monkeypatch, text, expected):
+    monkeypatch.setattr(search, 'fts_table_exists', lambda: False)
+    assert search_titles(client, text) == expected
+
+def test_missing_table_is_checked_again(app, titles):
+    with app.app_context():
+        key = str(db.engine.url)
+        search._fts_table_exists[key] = (False, time.monotonic())
+        assert not search.fts_table_exists()
+        search._fts_table_exists[key] = (False, time.monotonic() - search.FTS_RECHECK_SECONDS)
+        assert search.fts_table_exists()
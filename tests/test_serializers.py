@@ -0,0 +1,69 @@
+# Import from standard libraries
+import json
+from datetime import datetime
+
+# Import from related third party
+import pytest
+from flask_restful import marshal
+
+# Import helpers
+from blueprints import db
+from blueprints.buku.resources import book_selection, format_book
+from blueprints.serializers import get_serializer
+
+# Import models
+from blueprints.buku.model import Buku
+from blueprints.kategori.model import Kategori
+from blueprints.penulis.model import Penulis
+from blueprints.penulis_buku.model import PenulisBuku
+from blueprints.perubahan.model import Perubahan
+
+'''
+The following function is designed to compare the serializer of a model with "marshal", on every record of the model.
+
+:param object model: The model
+:param tuple keys: Keys of "response_fields" which should be shown (all of them if None)
+'''
+def assert_same_json(model, keys = None):
+    fields = model.response_fields
+    if keys is not None:
+        fields = dict([(key, field) for key, field in fields.items() if key in keys])
+    serializer = get_serializer(model, (), keys)
+    order = list(model.__table__.primary_key.columns)
+    records = model.query.order_by(*order).all()
+    rows = db.session.query(*serializer.columns).order_by(*order).all()
+    assert records and len(rows) == len(records)
+    for record, row in zip(records, rows):
+        assert json.dumps(serializer(row)) == json.dumps(marshal(record, fields))
+
+def test_rows_give_the_same_json_as_marshal(app, catalogue):
+    books = catalogue.books(3)
+    catalogue.book(catalogue.categories[0], catalogue.writers, 'Perjalanan ke Timur — édition', isbn = '978-ÜNICODE')
+    with app.app_context():
+        # Values which aren't set (null), and timestamps with microseconds
+        book = Buku.query.get(books[0]['id'])
+        book.created_at = None
+        book.updated_at = datetime(2020, 2, 29, 23, 59, 59, 999999)
+        db.session.commit()
+
+        for model in [Buku, Penulis, Kategori, PenulisBuku, Perubahan]:
+            assert_same_json(model)
+        assert_same_json(Buku, ('judul', 'created_at'))
+        assert_same_json(Penulis, ('email',))
+
+@pytest.mark.parametrize('query_string', ['', 'include=kategori', 'fields=id,judul', 'fields=judul&include=penulis'])
+def test_book_listing_gives_the_same_json_as_format_book(app, client, catalogue, query_string):
+    catalogue.books(4)
+    response = client.get('/buku?' + query_string)
+    with app.app_context():
+        expected = []
+        for book in Buku.query.order_by(Buku.id).all():
+            formatted_book = format_book(book)
+            formatted_book['kategori'] = book.kategori_buku.kategori
+            expected.append(formatted_book)
+        args = {'fields': None, 'include': None}
+        args.update([item.split('=') for item in query_string.split('&') if item])
+        keys = book_selection(args).keys
+        expected = [dict([(key, book[key]) for key in keys]) for book in expected]
+    assert json.loads(response.get_data()) == expected
+    assert [list(book) for book in json.loads(response.get_data())] == [keys for book in expected]
@@ -0,0 +1,63 @@
+# Import helpers
+from conftest import send
+
+'''
+The following function is designed to get the number of changes in the feed, to check that a rejected write leaves
+nothing behind.
+
+:param object client: The test client
+:return: Return the number of changes
+'''
+def count_changes(client):
+    return len(client.get('/buku/perubahan').get_json()['data'])
+
+def test_duplicate_isbn_is_rejected(client, catalogue):
+    first, second = catalogue.books(2)
+    changes = count_changes(client)
+    book = {
+        'id_kategori': first['id_kategori'], 'judul': 'Buku lain', 'penerbit': 'Mizan', 'nomor_isbn': first['nomor_isbn'],
+        'id_penulis': [catalogue.writers[0]['id']]
+    }
+    assert send(client, 'POST', '/buku', book) == (409, {'pesan': 'Buku dengan nomor ISBN tersebut sudah ada di database'})
+    assert send(client, 'PUT', '/buku/' + str(second['id']), book)[0] == 409
+    assert client.get('/buku/' + str(second['id'])).get_json()['nomor_isbn'] == second['nomor_isbn']
+    assert len(client.get('/buku').get_json()) == 2
+    assert count_changes(client) == changes
+
+    # A book keeps its own ISBN
+    book['nomor_isbn'] = second['nomor_isbn']
+    assert send(client, 'PUT', '/buku/' + str(second['id']), book)[0] == 200
+
+def test_duplicate_phone_number_and_email_are_rejected(client, catalogue):
+    first = catalogue.writer('Andi')
+    second = catalogue.writer('Budi')
+    changes = count_changes(client)
+    writer = {'nama': 'Citra', 'nomor_hp': first['nomor_hp'], 'email': 'citra@kiostix.id'}
+    failure = (409, {'pesan': 'Nomor HP tersebut sudah digunakan oleh penulis lain'})
+    assert send(client, 'POST', '/penulis', writer) == failure
+    assert send(client, 'PUT', '/penulis/' + str(second['id']), writer) == failure
+
+    writer = {'nama': 'Citra', 'nomor_hp': '0899', 'email': first['email']}
+    failure = (409, {'pesan': 'Email tersebut sudah digunakan oleh penulis lain'})
+    assert send(client, 'POST', '/penulis', writer) == failure
+    assert send(client, 'PUT', '/penulis/' + str(second['id']), writer) == failure
+
+    assert client.get('/penulis/' + str(second['id'])).get_json() == second
+    assert len(client.get('/penulis').get_json()) == 2
+    assert count_changes(client) == changes
+
+def test_duplicate_category_is_rejected(client, catalogue):
+    first = catalogue.category('Novel')
+    second = catalogue.category('Komik')
+    changes = count_changes(client)
+    failure = (409, {'pesan': 'Kategori tersebut sudah ada'})
+    assert send(client, 'POST', '/kategori', {'kategori': 'Novel'}) == failure
+    assert send(client, 'PUT', '/kategori/' + str(second['id']), {'kategori': 'Novel'}) == failure
+    assert client.get('/kategori/' + str(second['id'])).get_json() == second
+    assert count_changes(client) == changes
+
+def test_writer_given_twice_is_stored_once(client, catalogue):
+    category = catalogue.category('Novel')
+    writer = catalogue.writer('Andi')
+    book = catalogue.book(category, [writer, writer], 'Buku')
+    assert book['penulis'] == 'Andi'
@@ -0,0 +1,64 @@
+# Import from related third party
+from sqlalchemy.dialects import mysql
+
+# Import helpers
+from blueprints import db
+from blueprints.cache import read_writers
+from conftest import send
+
+# Import models
+from blueprints.penulis.model import Penulis
+
+'''
+The following function is designed to rename a writer the way another process does: in the database only, while this
+process still has the old name in its cache.
+
+:param object app: The application
+:param integer writer_id: ID of the writer
+:param string name: The new name
+'''
+def rename_in_another_process(app, writer_id, name):
+    with app.app_context():
+        Penulis.query.filter_by(id = writer_id).update({'nama': name})
+        db.session.commit()
+
+def test_book_writes_read_the_writers_from_the_database(app, client, catalogue):
+    category = catalogue.category('Novel')
+    writer = catalogue.writer('Andi')
+    book = catalogue.book(category, [writer], 'Buku')
+
+    # The cache of this process knows the writer, then another process renames it
+    assert client.get('/penulis?ids=' + str(writer['id'])).get_json()['data'][0]['nama'] == 'Andi'
+    rename_in_another_process(app, writer['id'], 'Budi')
+
+    assert catalogue.book(category, [writer], 'Buku lain')['penulis'] == 'Budi'
+    rename_in_another_process(app, writer['id'], 'Citra')
+    status, body = send(client, 'PUT', '/buku/' + str(book['id']), {
+        'id_kategori': category['id'], 'judul': 'Judul baru', 'penerbit': book['penerbit'],
+        'nomor_isbn': book['nomor_isbn'], 'id_penulis': [writer['id']]
+    })
+    assert status == 200
+    assert client.get('/buku/' + str(book['id'])).get_json()['penulis'] == 'Citra'
+
+def test_writers_of_a_write_are_locked(app):
+    with app.app_context():
+        steps = read_writers([1, 2], locked = True)
+        query = next(steps).query
+        assert 'LOCK IN SHARE MODE' in str(query.statement.compile(dialect = mysql.dialect()))
+        steps.close()
+
+def test_books_are_only_rewritten_when_the_name_changes(client, catalogue):
+    category = catalogue.category('Novel')
+    writer = catalogue.writer('Andi')
+    catalogue.book(category, [writer], 'Buku')
+    since = client.get('/buku/perubahan').get_json()['data'][-1]['urutan']
+
+    # Another phone number and email don't change the books
+    assert send(client, 'PUT', '/penulis/' + str(writer['id']), dict(writer, nomor_hp = '0899', email = 'baru@kiostix.id'))[0] == 200
+    changes = client.get('/buku/perubahan?since=' + str(since)).get_json()['data']
+    assert [(change['sumber'], change['aksi']) for change in changes] == [('penulis', 'ubah')]
+
+    # Another name does
+    assert send(client, 'PUT', '/penulis/' + str(writer['id']), dict(writer, nama = 'Budi', nomor_hp = '0899', email = 'baru@kiostix.id'))[0] == 200
+    changes = client.get('/buku/perubahan?since=' + str(since + 1)).get_json()['data']
+    assert sorted([(change['sumber'], change['aksi']) for change in changes]) == [('buku', 'ubah'), ('penulis', 'ubah')]